@@ -17,6 +17,13 @@ CLUSTER_EMBEDDINGS_CONFIG_PATH = Path(
 )
 EMBEDDINGS_CONFIG_PATH = Path(os.getenv("CONFIG_PATH"), "embeddings.npy")
 CLUSTER_NAMES_CONFIG_PATH = Path(os.getenv("CONFIG_PATH"), "cluster_names.json")
+SKILL_ALIASES_CONFIG_PATH = Path(os.getenv("CONFIG_PATH"), "skill_aliases.json")
+EMBEDDING_CACHE_PATH = Path(
+    os.getenv("EMBEDDING_CACHE_PATH", Path(os.getenv("CONFIG_PATH"), "embedding_cache.sqlite3"))
+)
+RESPONSE_CACHE_PATH = Path(
+    os.getenv("RESPONSE_CACHE_PATH", Path(os.getenv("CONFIG_PATH"), "response_cache.sqlite3"))
+)
 
 
 # Load weightage configuration
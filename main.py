@@ -5,6 +5,7 @@ This server will serve the front end (and other clients) with
 API to process resume, process JD and other admin API's.
 """
 
+import asyncio
 import json
 from intai.schemas.chatbot_model import JobPostingChat
 import uvicorn
@@ -12,18 +13,22 @@ from fastapi import FastAPI, Request, BackgroundTasks
 import os
 from dotenv import load_dotenv
 from intai.schemas.job_application import Candidate, JobApplication, JobApplicationInput
-from intai.schemas.job_posting import JobPosting
+from intai.schemas.job_posting import JobPosting, RescoreRequest
 from intai.schemas.company import Company
 from intai.schemas.jobs_chatbot_model import JobsChat
 from intai.schemas.screening_model import ScreeningRequest, ScreeningScoreRequest
 from intai.workers.candidate_worker import CandidateWorker
 from intai.workers.job_posting_worker import JobPostingWorker
 from intai.workers.job_application_worker import JobApplicationWorker
+from intai.workers.rescore_worker import rescore_job_posting
 from intai.ml.bot import Chatbot, ChatbotType
+from intai.ml.llm_client import get_single_flight_stats
+from intai.ml.rate_limiter import get_rate_limiter_stats
 from intai.utils.fe_utils import update_screening_result_frontend_service
-from intai.workers.screening_questions_worker import format_transcript, find_screening_score, generate_screening_questions
+from intai.workers.screening_questions_worker import aformat_transcript, afind_screening_score, agenerate_screening_questions
 #from intai.workers.job_application_actor import JobApplicationActor
 from intai.models.models import (
+    AsyncSessionLocal,
     SessionLocal,
     BackgroundTaskDb,
     BackgroundTaskTypeEnum,
@@ -47,6 +52,12 @@ async def main_route():
     return "Welcome to Intalent API!"
 
 
+@app.get("/llmstats")
+async def llm_stats():
+    """LLM rate limiter (queue wait times) and coalesced request stats."""
+    return {"rate_limiters": get_rate_limiter_stats(), "single_flight": get_single_flight_stats()}
+
+
 def _process_job_posting_task(job_posting: JobPosting, task_id: int):
     """Background task for processing job posting"""
     try:
@@ -135,8 +146,8 @@ async def process_job_posting(
         message_type=BackgroundTaskTypeEnum.JobPosting,
     )
     task_id = 0
-    with SessionLocal() as session:
-        bg_task.insert_background_task(session)
+    async with AsyncSessionLocal() as session:
+        await bg_task.ainsert_background_task(session)
         logger.debug(bg_task)
         task_id = bg_task.id
     assert task_id > 0
@@ -162,14 +173,14 @@ async def process_job_application(
     job_application = JobApplication(**job_application_input.model_dump())
     ja_str = str(job_application)
     task_id = 0
-    with SessionLocal() as session:
+    async with AsyncSessionLocal() as session:
         bg_task = BackgroundTaskDb(
             job_application_input.company_id,
             message=ja_str,
             message_type=BackgroundTaskTypeEnum.JobApplication,
         )
         logger.info(bg_task)
-        bg_task.insert_background_task(session)
+        await bg_task.ainsert_background_task(session)
         task_id = bg_task.id
 
     logger.debug(background_tasks)
@@ -185,6 +196,19 @@ async def process_job_application(
     }  #: bg_task.id}
 
 
+@app.post("/rescore")
+async def rescore(rescore_req: RescoreRequest):
+    """
+    Re-score all the applications of the JobPosting.
+
+    Uses the stored application skills so no LLM calls are made.
+    """
+    logger.info(f"API Call: Rescore: {rescore_req}")
+    return await asyncio.to_thread(
+        rescore_job_posting, rescore_req.company_id, rescore_req.client_job_id
+    )
+
+
 @app.post("/candidate")
 async def process_candidate(
     candidate: Candidate, background_tasks: BackgroundTasks
@@ -200,14 +224,14 @@ async def process_candidate(
     logger.info("API Call: Process Candidate: ", candidate)
     candidate_str = str(candidate)
     task_id = 0
-    with SessionLocal() as session:
+    async with AsyncSessionLocal() as session:
         bg_task = BackgroundTaskDb(
             candidate.company_id,
             message=candidate_str,
             message_type=BackgroundTaskTypeEnum.Candidate,
         )
         logger.info(bg_task)
-        bg_task.insert_background_task(session)
+        await bg_task.ainsert_background_task(session)
         task_id = bg_task.id
 
     logger.debug(background_tasks)
@@ -240,9 +264,9 @@ async def job_chat_request(chat_req: JobPostingChat, background_tasks: Backgroun
 
     """
     logger.info(f"API Call: Process Chat Request: {chat_req}")
-    with SessionLocal() as session:
+    async with AsyncSessionLocal() as session:
         bot = Chatbot(session, chat_req.company_id, chat_req.conversation_id)
-        job_posting = JobPostingDb.get_job_posting(
+        job_posting = await JobPostingDb.aget_job_posting(
             session, chat_req.company_id, chat_req.client_job_id
         )
         logger.debug(f"job posting: {job_posting}")
@@ -250,7 +274,7 @@ async def job_chat_request(chat_req: JobPostingChat, background_tasks: Backgroun
         resp = ""
         if job_posting:
             context["JobDescription"] = job_posting.extracted_text
-            resp = bot.start(context, chat_req.user_query)
+            resp = await bot.astart(context, chat_req.user_query)
             logger.debug(f"Response from bot: {resp}")
 
     # return StreamingResponse(stream_chat_response(), media_type="application/x-ndjson")
@@ -266,8 +290,8 @@ async def jobs_chat_request(chat_req: JobsChat, background_tasks: BackgroundTask
     logger.info(f"API Call: Process JobsChat Request: {chat_req}")
     # get the context doc for the company
 
-    with SessionLocal() as session:
-        company_info = CompanyDb.get_company(session, chat_req.company_id)
+    async with AsyncSessionLocal() as session:
+        company_info = await CompanyDb.aget_company(session, chat_req.company_id)
         if not company_info:
             raise Exception(f"Company Id not found for id: {chat_req.company_id}")
 
@@ -279,7 +303,7 @@ async def jobs_chat_request(chat_req: JobsChat, background_tasks: BackgroundTask
         context = {}
         """ extracted_text = company_info.context_doc
         context["JobsFAQ"] = extracted_text """
-        json_resp = bot.start(context, chat_req.user_query)
+        json_resp = await bot.astart(context, chat_req.user_query)
         logger.debug(f"Response from bot: {json_resp}")
 
         # if the response.intent is general_question send the question to qa bot
@@ -291,7 +315,7 @@ async def jobs_chat_request(chat_req: JobsChat, background_tasks: BackgroundTask
             context = {}
             extracted_text = company_info.context_doc
             context["JobsFAQ"] = extracted_text
-            json_resp = qa_bot.start(context, chat_req.user_query)
+            json_resp = await qa_bot.astart(context, chat_req.user_query)
             logger.debug(f"Response from QA bot: {json_resp}")
 
 
@@ -305,7 +329,7 @@ async def screening_questions(screening_req: ScreeningRequest, background_tasks:
     """
     logger.info(f"API Call: Process Screening Questions Request: {screening_req.job_application_id}, {screening_req.job_posting_id}, {screening_req.company_id}")
 
-    json_resp = generate_screening_questions(
+    json_resp = await agenerate_screening_questions(
         client_job_application_id=screening_req.job_application_id,
         client_job_id=screening_req.job_posting_id,
         company_id=screening_req.company_id,
@@ -321,9 +345,9 @@ async def screening_score(screening_req: ScreeningScoreRequest, background_tasks
     """
     logger.info(f"API Call: Process Screening Score Request: {screening_req.job_application_id}, {screening_req.job_posting_id}, {screening_req.company_id}")
 
-    formatted_transcript = format_transcript(screening_req.transcript, session_id=screening_req.job_application_id, client_id=screening_req.company_id)
+    formatted_transcript = await aformat_transcript(screening_req.transcript, session_id=screening_req.job_application_id, client_id=screening_req.company_id)
     logger.debug(f"Formatted transcript: {formatted_transcript}")
-    result_resp = find_screening_score(
+    result_resp = await afind_screening_score(
         client_job_application_id=screening_req.job_application_id,
         client_job_id=screening_req.job_posting_id,
         company_id=screening_req.company_id,
@@ -337,7 +361,7 @@ async def screening_score(screening_req: ScreeningScoreRequest, background_tasks
         "transcript": formatted_transcript
     }
     logger.info(f"Screening score response: {json_response}")
-    update_screening_result_frontend_service(json_response)
+    await asyncio.to_thread(update_screening_result_frontend_service, json_response)
 
     return json_response
 
@@ -33,11 +33,38 @@ from intai.ml.prompts.ja_basics_prompt import (
 )
 from intai.ml.prompts.generate_questions_prompt import get_generate_questions_prompt
 from intai.ml.prompts.format_transcript_prompt import get_format_transcript_system_prompt, get_format_transcript_user_prompts
+from intai.ml.utils.token_utils import count_message_tokens, get_token_limits, truncate_to_tokens
 from loguru import logger
 
+# Max tokens of the resume / JD / transcript text in a prompt.
+JA_TEXT_MAX_TOKENS = 12000
+JP_TEXT_MAX_TOKENS = 6000
+TRANSCRIPT_MAX_TOKENS = 24000
+# Tokens of the context window kept free for the count estimate error.
+CONTEXT_MARGIN_TOKENS = 64
+
 
 class AIPrompt:
-    """Provides a base class for prompts"""
+    """Provides a base class for prompts
+
+    CACHE_VERSION must be bumped when the prompt (or the parsing of its
+    response) changes so cached responses (see response_cache) aren't reused.
+
+    MAX_TOKENS is the completion budget of the prompt (None for the model max
+    output, only set it for prompts with a small fixed response size) and
+    SECTION_MAX_TOKENS the max tokens of each text section (ja_text, jp_text,
+    transcript), longer sections are truncated so the prompt and the
+    completion fit in the context window.
+    """
+
+    CACHE_ENABLED = True
+    CACHE_VERSION = 1
+    MAX_TOKENS = None
+    SECTION_MAX_TOKENS = {
+        "ja_text": JA_TEXT_MAX_TOKENS,
+        "jp_text": JP_TEXT_MAX_TOKENS,
+        "transcript": TRANSCRIPT_MAX_TOKENS,
+    }
 
     def __init__(self, prompt_messages: list[dict[str, str]], resp_schema: str = None):
         self._messages = prompt_messages
@@ -52,11 +79,33 @@ class AIPrompt:
     def response_schema(self):
         return self._response_schema
 
+    @classmethod
+    def truncate_section(cls, section: str, text: str) -> str:
+        """Truncate the text to the max tokens of the section."""
+        return truncate_to_tokens(text, cls.SECTION_MAX_TOKENS.get(section))
+
+    def count_tokens(self, model_name: str = None) -> int:
+        """Number of prompt tokens of the messages."""
+        return count_message_tokens(self._messages, model_name)
+
+    def get_max_tokens(self, model_name: str, prompt_tokens: int) -> int:
+        """Completion budget, MAX_TOKENS capped by the model output limit and the context left."""
+        context_window, max_output_tokens = get_token_limits(model_name)
+        max_tokens = min(self.MAX_TOKENS or max_output_tokens, max_output_tokens)
+        context_left = context_window - prompt_tokens - CONTEXT_MARGIN_TOKENS
+        if context_left < max_tokens:
+            logger.warning(
+                f"{type(self).__name__} has {prompt_tokens} prompt tokens, only {context_left} tokens left of {model_name} context"
+            )
+            max_tokens = max(context_left, 1)
+        return max_tokens
+
 
 class JobApplicationAIPrompt(AIPrompt):
     """Provides prompt for Job Application"""
 
     def __init__(self, ja_text: str):
+        ja_text = self.truncate_section("ja_text", ja_text)
         prompt_resume = get_resume_prompt(ja_text=ja_text)
         prompt_messages = [
             {"role": "system", "content": prompt_resume},
@@ -68,6 +117,7 @@ class JobPostingAIPrompt(AIPrompt):
     """Provide the prompt message for Job Posting."""
 
     def __init__(self, jp_text: str):
+        jp_text = self.truncate_section("jp_text", jp_text)
         prompt_messages = [
             {"role": "system", "content": prompt_jd_without_example},
             {
@@ -82,6 +132,8 @@ class FactorAnalysisAIPrompt(AIPrompt):
     """Provide the prompt message for Factor Analysis."""
 
     def __init__(self, jp_text: str, ja_text: str):
+        jp_text = self.truncate_section("jp_text", jp_text)
+        ja_text = self.truncate_section("ja_text", ja_text)
         system_prompt = get_factor_analysis_prompt(jp_text, ja_text)
         logger.trace(system_prompt)
         prompt_messages = [
@@ -94,6 +146,8 @@ class JobApplicationMatchSummaryAIPrompt(AIPrompt):
     """Provide the prompt message for JobApplication Matching summary."""
 
     def __init__(self, jp_text: str, ja_text: str):
+        jp_text = self.truncate_section("jp_text", jp_text)
+        ja_text = self.truncate_section("ja_text", ja_text)
         system_prompt = get_ja_matching_summary_system_prompt(jp_text, ja_text)
         logger.trace(system_prompt)
         prompt_messages = [
@@ -105,6 +159,9 @@ class JobApplicationMatchSummaryAIPrompt(AIPrompt):
 class MatchTitleAIPrompt(AIPrompt):
     """Provide the prompt message for Matching Titles."""
 
+    # NOTE: The response is always {"result": true/false}.
+    MAX_TOKENS = 256
+
     def __init__(self, jp_title: str, ja_titles: str):
         """Initializes the Match Title AI Prompt.
 
@@ -124,6 +181,9 @@ class MatchTitleAIPrompt(AIPrompt):
 class ChatbotAIPrompt(AIPrompt):
     """Provide the prompt message for Conversational Bot (Whatsapp/Single Job)."""
 
+    # NOTE: Conversations rarely repeat, don't fill the cache with them.
+    CACHE_ENABLED = False
+
     def __init__(
         self, context: dict[str, str], history: list[dict[str, str]], user_query: str
     ):
@@ -146,6 +206,8 @@ class ChatbotAIPrompt(AIPrompt):
 class JobsChatbotAIPrompt(AIPrompt):
     """Provide the prompt message for Conversational Jobs chatBot."""
 
+    CACHE_ENABLED = False
+
     def __init__(
         self, context: dict[str, str], history: list[dict[str, str]], user_query: str
     ):
@@ -170,6 +232,8 @@ class JobsChatbotAIPrompt(AIPrompt):
 class QAChatbotAIPrompt(AIPrompt):
     """Provide the prompt message for Conversational Jobs chatBot."""
 
+    CACHE_ENABLED = False
+
     def __init__(
         self, context: dict[str, str], history: list[dict[str, str]], user_query: str
     ):
@@ -194,6 +258,8 @@ class GenerateScreeningQuestionsAIPrompt(AIPrompt):
     """Provide the prompt message for Generationg of screening questions."""
 
     def __init__(self, jp_text: str, ja_text: str, screening_focus_area: str):
+        jp_text = self.truncate_section("jp_text", jp_text)
+        ja_text = self.truncate_section("ja_text", ja_text)
         system_prompt = get_generate_questions_prompt(jp_text, ja_text, screening_focus_area)
         logger.info(system_prompt)
         prompt_messages = [
@@ -205,6 +271,9 @@ class FindScreeningScoreAIPrompt(AIPrompt):
     """Provide the prompt message for Find screening score."""
 
     def __init__(self, jp_text: str, ja_text: str, transcript: str, screening_focus_area: str):
+        jp_text = self.truncate_section("jp_text", jp_text)
+        ja_text = self.truncate_section("ja_text", ja_text)
+        transcript = self.truncate_section("transcript", transcript)
         system_prompt = get_find_screening_score_prompt(jp_text, ja_text, transcript, screening_focus_area)
         logger.info(system_prompt)
         prompt_messages = [
@@ -215,7 +284,12 @@ class FindScreeningScoreAIPrompt(AIPrompt):
 class FormatTranscriptAIPrompt(AIPrompt):
     """Provide the prompt message for Formatting of transcript."""
 
+    # NOTE: The formatted transcript is as long as the transcript, keep the
+    # transcript within the max output of the model (MAX_TOKENS None).
+    SECTION_MAX_TOKENS = {**AIPrompt.SECTION_MAX_TOKENS, "transcript": 12000}
+
     def __init__(self, transcript: str):
+        transcript = self.truncate_section("transcript", transcript)
         system_prompt = get_format_transcript_system_prompt()
         logger.info(system_prompt)
         prompt_messages = [
@@ -237,6 +311,7 @@ class JobApplicationBasicsAIPrompt(AIPrompt):
         jp:title is title in job description.
         ja_titles is titles mentioned in the resume.
         """
+        ja_text = self.truncate_section("ja_text", ja_text)
         system_prompt = get_ja_basics_system_prompt()
         user_prompts = get_ja_basics_user_prompts(ja_text=ja_text)
         response_schema = get_ja_basics_response_schema()
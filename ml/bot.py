@@ -2,7 +2,7 @@
 
 from intai.ml.ai_prompt import ChatbotAIPrompt, JobsChatbotAIPrompt, QAChatbotAIPrompt
 from intai.ml.bot_memory import ChatbotMemory
-from intai.ml.llm_client import LLMClient
+from intai.ml.llm_client import AsyncLLMClient, LLMClient
 from intai.ml.utils.llm_types import LLMModelType, LLMResponseType
 from intai.utils.str_utils import check_str_not_null
 from loguru import logger
@@ -79,8 +79,7 @@ class Chatbot:
         logger.debug(f"{self.memory} type: {self.type}")
         logger.debug("Bot init")
 
-    def add_message_to_memory(self, user_query: str, ai_response: str):
-        """Add the message to the memory and persist if needed"""
+    def _turn_messages(self, user_query: str, ai_response: str):
         user_bot_message = BotMessage(user_query, BotMessageType.HUMAN)
         ai_bot_message = BotMessage(ai_response, BotMessageType.AI)
 
@@ -92,15 +91,28 @@ class Chatbot:
 
         # TODO Summarize if the length of memory is greater than say 20 messages?
         # TODO Store this memory in database. NOTE: In database we always summarize and store.
-        turn_messages = turn.as_list()
-        for item in turn_messages:
+        return turn.as_list()
+
+    def add_message_to_memory(self, user_query: str, ai_response: str):
+        """Add the message to the memory and persist if needed"""
+        for item in self._turn_messages(user_query, ai_response):
             self.memory.add_message(self.session, self.conversation_id, item.as_dict())
 
+    async def aadd_message_to_memory(self, user_query: str, ai_response: str):
+        """Add the message to the memory and persist if needed (async session)"""
+        for item in self._turn_messages(user_query, ai_response):
+            await self.memory.aadd_message(self.session, self.conversation_id, item.as_dict())
+
     def get_memory(self):
         return self.memory.get_messages_by_conversation(
             self.session, self.conversation_id
         )
 
+    async def aget_memory(self):
+        return await self.memory.aget_messages_by_conversation(
+            self.session, self.conversation_id
+        )
+
     def start(
         self,
         context: dict[str, str],
@@ -128,42 +140,80 @@ class Chatbot:
 
         # TODO Summarize if needed.
 
-    def _call(self, user_query: str):
+    async def astart(
+        self,
+        context: dict[str, str],
+        user_query: str = "",
+    ):
+        """Start the conversation bot with an AsyncSession (see start)."""
+        logger.debug(
+            f"bot context: {context}; user_query: {user_query}; chatbot_type: {self.type}; conversation_id: {self.conversation_id}"
+        )
+        self.context = context
+        memory = await self.aget_memory()
 
-        prompt = ""
-        ai_client: OpenAIClient = LLMClient(client_id=self.company_id, session_id=self.conversation_id)
+        if check_str_not_null(user_query):
+            return await self.apredict(user_query)
+        elif not memory or len(memory) == 0:
+            return await self._acall("Whats up?")
+
+    def _get_prompt(self, memory, user_query: str):
+        """Get the (prompt, get_model_response kwargs) for the chatbot type."""
         if self.type == ChatbotType.Jobs:
             logger.debug("In Call for Jobs Chatbot")
-            prompt = JobsChatbotAIPrompt(self.context, self.get_memory(), user_query)
-            response = ai_client.get_model_response(prompt, response_type = LLMResponseType.JSON_SCHEMA, response_json=prompt.response_schema)
+            prompt = JobsChatbotAIPrompt(self.context, memory, user_query)
+            return prompt, {"response_type": LLMResponseType.JSON_SCHEMA, "response_json": prompt.response_schema}
 
         elif self.type == ChatbotType.QA:
             logger.debug("In Call for QA Chatbot")
 
             prompt = QAChatbotAIPrompt(
                 self.context,
-                self.get_memory(),
+                memory,
                 user_query,
             )
-        
-            response = ai_client.get_model_response(prompt, response_type = LLMResponseType.JSON_SCHEMA, response_json=prompt.response_schema)
-        else: 
+            return prompt, {"response_type": LLMResponseType.JSON_SCHEMA, "response_json": prompt.response_schema}
 
-            logger.debug("In Call for Single Job Chatbot")
+        logger.debug("In Call for Single Job Chatbot")
 
-            prompt = ChatbotAIPrompt(
-                self.context,
-                self.get_memory(),
-                user_query,
-            )
-        
-            response = ai_client.get_model_response(prompt, response_type=LLMResponseType.JSON_OBJECT)
+        prompt = ChatbotAIPrompt(
+            self.context,
+            memory,
+            user_query,
+        )
+        return prompt, {"response_type": LLMResponseType.JSON_OBJECT}
+
+    def _call(self, user_query: str):
+
+        ai_client: OpenAIClient = LLMClient(client_id=self.company_id, session_id=self.conversation_id)
+        prompt, kwargs = self._get_prompt(self.get_memory(), user_query)
+        response = ai_client.get_model_response(prompt, **kwargs)
         self.add_message_to_memory(user_query=user_query, ai_response=response)
         logger.debug(
             f"query: {user_query}\n response: {response}\n memory: {self.memory} "
         )
         return response
 
+    async def _acall(self, user_query: str):
+        ai_client = AsyncLLMClient(client_id=self.company_id, session_id=self.conversation_id)
+        prompt, kwargs = self._get_prompt(await self.aget_memory(), user_query)
+        response = await ai_client.aget_model_response(prompt, **kwargs)
+        await self.aadd_message_to_memory(user_query=user_query, ai_response=response)
+        logger.debug(
+            f"query: {user_query}\n response: {response}\n memory: {self.memory} "
+        )
+        return response
+
+    async def apredict(self, user_query: str):
+        """Async predict (see predict) for a bot created with an AsyncSession."""
+        response = ""
+        if check_str_not_null(user_query):
+            response = await self._acall(user_query)
+        else:
+            logger.error("user message is null for conversation: {self}")
+
+        return response
+
     def predict(self, user_query: str):
         """Call OpenAI to get the next response based on context. This function is supposed to
         always be called with the user-query"""
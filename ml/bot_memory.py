@@ -39,8 +39,17 @@ class ChatbotMemory:
         )
         job_conversation_db.insert_job_conversation_chat(session)
 
-    def add_message(self, session, conversation_id: str, message: dict[str, str]):
-        """Add the message for conversation to memory"""
+    async def astore_db(self, session, conversation_id, company_id, message):
+        """Store the conversation in database (async session)"""
+        job_conversation_db = JobConversationChatDb(
+            conversation_id=conversation_id,
+            company_id=company_id,
+            message=message,
+        )
+        await job_conversation_db.ainsert_job_conversation_chat(session)
+
+    def _append_message(self, conversation_id: str, message: dict[str, str]):
+        """Append the message to the in-memory conversation and pack it for the db"""
         if conversation_id not in self._memory:
             self._memory[conversation_id] = []
 
@@ -48,6 +57,11 @@ class ChatbotMemory:
         msgs_conv.append(message)
         message_bytes = msgpack.packb(msgs_conv)
         logger.debug(f"message_bytes: {message_bytes}")
+        return message_bytes
+
+    def add_message(self, session, conversation_id: str, message: dict[str, str]):
+        """Add the message for conversation to memory"""
+        message_bytes = self._append_message(conversation_id, message)
         self.store_db(
             session,
             conversation_id=conversation_id,
@@ -55,6 +69,16 @@ class ChatbotMemory:
             message=message_bytes,
         )
 
+    async def aadd_message(self, session, conversation_id: str, message: dict[str, str]):
+        """Add the message for conversation to memory (async session)"""
+        message_bytes = self._append_message(conversation_id, message)
+        await self.astore_db(
+            session,
+            conversation_id=conversation_id,
+            company_id=self.company_id,
+            message=message_bytes,
+        )
+
     def get_messages_by_conversation(self, session, conversation_id: str):
         """Get the messages by conversation id.
 
@@ -67,6 +91,20 @@ class ChatbotMemory:
         job_conversation_chat_db = JobConversationChatDb.get_job_conversation_chat(
             session, self.company_id, conversation_id
         )
+        return self._load_messages(conversation_id, job_conversation_chat_db)
+
+    async def aget_messages_by_conversation(self, session, conversation_id: str):
+        """Get the messages by conversation id (async session)."""
+        if conversation_id in self._memory:
+            return self._memory[conversation_id]
+
+        job_conversation_chat_db = await JobConversationChatDb.aget_job_conversation_chat(
+            session, self.company_id, conversation_id
+        )
+        return self._load_messages(conversation_id, job_conversation_chat_db)
+
+    def _load_messages(self, conversation_id: str, job_conversation_chat_db):
+        """Unpack the messages loaded from the database into memory."""
         dict_message = None
         if job_conversation_chat_db:
             message_bytes = job_conversation_chat_db.message
@@ -0,0 +1,293 @@
+"""Offline skill clustering which regenerates the cluster config files.
+
+cluster_embeddings.npy, cluster_names.json and skill_lookup.json map every
+skill in the vocabulary to a standard (cluster center) skill. New skills
+keep getting appended to the embedding store, and skills missing from the
+lookup need a live embedding call to find their cluster center.
+
+The pipeline runs mini-batch k-means over the embedding store:
+  * incremental (default): the existing centers are updated with only the
+    skills which are not in the skill lookup yet, existing skills keep their
+    cluster and clusters keep their names.
+  * full (--full): re-clusters the whole vocabulary from scratch and names
+    each cluster by its member closest to the center.
+
+Every run writes a new version under config/clusters/v<N>/ and then swaps
+the live config files with atomic renames.
+
+Run with `python -m intai.ml.clustering_utils [--full] [--clusters K]`.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+import intai.config as config
+from intai.ml.embedding_store import SkillEmbeddingStore
+
+CLUSTERS_DIR_NAME = "clusters"
+STATE_FILE_NAME = "clustering_state.json"
+
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_EPOCHS = 10
+DEFAULT_KEEP_VERSIONS = 3
+
+
+def _normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def assign_clusters(embeddings, centers, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Get the index of the nearest (cosine) center for every normalized embedding."""
+    centers = _normalize_rows(centers)
+    labels = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), batch_size):
+        batch = embeddings[start : start + batch_size]
+        labels[start : start + batch_size] = np.argmax(batch @ centers.T, axis=1)
+    return labels
+
+
+def minibatch_kmeans(
+    embeddings,
+    centers,
+    counts,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    epochs: int = DEFAULT_EPOCHS,
+    seed: int = 0,
+):
+    """Update the centers with mini-batch k-means (Sculley 2010).
+
+    Every center moves towards its assigned rows with a per center learning
+    rate of 1 / count, so centers which already represent many skills move
+    little. Returns the updated (centers, counts).
+    """
+    rng = np.random.default_rng(seed)
+    centers = np.array(centers, dtype=np.float32)
+    counts = np.array(counts, dtype=np.float64)
+    for _ in range(epochs):
+        order = rng.permutation(len(embeddings))
+        for start in range(0, len(order), batch_size):
+            batch = embeddings[order[start : start + batch_size]]
+            labels = assign_clusters(batch, centers, batch_size=batch_size)
+            batch_counts = np.bincount(labels, minlength=len(centers))
+            batch_sums = np.zeros_like(centers)
+            np.add.at(batch_sums, labels, batch)
+            updated = batch_counts > 0
+            counts[updated] += batch_counts[updated]
+            # Equivalent to moving the center by 1 / count for each row.
+            rate = (batch_counts[updated] / counts[updated])[:, None]
+            batch_means = batch_sums[updated] / batch_counts[updated][:, None]
+            centers[updated] += rate * (batch_means - centers[updated])
+    return centers, counts
+
+
+def _init_centers(embeddings, n_clusters: int, seed: int = 0):
+    """Pick distinct initial centers with a greedy k-means++ style sampling."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(embeddings), max(n_clusters * 20, 10000))
+    sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+    chosen = [int(rng.integers(sample_size))]
+    distances = 1.0 - sample @ sample[chosen[0]]
+    for _ in range(1, n_clusters):
+        probabilities = np.clip(distances, 0, None) ** 2
+        total = probabilities.sum()
+        if total == 0:
+            row = int(rng.integers(sample_size))
+        else:
+            row = int(rng.choice(sample_size, p=probabilities / total))
+        chosen.append(row)
+        distances = np.minimum(distances, 1.0 - sample @ sample[row])
+    return sample[chosen].copy()
+
+
+def _name_clusters(embeddings, skills: list[str], centers, labels) -> list[str]:
+    """Name every cluster by its member closest to the center."""
+    centers = _normalize_rows(centers)
+    similarities = np.einsum("ij,ij->i", embeddings, centers[labels])
+    names = [None] * len(centers)
+    # Rows sorted by cluster and then by decreasing similarity.
+    for row in np.lexsort((-similarities, labels)):
+        label = labels[row]
+        if names[label] is None:
+            names[label] = skills[row]
+    # Empty clusters get the nearest skill overall.
+    for label, name in enumerate(names):
+        if name is None:
+            names[label] = skills[int(np.argmax(embeddings @ centers[label]))]
+    return names
+
+
+class ClusteringState:
+    """Version and cluster sizes of the last clustering run."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.version = 0
+        self.cluster_sizes = None
+        self.vocabulary_size = 0
+        if path.exists():
+            with path.open() as file:
+                state = json.load(file)
+            self.version = state["version"]
+            self.cluster_sizes = state["cluster_sizes"]
+            self.vocabulary_size = state["vocabulary_size"]
+
+    def save(self):
+        _atomic_write_json(
+            self.path,
+            {
+                "version": self.version,
+                "cluster_sizes": self.cluster_sizes,
+                "vocabulary_size": self.vocabulary_size,
+                "updated_at": time.time(),
+            },
+        )
+
+
+def _atomic_write_json(path: Path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _atomic_copy(source: Path, target: Path):
+    tmp_path = target.with_name(target.name + ".tmp")
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _write_version(version_dir: Path, centers, cluster_names: list[str], skill_lookup: dict):
+    """Write the artifacts for one version and swap them in as the live config files."""
+    version_dir.mkdir(parents=True, exist_ok=True)
+    artifacts = {
+        config.CLUSTER_EMBEDDINGS_CONFIG_PATH: version_dir / config.CLUSTER_EMBEDDINGS_CONFIG_PATH.name,
+        config.CLUSTER_NAMES_CONFIG_PATH: version_dir / config.CLUSTER_NAMES_CONFIG_PATH.name,
+        config.SKILL_CONFIG_PATH: version_dir / config.SKILL_CONFIG_PATH.name,
+    }
+    np.save(artifacts[config.CLUSTER_EMBEDDINGS_CONFIG_PATH], np.asarray(centers, dtype=np.float32))
+    with artifacts[config.CLUSTER_NAMES_CONFIG_PATH].open("w") as file:
+        json.dump(cluster_names, file)
+    with artifacts[config.SKILL_CONFIG_PATH].open("w") as file:
+        json.dump(skill_lookup, file)
+
+    # NOTE: The skill index keeps its previous clusters if it sees the
+    # embeddings and names of different versions in the middle of the swap.
+    for live_path, version_path in artifacts.items():
+        _atomic_copy(version_path, live_path)
+
+
+def _prune_versions(clusters_dir: Path, keep: int):
+    versions = sorted(
+        (path for path in clusters_dir.glob("v*") if path.name[1:].isdigit()),
+        key=lambda path: int(path.name[1:]),
+    )
+    for path in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(path)
+
+
+def run_clustering(
+    full: bool = False,
+    n_clusters: int = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    epochs: int = DEFAULT_EPOCHS,
+    keep_versions: int = DEFAULT_KEEP_VERSIONS,
+    seed: int = 0,
+):
+    """Cluster the skill vocabulary and write a new version of the cluster files.
+
+    Returns the new version number or None when nothing changed.
+    """
+    start_time = time.perf_counter()
+    config_dir = config.SKILL_CONFIG_PATH.parent
+    clusters_dir = config_dir / CLUSTERS_DIR_NAME
+    state = ClusteringState(config_dir / STATE_FILE_NAME)
+
+    store = SkillEmbeddingStore()
+    skills = store.skills[: store.count]
+    embeddings = _normalize_rows(store.embeddings)
+    logger.info(f"Clustering {store} full: {full}")
+
+    if full:
+        n_clusters = n_clusters or len(config.load_cluster_names())
+        centers = _init_centers(embeddings, n_clusters, seed=seed)
+        centers, counts = minibatch_kmeans(
+            embeddings, centers, np.zeros(n_clusters), batch_size, epochs, seed
+        )
+        labels = assign_clusters(embeddings, centers, batch_size)
+        cluster_names = _name_clusters(embeddings, skills, centers, labels)
+        skill_lookup = {skill: cluster_names[label] for skill, label in zip(skills, labels)}
+        counts = np.bincount(labels, minlength=n_clusters)
+    else:
+        skill_lookup = config.load_skill_lookup()
+        cluster_names = config.load_cluster_names()
+        centers = _normalize_rows(np.load(str(config.CLUSTER_EMBEDDINGS_CONFIG_PATH)))
+        new_rows = np.array(
+            [row for row, skill in enumerate(skills) if skill not in skill_lookup], dtype=np.int64
+        )
+        if len(new_rows) == 0:
+            logger.info("All skills are in the skill lookup, nothing to cluster.")
+            return None
+
+        if state.cluster_sizes is not None and len(state.cluster_sizes) == len(cluster_names):
+            counts = np.array(state.cluster_sizes, dtype=np.float64)
+        else:
+            name_to_label = {name: label for label, name in enumerate(cluster_names)}
+            counts = np.ones(len(cluster_names))
+            for name in skill_lookup.values():
+                if name in name_to_label:
+                    counts[name_to_label[name]] += 1
+
+        new_embeddings = embeddings[new_rows]
+        centers, counts = minibatch_kmeans(new_embeddings, centers, counts, batch_size, epochs=1, seed=seed)
+        labels = assign_clusters(new_embeddings, centers, batch_size)
+        for row, label in zip(new_rows, labels):
+            skill_lookup[skills[row]] = cluster_names[label]
+        logger.info(f"Assigned {len(new_rows)} new skills to clusters")
+
+    state.version += 1
+    state.cluster_sizes = [float(count) for count in counts]
+    state.vocabulary_size = len(skills)
+    _write_version(clusters_dir / f"v{state.version}", centers, cluster_names, skill_lookup)
+    state.save()
+    _prune_versions(clusters_dir, keep_versions)
+    logger.info(
+        f"Wrote cluster version {state.version}: clusters: {len(cluster_names)}; "
+        f"skills: {len(skill_lookup)} in {time.perf_counter() - start_time:.1f} seconds"
+    )
+    return state.version
+
+
+def start():
+    """Launch with `python -m intai.ml.clustering_utils`."""
+    parser = argparse.ArgumentParser(description="Regenerate the skill cluster config files.")
+    parser.add_argument("--full", action="store_true", help="re-cluster the whole vocabulary")
+    parser.add_argument("--clusters", type=int, default=None, help="number of clusters for --full")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS, help="epochs for --full")
+    parser.add_argument("--keep-versions", type=int, default=DEFAULT_KEEP_VERSIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run_clustering(
+        full=args.full,
+        n_clusters=args.clusters,
+        batch_size=args.batch_size,
+        epochs=args.epochs,
+        keep_versions=args.keep_versions,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,135 @@
+"""Persistent cache of text embeddings.
+
+Embeddings are stored in sqlite keyed by model name and normalized text with
+an in process LRU in front of it, so a skill is only ever embedded once no
+matter how many applications mention it.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+
+from intai.config import EMBEDDING_CACHE_PATH
+
+# Max number of embeddings kept in the in process LRU.
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "20000"))
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Normalize the text used as cache key (and sent for embedding)."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """Sqlite backed embedding cache with an in memory LRU.
+
+    Use get_embedding_cache() to get the process wide instance.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, lru_size: int = EMBEDDING_CACHE_LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " PRIMARY KEY (model, text))"
+        )
+
+    def __repr__(self):
+        return "<EmbeddingCache: path: {}; stats: {}>".format(self.path, self.stats())
+
+    def stats(self) -> dict:
+        """Hit and miss counts since the cache was created."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remember(self, key, embedding):
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, np.ndarray]:
+        """Get the cached embeddings for the normalized texts.
+
+        Returns {text: embedding} for the texts found in the cache.
+        """
+        found = {}
+        with self._lock:
+            disk_texts = []
+            for text in dict.fromkeys(texts):
+                embedding = self._lru.get((model, text))
+                if embedding is not None:
+                    self._lru.move_to_end((model, text))
+                    found[text] = embedding
+                    self.memory_hits += 1
+                else:
+                    disk_texts.append(text)
+
+            disk_hits = 0
+            # NOTE: sqlite limits the number of bound parameters per statement.
+            for i in range(0, len(disk_texts), 500):
+                chunk = disk_texts[i : i + 500]
+                rows = self._conn.execute(
+                    "SELECT text, embedding FROM embeddings WHERE model = ? AND text IN ({})".format(
+                        ",".join("?" * len(chunk))
+                    ),
+                    [model, *chunk],
+                ).fetchall()
+                for text, blob in rows:
+                    embedding = np.frombuffer(blob, dtype=np.float32)
+                    found[text] = embedding
+                    self._remember((model, text), embedding)
+                    disk_hits += 1
+            self.disk_hits += disk_hits
+            self.misses += len(disk_texts) - disk_hits
+        return found
+
+    def put_many(self, model: str, embeddings: dict[str, np.ndarray]):
+        """Store the embeddings for the normalized texts."""
+        if not embeddings:
+            return
+        with self._lock:
+            rows = []
+            for text, embedding in embeddings.items():
+                embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+                self._remember((model, text), embedding)
+                rows.append((model, text, embedding.tobytes()))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, embedding) VALUES (?, ?, ?)",
+                rows,
+            )
+        logger.debug(f"Stored {len(embeddings)} embeddings in {self}")
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process wide EmbeddingCache."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
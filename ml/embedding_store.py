@@ -0,0 +1,328 @@
+"""Append only store for the skill vocabulary and embeddings.
+
+embeddings.npy and unique_skills.json are the initial base. New skills are
+appended to a fixed width float32 segment file (memory mapped for reading)
+and a write ahead log with one skill name per line, so adding a skill costs
+O(new rows) instead of rewriting the whole vocabulary. Once the log grows
+past a threshold it is compacted into new base files.
+
+Every compaction writes a new generation of files (embeddings.g<N>.npy,
+unique_skills.g<N>.json and an empty log skill_embeddings.g<N>.wal/.f32) and
+commits it with a single os.replace of the meta file which names the
+generation and its base row count. Readers load whatever the meta file
+names, so a crash in the middle of a compaction leaves the previous
+generation in place. Files of older generations are deleted afterwards.
+
+NOTE: Writers across processes are serialized with an exclusive flock on a
+lock file and readers take a shared flock while catching up with the log.
+A row is committed only once its skill name line is in the log, so a
+crashed writer can at most leave a torn tail which the next writer drops.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+import intai.config as config
+
+SEGMENT_FILE_NAME = "skill_embeddings.f32"
+WAL_FILE_NAME = "skill_embeddings.wal"
+META_FILE_NAME = "skill_embeddings.meta.json"
+LOCK_FILE_NAME = "skill_embeddings.lock"
+
+# Number of rows in the log after which it is folded into the base files.
+COMPACTION_THRESHOLD = int(os.getenv("SKILL_STORE_COMPACTION_ROWS", "1000"))
+
+_FLOAT32_SIZE = np.dtype(np.float32).itemsize
+
+
+class SkillEmbeddingStore:
+    """Skill names and float32 embeddings backed by base files plus a log.
+
+    skills, embeddings and skill_to_row always describe the first `count`
+    rows. New rows written by this or another process become visible after
+    refresh() without reloading the base files.
+    """
+
+    def __init__(
+        self,
+        embeddings_path: Path = None,
+        skills_path: Path = None,
+        compaction_threshold: int = COMPACTION_THRESHOLD,
+    ):
+        self._embeddings_path = Path(embeddings_path or config.EMBEDDINGS_CONFIG_PATH)
+        self._skills_path = Path(skills_path or config.UNIQUE_SKILL_CONFIG_PATH)
+        self._config_dir = self._embeddings_path.parent
+        self._meta_path = self._config_dir / META_FILE_NAME
+        self._lock_path = self._config_dir / LOCK_FILE_NAME
+        self.compaction_threshold = compaction_threshold
+
+        self._lock = threading.RLock()
+        self._change_marker = None
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._load_base()
+
+    def __repr__(self):
+        return "<SkillEmbeddingStore: rows: {}; log rows: {}; dim: {}; generation: {}>".format(
+            self._count, self._wal_rows, self._dim, self._generation
+        )
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    @property
+    def skills(self) -> list[str]:
+        return self._skills
+
+    @property
+    def skill_to_row(self) -> dict[str, int]:
+        return self._skill_to_row
+
+    @property
+    def embeddings(self):
+        """Contiguous float32 matrix of shape (count, dim)."""
+        return self._matrix[: self._count]
+
+    @contextmanager
+    def _file_lock(self, operation):
+        with open(self._lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> dict:
+        if not self._meta_path.exists():
+            return {"generation": 0}
+        with self._meta_path.open() as file:
+            return json.load(file)
+
+    def _set_generation(self, meta: dict):
+        """Point the base and log paths to the files of the generation in meta."""
+        self._generation = meta["generation"]
+        if "embeddings" in meta:
+            config_dir = self._meta_path.parent
+            self._base_embeddings_path = config_dir / meta["embeddings"]
+            self._base_skills_path = config_dir / meta["skills"]
+            self._segment_path = _generation_path(self._config_dir / SEGMENT_FILE_NAME, self._generation)
+            self._wal_path = _generation_path(self._config_dir / WAL_FILE_NAME, self._generation)
+        else:
+            # NOTE: The configured base files and log, before the first compaction.
+            self._base_embeddings_path = self._embeddings_path
+            self._base_skills_path = self._skills_path
+            self._segment_path = self._config_dir / SEGMENT_FILE_NAME
+            self._wal_path = self._config_dir / WAL_FILE_NAME
+
+    def _get_change_marker(self):
+        """Cheap stat based marker which changes on append or compaction."""
+        wal_size = self._wal_path.stat().st_size if self._wal_path.exists() else 0
+        meta_mtime = (
+            self._meta_path.stat().st_mtime_ns if self._meta_path.exists() else 0
+        )
+        return wal_size, meta_mtime
+
+    def _load_base(self):
+        """Load the base files of the current generation and then the rows in the log."""
+        meta = self._read_meta()
+        self._set_generation(meta)
+        assert self._base_embeddings_path.exists() and self._base_skills_path.exists()
+        base = np.load(str(self._base_embeddings_path), mmap_mode="r")
+        with self._base_skills_path.open() as file:
+            skills = json.load(file)
+        assert len(skills) == len(base) == meta.get("base_rows", len(base))
+
+        self._dim = base.shape[1]
+        self._matrix = np.empty((max(len(skills) * 2, 1024), self._dim), dtype=np.float32)
+        self._matrix[: len(skills)] = base
+        self._skills = []
+        self._skill_to_row = {}
+        self._count = 0
+        self._add_rows(skills)
+        self._wal_rows = 0
+        self._wal_offset = 0
+        self._tail_wal()
+        logger.info(f"Loaded {self}")
+
+    def _add_rows(self, skills, rows=None):
+        """Add rows to the in memory matrix.
+
+        NOTE: The matrix is filled before count is moved, so readers holding
+        the previous count never see a partially written row.
+        """
+        start = self._count
+        end = start + len(skills)
+        if rows is not None:
+            if end > len(self._matrix):
+                matrix = np.empty((max(end, len(self._matrix) * 2), self._dim), dtype=np.float32)
+                matrix[:start] = self._matrix[:start]
+                self._matrix = matrix
+            self._matrix[start:end] = rows
+        for row, skill in enumerate(skills, start=start):
+            self._skills.append(skill)
+            self._skill_to_row.setdefault(skill, row)
+        self._count = end
+
+    def _tail_wal(self):
+        """Read the log lines and segment rows written since the last call."""
+        self._change_marker = self._get_change_marker()
+        if not self._wal_path.exists():
+            return
+        with self._wal_path.open("rb") as file:
+            file.seek(self._wal_offset)
+            data = file.read()
+        # Ignore a torn last line from a writer in the middle of an append.
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        new_skills = [json.loads(line) for line in data[:end].splitlines()]
+        wal_rows = self._wal_rows + len(new_skills)
+        segment = np.memmap(
+            self._segment_path, dtype=np.float32, mode="r", shape=(wal_rows, self._dim)
+        )
+        self._add_rows(new_skills, segment[self._wal_rows :])
+        del segment
+        self._wal_rows = wal_rows
+        self._wal_offset += end
+
+    def _refresh_locked(self):
+        if self._read_meta()["generation"] != self._generation:
+            logger.info("Skill embedding store was compacted, reloading base.")
+            self._load_base()
+        else:
+            self._tail_wal()
+
+    def refresh(self):
+        """Catch up with rows appended by other processes."""
+        if self._get_change_marker() == self._change_marker:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._refresh_locked()
+
+    def append(self, skills: list[str], embeddings) -> int:
+        """Append new skills with their embeddings.
+
+        Skills already in the store are skipped. Returns the number of rows
+        added.
+        """
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            new_skills = []
+            new_rows = []
+            for skill, embedding in zip(skills, embeddings):
+                if skill in self._skill_to_row or skill in new_skills:
+                    continue
+                new_skills.append(skill)
+                new_rows.append(embedding)
+            if not new_skills:
+                return 0
+
+            rows = np.asarray(new_rows, dtype=np.float32).reshape(len(new_skills), self._dim)
+            with open(self._segment_path, "a+b") as file:
+                # Drop rows of a writer which crashed before committing to the log.
+                file.truncate(self._wal_rows * self._dim * _FLOAT32_SIZE)
+                file.write(rows.tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+
+            wal_lines = b"".join(json.dumps(skill).encode() + b"\n" for skill in new_skills)
+            with open(self._wal_path, "a+b") as file:
+                file.truncate(self._wal_offset)
+                file.write(wal_lines)
+                file.flush()
+                os.fsync(file.fileno())
+
+            self._add_rows(new_skills, rows)
+            self._wal_rows += len(new_skills)
+            self._wal_offset += len(wal_lines)
+            self._change_marker = self._get_change_marker()
+            logger.info(f"Appended {len(new_skills)} skills to {self}")
+
+            if self._wal_rows >= self.compaction_threshold:
+                self._compact_locked()
+            return len(new_skills)
+
+    def compact(self):
+        """Fold the log into the base files."""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if self._wal_rows == 0:
+            return
+        logger.info(f"Compacting {self}")
+        generation = self._generation + 1
+        embeddings_path = _generation_path(self._embeddings_path, generation)
+        skills_path = _generation_path(self._skills_path, generation)
+        _write_synced(embeddings_path, "wb", lambda file: np.save(file, self.embeddings))
+        _write_synced(skills_path, "w", lambda file: json.dump(self._skills, file))
+        # NOTE: The generation isn't committed yet, drop any stale log files of it.
+        for path in (self._config_dir / SEGMENT_FILE_NAME, self._config_dir / WAL_FILE_NAME):
+            _generation_path(path, generation).unlink(missing_ok=True)
+
+        meta = {
+            "generation": generation,
+            "base_rows": self._count,
+            "embeddings": embeddings_path.name,
+            "skills": skills_path.name,
+        }
+        meta_tmp = self._meta_path.with_name(self._meta_path.name + ".tmp")
+        _write_synced(meta_tmp, "w", lambda file: json.dump(meta, file))
+        os.replace(meta_tmp, self._meta_path)
+        _fsync_dir(self._config_dir)
+
+        self._set_generation(meta)
+        self._wal_rows = 0
+        self._wal_offset = 0
+        self._change_marker = self._get_change_marker()
+        self._remove_old_generations()
+        logger.info(f"Compacted {self}")
+
+    def _remove_old_generations(self):
+        """Delete the base and log files of the generations before the current one.
+
+        NOTE: The configured base files are the initial generation and are kept.
+        """
+        for path in (self._config_dir / SEGMENT_FILE_NAME, self._config_dir / WAL_FILE_NAME):
+            path.unlink(missing_ok=True)
+        for path in (
+            self._embeddings_path,
+            self._skills_path,
+            self._config_dir / SEGMENT_FILE_NAME,
+            self._config_dir / WAL_FILE_NAME,
+        ):
+            for old_path in path.parent.glob(f"{path.stem}.g*{path.suffix}"):
+                generation = old_path.name[len(path.stem) + 2 : len(old_path.name) - len(path.suffix)]
+                if generation.isdigit() and int(generation) != self._generation:
+                    old_path.unlink(missing_ok=True)
+
+
+def _generation_path(path: Path, generation: int) -> Path:
+    return path.with_name(f"{path.stem}.g{generation}{path.suffix}")
+
+
+def _write_synced(path: Path, mode: str, write):
+    with open(path, mode) as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
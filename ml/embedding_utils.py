@@ -1,79 +1,87 @@
 #!/usr/bin/env python3
 from .utils.llm_types import LLMModelType
 from .llm_client import LLMClient
-from intai.config import load_config_files
+from .cluster_index import ClusterCenterIndex
+from .skill_canonicalizer import get_skill_canonicalizer
+from .skill_index import get_skill_index
 from loguru import logger
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from intai.config import EMBEDDINGS_CONFIG_PATH, UNIQUE_SKILL_CONFIG_PATH
-import os
-import json
 
 
 def find_nearest_cluster_center(skill_embedding, cluster_embeddings, cluster_names):
     """Find the nearest cluster center based on skill and cluster embeddings.
 
     NOTE: skill_embedding is calculated for this instance while cluster embedding and names
-    are loaded from the config file.
+    are loaded from the config file. Prefer the cluster_index of the skill index
+    which is built once for the loaded clusters.
     """
     logger.debug(
         f"cluster_names_len: {len(cluster_names)}\n cluster_embeddings_len: {len(cluster_embeddings)}"
     )
-    similarities = cosine_similarity([skill_embedding], cluster_embeddings)[0]
-    nearest_cluster_index = np.argmax(similarities)
-    logger.debug(
-        f"nearest_cluster_idx: {nearest_cluster_index}\n clustern_names_length: {len(cluster_names)}"
-    )
-    if len(cluster_names) >= nearest_cluster_index:
-        return cluster_names[nearest_cluster_index]
+    return ClusterCenterIndex(cluster_embeddings, cluster_names).nearest_names([skill_embedding])[0]
+
+
+def normalize_embeddings(embeddings):
+    """L2 normalize the rows so a dot product gives the cosine similarity."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def resolve_skill_embeddings(skills: [str], ai_client: LLMClient):
+    """Resolve every distinct skill to a normalized embedding row once.
+
+    Spelling variants resolve to the row of their canonical skill (see
+    SkillCanonicalizer). Skills still not found are embedded and merged
+    into the vocabulary.
+    Returns ({skill_name_lower: row}, normalized matrix of shape (n, d)).
+    """
+    canonicalizer = get_skill_canonicalizer()
+    canonical_rows = canonicalizer.get_rows(skills)
+    new_skills = [skill for skill, row in canonical_rows.items() if row is None]
+    if new_skills:
+        logger.info(f"Skills {new_skills} not found in the lookup, creating embeddings")
+        new_embeddings = ai_client.get_embeddings_batch(new_skills)
+        canonical_rows.update(canonicalizer.add_skills(new_skills, new_embeddings))
+
+    # NOTE: Variants share the row of their canonical skill.
+    vocabulary_rows = list(dict.fromkeys(canonical_rows.values()))
+    matrix_rows = {row: i for i, row in enumerate(vocabulary_rows)}
+    embeddings = get_skill_index().snapshot().embeddings[vocabulary_rows]
+    skill_rows = {skill: matrix_rows[row] for skill, row in canonical_rows.items()}
+    return skill_rows, normalize_embeddings(embeddings)
 
 
 # Function to lookup the cluster center skill
 def find_cluster_center_skill(skill: str, ai_client: LLMClient):
     """Find the center from the cluster for text passed."""
-    # TODO: We don't need open_ai_client here. Just get the word_embedding and use that
-    logger.info(f"find_cluster_center_skill {skill}")
-    (
-        cluster_embeddings,
-        embeddings,
-        cluster_names,
-        skill_lookup,
-        skills,
-        weightage_dict,
-    ) = load_config_files()
-    if skill.lower() in skill_lookup:
-        return skill_lookup[skill.lower()]
-    else:
-        logger.info("Skill not found in lookup. Finding nearest cluster center...")
-        skill_embedding = ai_client.get_embeddings(skill)
-        cluster_skill = find_nearest_cluster_center(
-            skill_embedding, cluster_embeddings, cluster_names
-        )
-        logger.debug(f"Nearest cluster center for {skill} is {cluster_skill}")
-        return cluster_skill
+    return find_cluster_center_skills([skill], ai_client=ai_client)[0]
 
 
 def find_cluster_center_skills(skills: [str], ai_client: LLMClient):
-    """Find the center of all the skills in list and return."""
-    cluster_center_list = []
-    for word in skills:
-        cluster_center_word = find_cluster_center_skill(word, ai_client=ai_client)
-        cluster_center_list.append(cluster_center_word)
-    return cluster_center_list
-
+    """Find the center of all the skills in list and return.
 
-def save_updated_embeddings_and_skills(updated_embeddings, updated_skills):
-    try:
-        # Save updated embeddings
-        np.save(EMBEDDINGS_CONFIG_PATH, updated_embeddings)
-        logger.info("Updated embeddings saved successfully.")
-
-        # Save updated skills
-        with open(UNIQUE_SKILL_CONFIG_PATH, "w") as file:
-            json.dump(updated_skills, file)
-        logger.info("Updated skills saved successfully.")
-    except Exception as e:
-        logger.error(
-            f"An error occurred while saving updated embeddings and skills: {str(e)}"
-        )
-        raise e
+    Skills not in the skill lookup are first resolved to their canonical
+    skill (without an embedding call) and the rest are embedded with one
+    batched call.
+    """
+    logger.info(f"find_cluster_center_skills {skills}")
+    skill_index = get_skill_index().snapshot()
+    cluster_center_list = [skill_index.skill_lookup.get(skill.lower()) for skill in skills]
+    missing = [i for i, center in enumerate(cluster_center_list) if center is None]
+    if missing:
+        canonical_rows = get_skill_canonicalizer().get_rows([skills[i] for i in missing])
+        for i in missing:
+            row = canonical_rows[skills[i].lower()]
+            if row is not None:
+                cluster_center_list[i] = skill_index.skill_lookup.get(skill_index.get_skill(row))
+        missing = [i for i in missing if cluster_center_list[i] is None]
+    if missing:
+        logger.info("Skills not found in lookup. Finding nearest cluster centers...")
+        skill_embeddings = ai_client.get_embeddings_batch([skills[i] for i in missing])
+        nearest_centers = skill_index.cluster_index.nearest_names(skill_embeddings)
+        for i, cluster_center in zip(missing, nearest_centers):
+            cluster_center_list[i] = cluster_center
+            logger.debug(f"Nearest cluster center for {skills[i]} is {cluster_center}")
+    return cluster_center_list
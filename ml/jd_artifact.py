@@ -0,0 +1,171 @@
+"""Precomputed JD side of the application scoring.
+
+Every application for a job posting used to parse the JD json and resolve
+the same JD skill embeddings again. The JobPostingArtifact is built once at
+job posting time, stored with the job posting and loaded once per posting
+into a per process cache. Cached artifacts are keyed by the
+jd_artifact_version of the job posting, so a rescore in another process is
+picked up on the next use.
+"""
+
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+
+from intai.ml.embedding_utils import resolve_skill_embeddings
+from intai.ml.llm_client import LLMClient
+from intai.ml.utils.llm_types import LLMModelType
+from intai.models.models import JobPostingDb
+from intai.utils.ja_utils import ja_parse_jd
+
+# Max number of job posting artifacts kept in the per process cache.
+JD_ARTIFACT_CACHE_SIZE = int(os.getenv("JD_ARTIFACT_CACHE_SIZE", "256"))
+
+
+class JobPostingArtifact:
+    """Compact JD data needed to score an application.
+
+    skill_matrix rows are the L2 normalized embeddings of skill_names.
+    """
+
+    # NOTE: Bump the version when the artifact content changes so old
+    # artifacts are rebuilt on load.
+    VERSION = 1
+
+    def __init__(
+        self,
+        skill_names: list[str],
+        skill_matrix,
+        industries: list[str],
+        job_title: str,
+        ideal_score: float,
+        version: int = VERSION,
+    ):
+        self.skill_names = skill_names
+        self.skill_matrix = np.ascontiguousarray(skill_matrix, dtype=np.float32)
+        self.industries = industries
+        self.job_title = job_title
+        self.ideal_score = ideal_score
+        self.version = version
+
+    def __repr__(self):
+        return "<JobPostingArtifact: skills: {}; title: {}; industries: {}; ideal_score: {}>".format(
+            len(self.skill_names), self.job_title, self.industries, self.ideal_score
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a length prefixed json header followed by the float32 matrix."""
+        header = json.dumps(
+            {
+                "version": self.version,
+                "skill_names": self.skill_names,
+                "industries": self.industries,
+                "job_title": self.job_title,
+                "ideal_score": self.ideal_score,
+                "shape": list(self.skill_matrix.shape),
+            }
+        ).encode()
+        return struct.pack("<I", len(header)) + header + self.skill_matrix.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "JobPostingArtifact":
+        (header_len,) = struct.unpack_from("<I", data)
+        header = json.loads(data[4 : 4 + header_len])
+        skill_matrix = np.frombuffer(data, dtype=np.float32, offset=4 + header_len)
+        return JobPostingArtifact(
+            skill_names=header["skill_names"],
+            skill_matrix=skill_matrix.reshape(header["shape"]),
+            industries=header["industries"],
+            job_title=header["job_title"],
+            ideal_score=header["ideal_score"],
+            version=header["version"],
+        )
+
+
+def build_jd_artifact(parsed_jd: str, ideal_score: float, ai_client: LLMClient) -> JobPostingArtifact:
+    """Build the artifact from the parsed jd json and the ideal candidate score."""
+    organizationsIndustrySegment, job_title, jd_skill_names, _, _ = ja_parse_jd(parsed_jd)
+    skill_rows, embeddings = resolve_skill_embeddings(jd_skill_names, ai_client)
+    skill_matrix = embeddings[[skill_rows[skill.lower()] for skill in jd_skill_names]]
+
+    if isinstance(organizationsIndustrySegment, str):
+        organizationsIndustrySegment = [organizationsIndustrySegment]
+    industries = [
+        segment.lower() for segment in organizationsIndustrySegment or [] if segment is not None
+    ]
+    artifact = JobPostingArtifact(
+        skill_names=jd_skill_names,
+        skill_matrix=skill_matrix,
+        industries=industries,
+        job_title=job_title,
+        ideal_score=ideal_score,
+    )
+    logger.info(f"Built {artifact}")
+    return artifact
+
+
+# {job posting id: (jd_artifact_version, artifact)}
+_jd_artifact_cache = OrderedDict()
+_jd_artifact_cache_lock = threading.Lock()
+
+
+def save_jd_artifact(session, job_posting_id: int, artifact: JobPostingArtifact, commit: bool = True):
+    """Store the artifact with the job posting and in the per process cache.
+
+    commit False leaves the update in the session transaction, the artifact
+    is cached on its next get_jd_artifact as the transaction may roll back.
+    """
+    version = JobPostingDb.update_jd_artifact(session, job_posting_id, artifact.to_bytes(), commit=commit)
+    if commit:
+        _cache_jd_artifact(job_posting_id, version, artifact)
+
+
+def _cache_jd_artifact(job_posting_id: int, version: int, artifact: JobPostingArtifact):
+    with _jd_artifact_cache_lock:
+        _jd_artifact_cache[job_posting_id] = (version, artifact)
+        _jd_artifact_cache.move_to_end(job_posting_id)
+        if len(_jd_artifact_cache) > JD_ARTIFACT_CACHE_SIZE:
+            _jd_artifact_cache.popitem(last=False)
+
+
+def get_jd_artifact(session, job_posting_db: JobPostingDb, session_id, client_id) -> JobPostingArtifact:
+    """Get the artifact for the job posting.
+
+    Loaded from the database once per process and version, only the version
+    is read while the cached artifact is current. Job postings processed
+    before artifacts existed get it built and stored on first use.
+    """
+    job_posting_id = job_posting_db.id
+    with _jd_artifact_cache_lock:
+        cached = _jd_artifact_cache.get(job_posting_id)
+    if cached is not None:
+        if JobPostingDb.get_jd_artifact_version(session, job_posting_id) == cached[0]:
+            with _jd_artifact_cache_lock:
+                if job_posting_id in _jd_artifact_cache:
+                    _jd_artifact_cache.move_to_end(job_posting_id)
+            return cached[1]
+        logger.info(f"jd artifact of job posting {job_posting_id} changed, reloading")
+
+    artifact = None
+    data, version = JobPostingDb.get_jd_artifact(session, job_posting_id)
+    if data:
+        artifact = JobPostingArtifact.from_bytes(data)
+        if artifact.version != JobPostingArtifact.VERSION:
+            logger.info(f"Outdated jd artifact version {artifact.version} for job posting {job_posting_id}")
+            artifact = None
+
+    if artifact is None:
+        logger.info(f"Building jd artifact for job posting {job_posting_id}")
+        ai_client = LLMClient(model=LLMModelType.EMBEDDING_ADA, session_id=session_id, client_id=client_id)
+        artifact = build_jd_artifact(
+            job_posting_db.parsed_jd, job_posting_db.ideal_candidate_score, ai_client
+        )
+        version = JobPostingDb.update_jd_artifact(session, job_posting_id, artifact.to_bytes())
+
+    _cache_jd_artifact(job_posting_id, version, artifact)
+    return artifact
@@ -0,0 +1,173 @@
+"""Resolve skill strings to vocabulary rows without an embedding call.
+
+Skills which differ from a known skill only by punctuation, plurals or a
+typo ("Rest APIs", "postgre sql", "kubernets") used to need an embedding
+call. The resolver keeps a trie over the normalized tokens of every
+vocabulary skill and a deletion index over the distinct tokens, so a skill
+is resolved with a few dict lookups:
+  1. exact walk of the token trie (resolve),
+  2. walk where unknown tokens are replaced by vocabulary tokens within
+     a bounded edit distance (resolve_fuzzy).
+
+NOTE: Different skills can be a typo apart ("rust" / "rest", "dart" / "art"),
+a fuzzy row is only a candidate which must be verified (see
+SkillCanonicalizer.add_skills) before it is used.
+"""
+
+import re
+import threading
+import unicodedata
+
+_TOKEN_SPLIT = re.compile(r"[^\w+#]+|_")
+
+# Trie node key for the vocabulary row, tokens are never empty.
+_ROW = ""
+
+
+def _singular(token: str) -> str:
+    """Strip the plural ending of a token (rough, applied to both sides)."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        # Keep "analysis", "basis" but not "apis", "kpis".
+        if not (token.endswith("is") and len(token) > 4):
+            return token[:-1]
+    return token
+
+
+def tokenize_skill(skill: str) -> tuple[str, ...]:
+    """Split a skill into normalized (lower case, singular) tokens."""
+    text = unicodedata.normalize("NFKC", skill).lower()
+    return tuple(_singular(token) for token in _TOKEN_SPLIT.split(text) if token)
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Get the edit distance of a and b or max_distance + 1 if it is larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletes(token: str) -> list[str]:
+    return [token[:i] + token[i + 1 :] for i in range(len(token))]
+
+
+class LexicalSkillResolver:
+    """Token trie plus bounded edit distance lookup of vocabulary rows."""
+
+    def __init__(self, max_token_distance: int = 1, max_total_distance: int = 2, min_fuzzy_length: int = 4):
+        self.max_token_distance = max_token_distance
+        self.max_total_distance = max_total_distance
+        self.min_fuzzy_length = min_fuzzy_length
+        self._trie = {}
+        self._tokens = set()
+        self._token_deletes = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.fuzzy_lookups = 0
+        self.fuzzy_hits = 0
+
+    def __repr__(self):
+        return "<LexicalSkillResolver: tokens: {}; stats: {}>".format(
+            len(self._tokens), self.stats()
+        )
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "misses": self.lookups - self.exact_hits,
+            "hit_rate": self.exact_hits / self.lookups if self.lookups else 0.0,
+            "fuzzy_lookups": self.fuzzy_lookups,
+            "fuzzy_hits": self.fuzzy_hits,
+        }
+
+    def add(self, skill: str, row: int):
+        """Add a vocabulary skill, the first row added for a token sequence wins."""
+        tokens = tokenize_skill(skill)
+        if not tokens:
+            return
+        with self._lock:
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+                if token not in self._tokens:
+                    self._tokens.add(token)
+                    if len(token) >= self.min_fuzzy_length:
+                        for variant in _deletes(token):
+                            self._token_deletes.setdefault(variant, set()).add(token)
+            node.setdefault(_ROW, row)
+
+    def _fuzzy_tokens(self, token: str) -> list[tuple[str, int]]:
+        """Vocabulary tokens within max_token_distance of token as (token, distance)."""
+        if len(token) < self.min_fuzzy_length:
+            return []
+        candidates = set(self._token_deletes.get(token, ()))
+        for variant in _deletes(token):
+            # NOTE: Shorter tokens aren't fuzzy matched ("dart" is not "art").
+            if variant in self._tokens and len(variant) >= self.min_fuzzy_length:
+                candidates.add(variant)
+            candidates.update(self._token_deletes.get(variant, ()))
+        matches = []
+        for candidate in candidates:
+            distance = bounded_levenshtein(token, candidate, self.max_token_distance)
+            if distance <= self.max_token_distance:
+                matches.append((candidate, distance))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def _walk(self, node, tokens, budget):
+        """Depth first walk of the trie spending at most budget edits."""
+        if not tokens:
+            return node.get(_ROW)
+        token = tokens[0]
+        child = node.get(token)
+        if child is not None:
+            row = self._walk(child, tokens[1:], budget)
+            if row is not None:
+                return row
+        if budget <= 0 or token in self._tokens:
+            return None
+        for candidate, distance in self._fuzzy_tokens(token):
+            if distance <= budget and candidate in node:
+                row = self._walk(node[candidate], tokens[1:], budget - distance)
+                if row is not None:
+                    return row
+        return None
+
+    def resolve(self, skill: str):
+        """Get the vocabulary row with the same tokens (plurals folded) as the skill or None."""
+        tokens = tokenize_skill(skill)
+        self.lookups += 1
+        node = self._trie
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                return None
+        row = node.get(_ROW) if tokens else None
+        if row is not None:
+            self.exact_hits += 1
+        return row
+
+    def resolve_fuzzy(self, skill: str):
+        """Get the candidate vocabulary row within the edit distance of the skill or None."""
+        tokens = tokenize_skill(skill)
+        self.fuzzy_lookups += 1
+        if not tokens:
+            return None
+        row = self._walk(self._trie, tokens, self.max_total_distance)
+        if row is not None:
+            self.fuzzy_hits += 1
+        return row
@@ -1,5 +1,7 @@
+import asyncio
 import os
 import timeit
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from uuid import uuid4
 import litellm
@@ -7,11 +9,37 @@ from langfuse.client import Langfuse
 from loguru import logger
 import numpy as np
 from intai.ml.ai_prompt import AIPrompt
+from intai.ml.embedding_cache import get_embedding_cache, normalize_embedding_text
+from intai.ml.response_cache import get_response_cache, is_response_cache_enabled, make_response_cache_key
+from intai.ml.rate_limiter import get_rate_limiter
+from intai.ml.single_flight import SingleFlight
+from intai.ml.utils.token_utils import count_tokens
 from intai.ml.utils.llm_types import LLMModelType, LLMResponseType
 
 
 
 from intai.utils.str_utils import check_str_not_null
+
+# Max number of inputs sent in one embedding request.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+# Max number of embedding requests in flight for one batch call.
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+LLM_SINGLE_FLIGHT_ENABLED = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Process wide in-flight completion / embedding requests, identical concurrent
+# requests (sync or async) wait for the one outstanding call.
+completion_single_flight = SingleFlight("completions")
+embedding_single_flight = SingleFlight("embeddings")
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Number of completion / embedding calls made and coalesced."""
+    return {
+        "completions": completion_single_flight.stats(),
+        "embeddings": embedding_single_flight.stats(),
+    }
+
+
 class LLMClient:
     DEFAULT_MODEL = LLMModelType.GPT40S
     def __init__(self, model: LLMModelType = DEFAULT_MODEL, session_id: str = None, client_id: str = None):
@@ -31,55 +59,126 @@ class LLMClient:
             # set callbacks
             litellm.failure_callback = ["langfuse"]
 
+    def _get_metadata(self, tags: List[str]) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "trace_user_id":self.client_id, "tags": tags}
+
+    def _get_completion_kwargs(self, ai_prompt: AIPrompt, response_type: LLMResponseType, response_json: str, model_name: str, metadata: Dict[str, Any], max_tokens: int) -> Dict[str, Any]:
+        """Arguments of litellm.completion / acompletion for the prompt."""
+        kwargs = {
+            "model": model_name,
+            "messages": ai_prompt.messages,
+            "api_key": self.api_key,
+            "temperature": 0,
+            "max_tokens": max_tokens,
+            "metadata": metadata,
+        }
+        if response_type == LLMResponseType.JSON_OBJECT:
+            kwargs["response_format"] = {"type": "json_object"}
+        elif response_type == LLMResponseType.JSON_SCHEMA:
+            litellm.enable_json_schema_validation = True
+            kwargs["response_format"] = {"type": "json_schema", "json_schema": response_json}
+        return kwargs
+
+    def _get_token_budget(self, ai_prompt: AIPrompt, model_name: str) -> tuple[int, int]:
+        """Count the prompt tokens and get the (prompt tokens, max_tokens) of the prompt for the model."""
+        prompt_tokens = ai_prompt.count_tokens(model_name)
+        max_tokens = ai_prompt.get_max_tokens(model_name, prompt_tokens)
+        logger.info(
+            f"{type(ai_prompt).__name__} tokens for {model_name}: prompt: {prompt_tokens}; max_tokens: {max_tokens}"
+        )
+        return prompt_tokens, max_tokens
+
+    def _log_usage(self, ai_prompt: AIPrompt, response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            logger.info(
+                f"{type(ai_prompt).__name__} usage: prompt_tokens: {usage.prompt_tokens}; completion_tokens: {usage.completion_tokens}; finish_reason: {response.choices[0].finish_reason}"
+            )
+
+    def _get_fallback_model(self, response, model_name: str):
+        """Model to retry with if the response was truncated, None if done.
+
+        NOTE: We only retry once to fallback to a different model. Potentially
+        there could be other reasons to fallback in future as well.
+        """
+        fallback_model_name = LLMModelType.GPT35.get_model_name()
+        if response.choices[0].finish_reason == "length" and model_name != fallback_model_name:
+            logger.warning(
+                "Failed with length of tokens error so now trying with GPT35 model"
+            )
+            return fallback_model_name
+        return None
+
+    def _get_cache_key(self, ai_prompt: AIPrompt, response_type: LLMResponseType, response_json: str, model_name: str):
+        """Response cache key of the prompt, None if its responses aren't cached.
+
+        NOTE: All the calls use temperature 0 so the response is deterministic.
+        """
+        if not is_response_cache_enabled(ai_prompt):
+            return None
+        response_format = {"type": response_type.name, "schema": response_json}
+        return make_response_cache_key(model_name, ai_prompt.messages, response_format, ai_prompt)
+
+    def _is_cacheable_response(self, response, response_model_name: str) -> bool:
+        """Only complete responses of the model the cache key was built for are cached.
+
+        NOTE: A truncated or fallback model response under the primary model key
+        would be served on every later call instead of retrying the primary model.
+        """
+        return (
+            response.choices[0].finish_reason == "stop"
+            and response_model_name == self.model_type.get_model_name()
+        )
+
+    def _get_request_key(self, ai_prompt: AIPrompt, response_type: LLMResponseType, response_json: str):
+        """Content hash of the completion request, None if it isn't coalesced."""
+        if not LLM_SINGLE_FLIGHT_ENABLED:
+            return None
+        response_format = {"type": response_type.name, "schema": response_json}
+        return make_response_cache_key(
+            self.model_type.get_model_name(), ai_prompt.messages, response_format, ai_prompt
+        )
+
+    def _get_content(self, response) -> str:
+        content = response.choices[0].message.content
+        if check_str_not_null(content):
+            content = content.strip()
+        logger.debug(content)
+        assert len(content) > 0
+        return content
+
     def get_model_response(self, ai_prompt:AIPrompt, response_type: LLMResponseType=LLMResponseType.JSON_OBJECT, response_json: str=None) -> Any:
         
          # log input/output to lunary, langfuse, supabase, athina, helicone etc
         logger.info(
             f"OpenAI Call Started for model: {self.model_type}; prompt {ai_prompt}; response_type: {response_type} json: {response_json}"
         )
-        try:
-            # NOTE: We are retrying to fallback to a different model. Potentially there could be 
-            # other reasons to fallback in future as well.
+        request_key = self._get_request_key(ai_prompt, response_type, response_json)
+        if request_key is None:
+            return self._get_model_response(ai_prompt, response_type, response_json)
+        return completion_single_flight.do(
+            request_key, self._get_model_response, ai_prompt, response_type, response_json
+        )
 
-            tries = 1
+    def _get_model_response(self, ai_prompt: AIPrompt, response_type: LLMResponseType, response_json: str) -> Any:
+        try:
             model_name = self.model_type.get_model_name()
-            is_completed = False
-            metadata = {"session_id": self.session_id, "trace_user_id":self.client_id, "tags": [type(ai_prompt).__name__, model_name]}
-            while tries <3 and not is_completed:
-                logger.debug(f"session_id={self.session_id} response_type: {response_type} tries {tries} is_completed: {is_completed}")
-                start_time = timeit.default_timer()
-
-                if response_type == LLMResponseType.JSON_OBJECT:
-                    logger.debug(f"AAAAAA")
-                    response = litellm.completion(
-                        model=model_name,
-                        messages=ai_prompt.messages,
-                        api_key=self.api_key,
-                        response_format={"type": "json_object"},
-                        temperature=0, 
-                        metadata=metadata,
-                    )
-                elif response_type == LLMResponseType.JSON_SCHEMA:
-                    logger.debug(f"CCCCCC")
-                    litellm.enable_json_schema_validation = True
-                    
-                    response = litellm.completion(
-                        model=model_name,
-                        messages=ai_prompt.messages,
-                        api_key=self.api_key,
-                        response_format={"type": "json_schema", "json_schema": response_json},
-                        temperature=0,
-                        metadata=metadata,
-                    )
-                else:
-                    logger.debug(f"BBBBBB")
+            prompt_name = type(ai_prompt).__name__
+            cache_key = self._get_cache_key(ai_prompt, response_type, response_json, model_name)
+            if cache_key is not None:
+                content = get_response_cache().get(cache_key, prompt_name)
+                if content is not None:
+                    logger.info(f"Response cache hit for {prompt_name}")
+                    return content
 
+            metadata = self._get_metadata([prompt_name, model_name])
+            while model_name is not None:
+                logger.debug(f"session_id={self.session_id} response_type: {response_type} model: {model_name}")
+                prompt_tokens, max_tokens = self._get_token_budget(ai_prompt, model_name)
+                with get_rate_limiter(model_name).limit(prompt_tokens + max_tokens):
+                    start_time = timeit.default_timer()
                     response = litellm.completion(
-                        model=model_name,
-                        messages=ai_prompt.messages,
-                        api_key=self.api_key,
-                        temperature=0,
-                        metadata=metadata,
+                        **self._get_completion_kwargs(ai_prompt, response_type, response_json, model_name, metadata, max_tokens)
                     )
 
                 end_time = timeit.default_timer()
@@ -93,49 +192,214 @@ class LLMClient:
                     )
                     return None
 
-                if (
-                    response.choices[0].finish_reason == "length"
-                    and tries > 0
-                    and model_name != LLMModelType.MODEL_GPT35
-                ):
-                    tries -= 1
-                    model_name = LLMModelType.MODEL_GPT35
-                    is_completed = False
-                    logger.warning(
-                        "Failed with length of tokens error so now trying with GPT35 model"
-                    )
-                else:
-                    is_completed = True
-                
-            content = response.choices[0].message.content
-            if check_str_not_null(content):
-                content = content.strip()
-            logger.debug(content)
-            assert len(content) > 0
+                self._log_usage(ai_prompt, response)
+                response_model_name = model_name
+                model_name = self._get_fallback_model(response, model_name)
+
+            content = self._get_content(response)
+            if cache_key is not None and self._is_cacheable_response(response, response_model_name):
+                get_response_cache().put(cache_key, prompt_name, content)
             return content
         except Exception as e:
             logger.error(str(e))
             raise e
         
 
-    def get_embeddings(self, text: str) -> List[float]:
+    def get_embeddings(self, text: str) -> np.ndarray:
         """Create embedding for the given text."""
+        return self.get_embeddings_batch([text])[0]
+
+    def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Create embeddings for all the texts with as few requests as possible.
+
+        Texts are normalized and read through the persistent embedding cache.
+        Only the distinct texts missing from it are sent, split into provider
+        sized batches which are sent concurrently. Texts already being fetched
+        by a concurrent call are waited for instead of sent again.
+        Returns float32 array of shape (len(texts), d) in input order.
+        """
+        keys = [normalize_embedding_text(text) for text in texts]
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        model_name = LLMModelType.EMBEDDING_ADA.get_model_name()
+        embedding_cache = get_embedding_cache()
+        embeddings = embedding_cache.get_many(model_name, keys)
+        missing_texts = [key for key in dict.fromkeys(keys) if key not in embeddings]
+
+        if missing_texts:
+            fetched = embedding_single_flight.do_many(
+                [(model_name, text) for text in missing_texts], self._fetch_embeddings
+            )
+            embeddings.update({text: embedding for (_, text), embedding in fetched.items()})
+
+        logger.debug(f"Embedding cache stats: {embedding_cache.stats()}; {embedding_single_flight}")
+        return np.vstack([embeddings[key] for key in keys])
+
+    def _fetch_embeddings(self, flight_keys: List[tuple]) -> Dict[tuple, np.ndarray]:
+        """Send the embedding requests for the (model name, text) keys and cache the embeddings."""
+        model_name = flight_keys[0][0]
+        texts = [text for _, text in flight_keys]
+        batches = [
+            texts[i : i + EMBEDDING_BATCH_SIZE]
+            for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+        ]
         try:
-            metadata = {"session_id": self.session_id, "trace_user_id":self.client_id, "tags": ["embeddings"]}
             start_time = timeit.default_timer()
+            if len(batches) == 1:
+                batch_embeddings = [self._get_embeddings_for_batch(batches[0])]
+            else:
+                max_workers = min(len(batches), EMBEDDING_MAX_CONCURRENCY)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    batch_embeddings = list(executor.map(self._get_embeddings_for_batch, batches))
+            new_embeddings = dict(zip(texts, np.vstack(batch_embeddings)))
+            end_time = timeit.default_timer()
+            execution_time = end_time - start_time
+            logger.warning(f"[[[[[[[[[ ------   Execution time for OpenAI embedding of {len(texts)} texts in {len(batches)} batches: {execution_time} seconds  ------ ]]]]]]]]")
+        except Exception as e:
+            logger.error(str(e))
+            raise e
+        get_embedding_cache().put_many(model_name, new_embeddings)
+        return {key: new_embeddings[text] for key, text in zip(flight_keys, texts) if text in new_embeddings}
+
+    def _get_embeddings_for_batch(self, texts: List[str]) -> np.ndarray:
+        """Send one embedding request for the batch of texts."""
+        metadata = self._get_metadata(["embeddings"])
+        model_name = LLMModelType.EMBEDDING_ADA.get_model_name()
+        with get_rate_limiter(model_name).limit(self._count_batch_tokens(texts, model_name)):
             response = litellm.embedding(
-                model="text-embedding-ada-002",
-                input=[text],
+                model=model_name,
+                input=texts,
                 api_key=self.api_key,
                 metadata=metadata,
             )
-            embedding = response.data[0]["embedding"]
-            end_time = timeit.default_timer()
-            execution_time = end_time - start_time
-            logger.warning(f"[[[[[[[[[ ------   Execution time for OpenAI embedding: {execution_time} seconds  ------ ]]]]]]]]")
-            return np.array(embedding)
+        return self._get_embeddings_array(response)
+
+    def _count_batch_tokens(self, texts: List[str], model_name: str) -> int:
+        return sum(count_tokens(text, model_name) for text in texts)
+
+    def _get_embeddings_array(self, response) -> np.ndarray:
+        data = sorted(response.data, key=lambda item: item["index"])
+        return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+
+
+class AsyncLLMClient(LLMClient):
+    """LLMClient for asyncio callers built on litellm.acompletion / aembedding.
+
+    Same retry/fallback and embedding cache semantics as LLMClient, but an
+    in-flight call holds no thread so many calls fit on one event loop.
+    """
+
+    async def aget_model_response(self, ai_prompt: AIPrompt, response_type: LLMResponseType=LLMResponseType.JSON_OBJECT, response_json: str=None) -> Any:
+        logger.info(
+            f"OpenAI async Call Started for model: {self.model_type}; prompt {ai_prompt}; response_type: {response_type} json: {response_json}"
+        )
+        request_key = self._get_request_key(ai_prompt, response_type, response_json)
+        if request_key is None:
+            return await self._aget_model_response(ai_prompt, response_type, response_json)
+        return await completion_single_flight.ado(
+            request_key, self._aget_model_response, ai_prompt, response_type, response_json
+        )
+
+    async def _aget_model_response(self, ai_prompt: AIPrompt, response_type: LLMResponseType, response_json: str) -> Any:
+        try:
+            model_name = self.model_type.get_model_name()
+            prompt_name = type(ai_prompt).__name__
+            cache_key = self._get_cache_key(ai_prompt, response_type, response_json, model_name)
+            if cache_key is not None:
+                content = await asyncio.to_thread(get_response_cache().get, cache_key, prompt_name)
+                if content is not None:
+                    logger.info(f"Response cache hit for {prompt_name}")
+                    return content
+
+            metadata = self._get_metadata([prompt_name, model_name])
+            while model_name is not None:
+                logger.debug(f"session_id={self.session_id} response_type: {response_type} model: {model_name}")
+                prompt_tokens, max_tokens = self._get_token_budget(ai_prompt, model_name)
+                async with get_rate_limiter(model_name).alimit(prompt_tokens + max_tokens):
+                    start_time = timeit.default_timer()
+                    response = await litellm.acompletion(
+                        **self._get_completion_kwargs(ai_prompt, response_type, response_json, model_name, metadata, max_tokens)
+                    )
+
+                execution_time = timeit.default_timer() - start_time
+                logger.warning(f"[[[[[[[[[ ------   Execution time for OpenAI ({type(ai_prompt)}) aget_model_response: {execution_time} seconds  ------ ]]]]]]]]")
+
+                if response is None or len(response.choices) == 0:
+                    logger.error(
+                        f"Open AI called returned none response or response has no choice. {self}"
+                    )
+                    return None
+
+                self._log_usage(ai_prompt, response)
+                response_model_name = model_name
+                model_name = self._get_fallback_model(response, model_name)
+
+            content = self._get_content(response)
+            if cache_key is not None and self._is_cacheable_response(response, response_model_name):
+                await asyncio.to_thread(get_response_cache().put, cache_key, prompt_name, content)
+            return content
+        except Exception as e:
+            logger.error(str(e))
+            raise e
+
+    async def aget_embeddings(self, text: str) -> np.ndarray:
+        """Create embedding for the given text."""
+        return (await self.aget_embeddings_batch([text]))[0]
+
+    async def aget_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Async get_embeddings_batch, batches are sent concurrently on the loop."""
+        keys = [normalize_embedding_text(text) for text in texts]
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        model_name = LLMModelType.EMBEDDING_ADA.get_model_name()
+        embedding_cache = get_embedding_cache()
+        # NOTE: The cache reads / writes sqlite, keep it off the event loop.
+        embeddings = await asyncio.to_thread(embedding_cache.get_many, model_name, keys)
+        missing_texts = [key for key in dict.fromkeys(keys) if key not in embeddings]
+
+        if missing_texts:
+            fetched = await embedding_single_flight.ado_many(
+                [(model_name, text) for text in missing_texts], self._afetch_embeddings
+            )
+            embeddings.update({text: embedding for (_, text), embedding in fetched.items()})
+
+        return np.vstack([embeddings[key] for key in keys])
+
+    async def _afetch_embeddings(self, flight_keys: List[tuple]) -> Dict[tuple, np.ndarray]:
+        """Async _fetch_embeddings, batches are sent concurrently on the loop."""
+        model_name = flight_keys[0][0]
+        texts = [text for _, text in flight_keys]
+        batches = [
+            texts[i : i + EMBEDDING_BATCH_SIZE]
+            for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+
+        async def get_batch(batch):
+            async with semaphore:
+                return await self._aget_embeddings_for_batch(batch)
+
+        try:
+            start_time = timeit.default_timer()
+            batch_embeddings = await asyncio.gather(*(get_batch(batch) for batch in batches))
+            new_embeddings = dict(zip(texts, np.vstack(batch_embeddings)))
+            execution_time = timeit.default_timer() - start_time
+            logger.warning(f"[[[[[[[[[ ------   Execution time for OpenAI async embedding of {len(texts)} texts in {len(batches)} batches: {execution_time} seconds  ------ ]]]]]]]]")
         except Exception as e:
             logger.error(str(e))
             raise e
-       
+        await asyncio.to_thread(get_embedding_cache().put_many, model_name, new_embeddings)
+        return {key: new_embeddings[text] for key, text in zip(flight_keys, texts) if text in new_embeddings}
 
+    async def _aget_embeddings_for_batch(self, texts: List[str]) -> np.ndarray:
+        """Send one async embedding request for the batch of texts."""
+        model_name = LLMModelType.EMBEDDING_ADA.get_model_name()
+        async with get_rate_limiter(model_name).alimit(self._count_batch_tokens(texts, model_name)):
+            response = await litellm.aembedding(
+                model=model_name,
+                input=texts,
+                api_key=self.api_key,
+                metadata=self._get_metadata(["embeddings"]),
+            )
+        return self._get_embeddings_array(response)
@@ -0,0 +1,268 @@
+"""Process wide rate limiter of the LLM provider calls, one per model.
+
+A burst of uploads fans out several LLM calls per application (parse, basics,
+factor score, summary) and ends up in provider 429s and slow retries. Every
+LLMClient call takes a slot of the limiter of its model first:
+
+- requests per minute token bucket (LLM_RATE_LIMIT_RPM)
+- tokens per minute budget (LLM_RATE_LIMIT_TPM), a call costs its prompt
+  tokens + max_tokens as that is what the provider counts against the limit
+- AIMD concurrency window, grows by 1 per window of successful calls and is
+  cut on 429 (the model is also paused for retry-after) or slow responses.
+
+Per model limits can be set in LLM_RATE_LIMITS, e.g.
+'{"gpt-4o-mini": {"rpm": 5000, "tpm": 2000000, "max_concurrency": 64}}'.
+Slots are shared by sync (threads) and asyncio callers, the time spent
+waiting for a slot is exported in stats() (see get_rate_limiter_stats).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from loguru import logger
+
+LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "3000"))
+LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+# Seconds of requests / tokens which can be sent in one burst.
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+# Calls slower than this shrink the concurrency window.
+RATE_LIMIT_SLOW_LATENCY_SECONDS = float(os.getenv("RATE_LIMIT_SLOW_LATENCY_SECONDS", "60"))
+# Pause after a 429 without retry-after.
+RATE_LIMIT_PAUSE_SECONDS = 1.0
+RATE_LIMITED_DECREASE = 0.5
+SLOW_LATENCY_DECREASE = 0.75
+# NOTE: Calls in flight together fail / slow down together, the window is cut
+# at most once per interval for them.
+DECREASE_INTERVAL_SECONDS = 1.0
+# Max seconds a waiting caller sleeps before checking for a slot again.
+POLL_SECONDS = 0.05
+# Number of recent queue waits kept for the percentiles.
+QUEUE_WAIT_WINDOW = 1000
+
+
+class _TokenBucket:
+    """Bucket refilled at rate_per_minute, holding at most RATE_LIMIT_BURST_SECONDS of it."""
+
+    def __init__(self, rate_per_minute: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate * RATE_LIMIT_BURST_SECONDS)
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken, 0 if it can be taken now."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # NOTE: A call costing more than the capacity would never fit, it waits for a full bucket.
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.rate > 0:
+            self.level -= min(amount, self.capacity)
+
+
+class ModelRateLimiter:
+    """Rate limiter of one model.
+
+    Use get_rate_limiter(model_name) to get the process wide instance.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        rpm: int = LLM_RATE_LIMIT_RPM,
+        tpm: int = LLM_RATE_LIMIT_TPM,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        min_concurrency: int = 1,
+    ):
+        self.model_name = model_name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._requests = _TokenBucket(rpm)
+        self._tokens = _TokenBucket(tpm)
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+        self._waits = deque(maxlen=QUEUE_WAIT_WINDOW)
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def __repr__(self):
+        return "<ModelRateLimiter: {}; stats: {}>".format(self.model_name, self.stats())
+
+    def stats(self) -> dict:
+        """Limits, concurrency window and queue wait times of the model."""
+        with self._condition:
+            waits = sorted(self._waits)
+            stats = {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "concurrency": round(self.concurrency, 2),
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "queue_wait_total_seconds": round(self._total_wait, 3),
+                "queue_wait_max_seconds": round(self._max_wait, 3),
+            }
+        for name, percentile in (("p50", 0.5), ("p95", 0.95)):
+            stats[f"queue_wait_{name}_seconds"] = (
+                round(waits[min(len(waits) - 1, int(len(waits) * percentile))], 3) if waits else 0.0
+            )
+        return stats
+
+    def _try_acquire(self, tokens: int, now: float) -> float:
+        """Take a slot for the call, 0 if taken else the seconds to wait. Called with the lock held."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return POLL_SECONDS
+        wait = max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        self._requests.take(1)
+        self._tokens.take(tokens)
+        self.in_flight += 1
+        self.calls += 1
+        return 0.0
+
+    def _record_wait(self, wait: float):
+        with self._condition:
+            self._waits.append(wait)
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        if wait >= 1:
+            logger.info(f"Waited {wait:.2f} seconds for a {self.model_name} rate limit slot")
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait for a slot for a call of the tokens, returns the seconds waited."""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                wait = self._try_acquire(tokens, time.monotonic())
+                if wait == 0:
+                    break
+                # NOTE: Woken up on release, the buckets refilling is polled.
+                self._condition.wait(min(wait, POLL_SECONDS))
+        wait = time.monotonic() - start
+        self._record_wait(wait)
+        return wait
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Async acquire, polls without blocking the event loop."""
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                wait = self._try_acquire(tokens, time.monotonic())
+            if wait == 0:
+                break
+            await asyncio.sleep(min(wait, POLL_SECONDS))
+        wait = time.monotonic() - start
+        self._record_wait(wait)
+        return wait
+
+    def release(self, latency: float, err: BaseException = None):
+        """Free the slot and adjust the concurrency window to the outcome of the call."""
+        now = time.monotonic()
+        with self._condition:
+            self.in_flight -= 1
+            if _is_rate_limit_error(err):
+                self.rate_limited += 1
+                self._paused_until = max(self._paused_until, now + _get_retry_after(err))
+                self._decrease(RATE_LIMITED_DECREASE, now)
+                logger.warning(
+                    f"Rate limited by {self.model_name}, concurrency: {self.concurrency:.2f}; calls: {self.calls}"
+                )
+            elif latency > RATE_LIMIT_SLOW_LATENCY_SECONDS:
+                self._decrease(SLOW_LATENCY_DECREASE, now)
+            elif err is None:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+
+    def _decrease(self, factor: float, now: float):
+        if now - self._decreased_at < DECREASE_INTERVAL_SECONDS:
+            return
+        self._decreased_at = now
+        self.concurrency = max(self.min_concurrency, self.concurrency * factor)
+
+    @contextmanager
+    def limit(self, tokens: int = 0):
+        """Hold a slot for the call in the block."""
+        self.acquire(tokens)
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self.release(time.monotonic() - start, error)
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int = 0):
+        """Async limit."""
+        await self.aacquire(tokens)
+        start = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self.release(time.monotonic() - start, error)
+
+
+def _is_rate_limit_error(err: Exception) -> bool:
+    return err is not None and getattr(err, "status_code", None) == 429
+
+
+def _get_retry_after(err: Exception) -> float:
+    """Retry-after seconds of the 429 response, RATE_LIMIT_PAUSE_SECONDS if missing."""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return RATE_LIMIT_PAUSE_SECONDS
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> ModelRateLimiter:
+    """Get the process wide ModelRateLimiter of the model."""
+    rate_limiter = _rate_limiters.get(model_name)
+    if rate_limiter is None:
+        with _rate_limiters_lock:
+            rate_limiter = _rate_limiters.get(model_name)
+            if rate_limiter is None:
+                rate_limiter = ModelRateLimiter(model_name, **LLM_RATE_LIMITS.get(model_name, {}))
+                _rate_limiters[model_name] = rate_limiter
+    return rate_limiter
+
+
+def get_rate_limiter_stats() -> dict:
+    """Stats of the rate limiters of all the models called so far."""
+    return {model_name: rate_limiter.stats() for model_name, rate_limiter in list(_rate_limiters.items())}
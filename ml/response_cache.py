@@ -0,0 +1,174 @@
+"""Persistent cache of deterministic (temperature 0) LLM responses.
+
+Responses are stored in sqlite keyed by a hash of the model name, messages,
+response format / schema, prompt class and its CACHE_VERSION, so re-processing
+the same resume or JD (is_update, retried tasks) or asking the same title
+match again doesn't re-bill the completion.
+
+Entries expire after RESPONSE_CACHE_TTL_SECONDS and the least recently used
+ones are evicted above RESPONSE_CACHE_MAX_ENTRIES. Caching is enabled per
+prompt class (AIPrompt.CACHE_ENABLED) and can be turned off for some prompt
+classes (RESPONSE_CACHE_DISABLED_PROMPTS) or entirely (RESPONSE_CACHE_ENABLED).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+from intai.config import RESPONSE_CACHE_PATH
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Comma separated prompt class names which are never cached.
+RESPONSE_CACHE_DISABLED_PROMPTS = {
+    name.strip() for name in os.getenv("RESPONSE_CACHE_DISABLED_PROMPTS", "").split(",") if name.strip()
+}
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "50000"))
+
+
+def is_response_cache_enabled(ai_prompt) -> bool:
+    """Check if the responses of the prompt are cached."""
+    return (
+        RESPONSE_CACHE_ENABLED
+        and ai_prompt.CACHE_ENABLED
+        and type(ai_prompt).__name__ not in RESPONSE_CACHE_DISABLED_PROMPTS
+    )
+
+
+def make_response_cache_key(model_name: str, messages, response_format, ai_prompt) -> str:
+    """Hash of everything which determines a temperature 0 response."""
+    key_data = {
+        "model": model_name,
+        "messages": messages,
+        "response_format": response_format,
+        "prompt": type(ai_prompt).__name__,
+        "version": ai_prompt.CACHE_VERSION,
+    }
+    key_json = json.dumps(key_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Sqlite backed LLM response cache with TTL and LRU eviction.
+
+    Use get_response_cache() to get the process wide instance.
+    """
+
+    def __init__(
+        self,
+        path=RESPONSE_CACHE_PATH,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # {prompt class: [hits, misses]}
+        self._counts = {}
+
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " prompt TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)"
+        )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __repr__(self):
+        return "<ResponseCache: path: {}; size: {}; stats: {}>".format(self.path, self._size, self.stats())
+
+    def __len__(self):
+        return self._size
+
+    def stats(self) -> dict:
+        """Hit and miss counts (total and per prompt class) since the cache was created."""
+        with self._lock:
+            prompts = {
+                prompt: {"hits": hits, "misses": misses} for prompt, (hits, misses) in self._counts.items()
+            }
+        hits = sum(counts["hits"] for counts in prompts.values())
+        misses = sum(counts["misses"] for counts in prompts.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "prompts": prompts,
+        }
+
+    def get(self, key: str, prompt: str):
+        """Get the cached response for the key, None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= 1
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            counts = self._counts.setdefault(prompt, [0, 0])
+            counts[0 if row is not None else 1] += 1
+        return row[0] if row is not None else None
+
+    def put(self, key: str, prompt: str, response: str):
+        """Store the response and evict the least recently used entries above max_entries."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, prompt, response, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, prompt, response, now, now),
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "UPDATE responses SET response = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                    (response, now, now, key),
+                )
+            else:
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop the expired entries and then the least recently used ones."""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        # NOTE: Evict 10% below the max so eviction doesn't run on every put.
+        excess = self._size - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self._size -= excess
+        logger.debug(f"Evicted response cache entries, size: {self._size}")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process wide ResponseCache."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
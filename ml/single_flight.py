@@ -0,0 +1,118 @@
+"""Coalesce identical concurrent calls into one (single flight).
+
+When a batch of applications for one posting arrives together, many threads
+ask for the same JD skill embedding or the same MatchTitleAIPrompt at the
+same moment. The first caller of a key (the leader) makes the call and the
+concurrent callers of the same key wait for its result instead of making
+their own provider call.
+
+In-flight calls are concurrent.futures.Future so sync callers (threads) and
+asyncio callers (on any event loop) can wait on the same leader.
+
+NOTE: Followers get the same result object as the leader, it must not be
+mutated by the callers.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Table of in-flight calls keyed by a content hash."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __repr__(self):
+        return "<SingleFlight: {}; stats: {}>".format(self.name, self.stats())
+
+    def stats(self) -> dict:
+        """Number of calls made and of calls coalesced into an in-flight call."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+    def _claim(self, keys) -> tuple[dict, dict]:
+        """Get ({key: future} claimed by the caller, {key: future} in flight)."""
+        claimed = {}
+        waiting = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._calls.get(key)
+                if future is None:
+                    future = Future()
+                    self._calls[key] = future
+                    claimed[key] = future
+                else:
+                    waiting[key] = future
+            self.calls += len(claimed)
+            self.coalesced += len(waiting)
+        return claimed, waiting
+
+    def _release(self, claimed: dict, results: dict = None, err: BaseException = None):
+        """Resolve the futures of the claimed keys and remove them from the in-flight calls.
+
+        A key missing from results fails its waiters instead of leaving them blocked.
+        """
+        try:
+            for key, future in claimed.items():
+                if err is not None:
+                    future.set_exception(err)
+                elif results is not None and key in results:
+                    future.set_result(results[key])
+        finally:
+            with self._lock:
+                for key, future in claimed.items():
+                    if not future.done():
+                        future.set_exception(KeyError(f"{self.name} call returned no result for {key!r}"))
+                    if self._calls.get(key) is future:
+                        del self._calls[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) unless a call for key is in flight, then wait for it."""
+        return self.do_many([key], lambda keys: {key: fn(*args, **kwargs)})[key]
+
+    def do_many(self, keys, fn) -> dict:
+        """Get {key: value} for all keys.
+
+        fn(keys) -> {key: value} is called once for the keys not in flight,
+        the keys in flight are waited for.
+        """
+        claimed, waiting = self._claim(keys)
+        results = {}
+        if claimed:
+            try:
+                results = fn(list(claimed))
+            except BaseException as err:
+                self._release(claimed, err=err)
+                raise
+            self._release(claimed, results)
+        for key, future in waiting.items():
+            results[key] = future.result()
+        return results
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """Async do, fn is a coroutine function."""
+
+        async def call(keys):
+            return {key: await fn(*args, **kwargs)}
+
+        return (await self.ado_many([key], call))[key]
+
+    async def ado_many(self, keys, fn) -> dict:
+        """Async do_many, fn is a coroutine function."""
+        claimed, waiting = self._claim(keys)
+        results = {}
+        if claimed:
+            try:
+                results = await fn(list(claimed))
+            except BaseException as err:
+                self._release(claimed, err=err)
+                raise
+            self._release(claimed, results)
+        for key, future in waiting.items():
+            results[key] = await asyncio.wrap_future(future)
+        return results
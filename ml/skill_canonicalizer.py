@@ -0,0 +1,252 @@
+"""Map spelling variants of a skill to one canonical vocabulary skill.
+
+Every unseen spelling ("reactjs", "react.js", "react js") used to be added
+as a new vocabulary row. The canonicalizer resolves a skill in order:
+  1. the alias table (config/skill_aliases.json),
+  2. the exact vocabulary skill,
+  3. the vocabulary skill with the same normalized key (case, unicode,
+     whitespace and punctuation folded),
+  4. the lexical resolver (same tokens up to plurals, see LexicalSkillResolver),
+and new skills are merged into an existing skill when their embeddings are
+within SKILL_MERGE_EPSILON cosine distance, or SKILL_FUZZY_MERGE_EPSILON of
+the skill a typo away (lexical fuzzy candidate). Typo candidates are never
+used or saved as aliases without that check. Only skills which are really
+new get a vocabulary row.
+
+The canonical id of a skill is its vocabulary row, which never changes as
+the store only appends. The canonical name is the skill at that row and is
+stored as SkillDb.standard_skill_name.
+"""
+
+import fcntl
+import json
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+from loguru import logger
+
+import intai.config as config
+from intai.ml.lexical_resolver import LexicalSkillResolver
+from intai.ml.skill_index import SkillEmbeddingIndex, get_skill_index
+
+# Max cosine distance between the embeddings of a new skill and a vocabulary
+# skill for the new skill to be merged as an alias.
+SKILL_MERGE_EPSILON = float(os.getenv("SKILL_MERGE_EPSILON", "0.03"))
+# Max cosine distance to merge a new skill into the skill it is a typo of.
+SKILL_FUZZY_MERGE_EPSILON = float(os.getenv("SKILL_FUZZY_MERGE_EPSILON", "0.08"))
+
+_NON_KEY_CHARS = re.compile(r"[^\w+#]|_")
+
+
+def normalize_skill_name(skill: str) -> str:
+    """Fold a skill name to the key shared by its spelling variants.
+
+    Keeps + and # so "c", "c++" and "c#" stay different skills.
+    """
+    text = unicodedata.normalize("NFKC", skill).lower().strip()
+    key = _NON_KEY_CHARS.sub("", text)
+    return key or text
+
+
+class SkillCanonicalizer:
+    """Canonical vocabulary rows for skill names with a persisted alias table.
+
+    Use get_skill_canonicalizer() instead of creating it directly.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        skill_index: SkillEmbeddingIndex = None,
+        epsilon: float = SKILL_MERGE_EPSILON,
+        fuzzy_epsilon: float = SKILL_FUZZY_MERGE_EPSILON,
+    ):
+        self._skill_index = skill_index or get_skill_index()
+        self.epsilon = epsilon
+        self.fuzzy_epsilon = fuzzy_epsilon
+        self._lock = threading.RLock()
+        self._aliases_path = config.SKILL_ALIASES_CONFIG_PATH
+        self._aliases_mtime = None
+        self._aliases = {}
+        self._key_to_row = {}
+        self._indexed_rows = 0
+        self._indexed_lookup = None
+        self.lexical = LexicalSkillResolver()
+        self._load_aliases()
+
+    @classmethod
+    def get_instance(cls) -> "SkillCanonicalizer":
+        """Get the process wide canonicalizer."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = SkillCanonicalizer()
+        return cls._instance
+
+    def __repr__(self):
+        return "<SkillCanonicalizer: aliases: {}; keys: {}; epsilon: {}>".format(
+            len(self._aliases), len(self._key_to_row), self.epsilon
+        )
+
+    def _load_aliases(self):
+        """(Re)load the alias table if it changed on disk."""
+        if not self._aliases_path.exists():
+            return
+        mtime = self._aliases_path.stat().st_mtime_ns
+        if mtime == self._aliases_mtime:
+            return
+        with self._aliases_path.open() as file:
+            self._aliases = json.load(file)
+        self._aliases_mtime = mtime
+
+    def _save_aliases(self, new_aliases: dict[str, str]):
+        """Merge new aliases into the alias table on disk."""
+        lock_path = self._aliases_path.with_name(self._aliases_path.name + ".lock")
+        with open(lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._aliases_mtime = None
+                self._load_aliases()
+                self._aliases.update(new_aliases)
+                tmp_path = self._aliases_path.with_name(self._aliases_path.name + ".tmp")
+                with tmp_path.open("w") as file:
+                    json.dump(self._aliases, file, indent=0, sort_keys=True)
+                os.replace(tmp_path, self._aliases_path)
+                self._aliases_mtime = self._aliases_path.stat().st_mtime_ns
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update_keys(self, data):
+        """Index the normalized keys of vocabulary rows added since the last call."""
+        for row in range(self._indexed_rows, data.count):
+            skill = data.get_skill(row)
+            self._key_to_row.setdefault(normalize_skill_name(skill), row)
+            self.lexical.add(skill, row)
+        self._indexed_rows = data.count
+
+        if data.skill_lookup is not self._indexed_lookup:
+            # Skill lookup entries resolve to their own row or their standard skill row.
+            for skill, standard_skill in data.skill_lookup.items():
+                row = data.get_row(skill)
+                if row is None:
+                    row = data.get_row(standard_skill)
+                if row is not None:
+                    self.lexical.add(skill, row)
+            self._indexed_lookup = data.skill_lookup
+
+    def _lookup(self, data, skill: str):
+        """Canonical row of a lower case skill without embedding it, else None."""
+        alias = self._aliases.get(skill)
+        if alias is not None:
+            row = data.get_row(alias)
+            if row is not None:
+                return row
+        row = data.get_row(skill)
+        if row is not None:
+            return row
+        row = self._key_to_row.get(normalize_skill_name(skill))
+        if row is not None:
+            return row
+        return self.lexical.resolve(skill)
+
+    def get_rows(self, skills: list[str]) -> dict:
+        """Get {skill_lower: canonical row or None} for the skills.
+
+        Variants resolved through their normalized key are added to the
+        alias table.
+        """
+        data = self._skill_index.snapshot()
+        with self._lock:
+            self._load_aliases()
+            self._update_keys(data)
+            rows = {}
+            new_aliases = {}
+            for skill in dict.fromkeys(skill.lower() for skill in skills):
+                row = self._lookup(data, skill)
+                rows[skill] = row
+                if row is not None and data.get_skill(row) != skill and skill not in self._aliases:
+                    new_aliases[skill] = data.get_skill(row)
+            if new_aliases:
+                logger.info(f"New skill aliases: {new_aliases}")
+                self._save_aliases(new_aliases)
+            if None in rows.values():
+                logger.debug(f"Lexical resolver stats: {self.lexical.stats()}")
+            return rows
+
+    def add_skills(self, new_skills: list[str], new_embeddings) -> dict:
+        """Merge new skills into close vocabulary skills or add them.
+
+        new_skills are lower case skills get_rows() could not resolve.
+        Returns {skill: canonical row}.
+        """
+        if not new_skills:
+            return {}
+        embeddings = np.asarray(new_embeddings, dtype=np.float32)
+        normalized = embeddings / np.maximum(
+            np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+        )
+        with self._lock:
+            data = self._skill_index.snapshot()
+            self._update_keys(data)
+            rows = {}
+            new_aliases = {}
+            if data.count > 0:
+                vocabulary = data.embeddings
+                norms = np.linalg.norm(vocabulary, axis=1)
+                norms[norms == 0] = 1.0
+                similarities = (normalized @ vocabulary.T) / norms
+                nearest = np.argmax(similarities, axis=1)
+                for i, skill in enumerate(new_skills):
+                    row = int(nearest[i])
+                    if 1.0 - similarities[i, row] > self.epsilon:
+                        # NOTE: A typo of a vocabulary skill only needs to be close to that skill.
+                        row = self.lexical.resolve_fuzzy(skill)
+                        if row is None or 1.0 - similarities[i, row] > self.fuzzy_epsilon:
+                            continue
+                    rows[skill] = row
+                    new_aliases[skill] = data.get_skill(row)
+
+            # Only the first of the variants in this batch gets a row.
+            added = {}
+            for i, skill in enumerate(new_skills):
+                if skill not in rows:
+                    added.setdefault(normalize_skill_name(skill), i)
+            if added:
+                added_rows = list(added.values())
+                self._skill_index.add_skills([new_skills[i] for i in added_rows], embeddings[added_rows])
+                data = self._skill_index.snapshot()
+                self._update_keys(data)
+                for skill in new_skills:
+                    if skill in rows:
+                        continue
+                    row = self._key_to_row[normalize_skill_name(skill)]
+                    rows[skill] = row
+                    if data.get_skill(row) != skill:
+                        new_aliases[skill] = data.get_skill(row)
+            if new_aliases:
+                logger.info(f"Merged skills into existing skills: {new_aliases}")
+                self._save_aliases(new_aliases)
+            return rows
+
+    def canonical_name(self, skill: str) -> str:
+        """Get the canonical vocabulary skill, or the skill itself if unknown."""
+        return self.canonical_names([skill])[0]
+
+    def canonical_names(self, skills: list[str]) -> list[str]:
+        """Get the canonical vocabulary skill for every skill (unknown skills as is)."""
+        rows = self.get_rows(skills)
+        data = self._skill_index.snapshot()
+        return [
+            data.get_skill(rows[skill.lower()]) if rows[skill.lower()] is not None else skill
+            for skill in skills
+        ]
+
+
+def get_skill_canonicalizer() -> SkillCanonicalizer:
+    """Get the process wide SkillCanonicalizer."""
+    return SkillCanonicalizer.get_instance()
@@ -0,0 +1,202 @@
+"""Process wide index over the skill vocabulary and its embeddings.
+
+The scoring code used to call load_config_files() for every application
+which read the .npy and json config files from disk and then looked up
+skills with list.index(). The index loads them once per process, keeps a
+dict from skill to row and a contiguous float32 matrix, and reloads only
+when the files on disk change.
+"""
+
+import os
+import threading
+import time
+
+from loguru import logger
+
+from intai.config import (
+    CLUSTER_EMBEDDINGS_CONFIG_PATH,
+    CLUSTER_NAMES_CONFIG_PATH,
+    SKILL_CONFIG_PATH,
+    load_cluster_names,
+    load_skill_lookup,
+)
+from intai.ml.cluster_index import ClusterCenterIndex
+from intai.ml.embedding_store import SkillEmbeddingStore
+import numpy as np
+
+# Seconds between two checks of the config files modification time.
+RELOAD_CHECK_INTERVAL = float(os.getenv("SKILL_INDEX_RELOAD_INTERVAL", "5"))
+
+
+class _SkillIndexData:
+    """Immutable snapshot of the index.
+
+    NOTE: Readers grab the snapshot once so they never see a skill_to_row
+    dict from one load and an embeddings matrix from another. The store
+    only appends so rows at or past `count` are ignored.
+    """
+
+    def __init__(self, store: SkillEmbeddingStore, cluster_embeddings, cluster_names, skill_lookup):
+        self.count = store.count
+        self.embeddings = store.embeddings
+        self._skills = store.skills
+        self._skill_to_row = store.skill_to_row
+        self.cluster_embeddings = np.ascontiguousarray(
+            cluster_embeddings, dtype=np.float32
+        )
+        self.cluster_names = cluster_names
+        self.cluster_index = ClusterCenterIndex(self.cluster_embeddings, cluster_names)
+        self.skill_lookup = skill_lookup
+
+    def with_vocabulary(self, store: SkillEmbeddingStore) -> "_SkillIndexData":
+        """Copy of the snapshot with the current store rows, sharing the cluster index."""
+        data = object.__new__(_SkillIndexData)
+        data.__dict__.update(self.__dict__)
+        data.count = store.count
+        data.embeddings = store.embeddings
+        data._skills = store.skills
+        data._skill_to_row = store.skill_to_row
+        return data
+
+    @property
+    def skills(self) -> list[str]:
+        return self._skills[: self.count]
+
+    def get_skill(self, row: int) -> str:
+        """Get the skill at the row."""
+        assert row < self.count
+        return self._skills[row]
+
+    def get_row(self, skill: str):
+        """Get the row for the (lower case) skill or None."""
+        row = self._skill_to_row.get(skill)
+        if row is None or row >= self.count:
+            return None
+        return row
+
+
+class SkillEmbeddingIndex:
+    """Skill vocabulary, embeddings and clusters loaded once per process.
+
+    Use SkillEmbeddingIndex.get_instance() instead of creating it directly.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._data: _SkillIndexData = None
+        self._mtimes = None
+        self._last_check = 0.0
+        self.store = SkillEmbeddingStore()
+        self._load()
+
+    @classmethod
+    def get_instance(cls) -> "SkillEmbeddingIndex":
+        """Get the process wide index, loading it on first use."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = SkillEmbeddingIndex()
+        return cls._instance
+
+    def __repr__(self):
+        return "<SkillEmbeddingIndex: skills: {}; dim: {}; clusters: {}>".format(
+            self._data.count, self.store.dim, len(self._data.cluster_names)
+        )
+
+    @staticmethod
+    def _config_paths():
+        return (
+            CLUSTER_EMBEDDINGS_CONFIG_PATH,
+            CLUSTER_NAMES_CONFIG_PATH,
+            SKILL_CONFIG_PATH,
+        )
+
+    def _config_mtimes(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self._config_paths())
+
+    def _load(self):
+        """Load the cluster and lookup config files and swap in the new snapshot."""
+        with self._lock:
+            start_time = time.perf_counter()
+            mtimes = self._config_mtimes()
+            assert CLUSTER_EMBEDDINGS_CONFIG_PATH.exists()
+            cluster_embeddings = np.load(str(CLUSTER_EMBEDDINGS_CONFIG_PATH))
+            cluster_names = load_cluster_names()
+            if len(cluster_embeddings) != len(cluster_names) and self._data is not None:
+                # Clustering pipeline is in the middle of swapping in a new version.
+                logger.warning("Cluster embeddings and names do not match, keeping previous clusters.")
+                self._last_check = time.monotonic()
+                return
+            self._data = _SkillIndexData(
+                store=self.store,
+                cluster_embeddings=cluster_embeddings,
+                cluster_names=cluster_names,
+                skill_lookup=load_skill_lookup(),
+            )
+            self._mtimes = mtimes
+            self._last_check = time.monotonic()
+            logger.info(
+                f"Loaded {self} in {time.perf_counter() - start_time:.3f} seconds"
+            )
+
+    def _update_vocabulary(self):
+        """Swap in a snapshot with the rows appended to the store."""
+        data = self._data
+        if self.store.count != data.count:
+            self._data = data.with_vocabulary(self.store)
+
+    def refresh(self, force: bool = False):
+        """Pick up new skill rows and reload cluster files changed on disk."""
+        now = time.monotonic()
+        if not force and now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._last_check = now
+            self.store.refresh()
+            if force or self._config_mtimes() != self._mtimes:
+                logger.info("Skill config files changed on disk, reloading index.")
+                self._load()
+            else:
+                self._update_vocabulary()
+
+    def snapshot(self) -> _SkillIndexData:
+        """Get the current snapshot of the index."""
+        self.refresh()
+        return self._data
+
+    def get_row(self, skill: str):
+        """Get the row for the skill or None if its not in vocabulary."""
+        return self.snapshot().get_row(skill.lower())
+
+    def get_embedding(self, skill: str):
+        """Get the embedding for the skill or None if its not in vocabulary."""
+        data = self.snapshot()
+        row = data.get_row(skill.lower())
+        if row is None:
+            return None
+        return data.embeddings[row]
+
+    def get_standard_skill(self, skill: str):
+        """Get the cluster center skill from the skill lookup or None."""
+        return self.snapshot().skill_lookup.get(skill.lower())
+
+    def add_skills(self, new_skills: list[str], new_embeddings):
+        """Add new skills and embeddings to the vocabulary.
+
+        Skills already in vocabulary (or repeated in new_skills) are skipped.
+        """
+        if not new_skills:
+            logger.info("No New Skills found for embedding Lookup")
+            return
+        with self._lock:
+            self.store.append([skill.lower() for skill in new_skills], new_embeddings)
+            self._update_vocabulary()
+            logger.info(f"Updated {self}")
+
+
+def get_skill_index() -> SkillEmbeddingIndex:
+    """Get the process wide SkillEmbeddingIndex."""
+    return SkillEmbeddingIndex.get_instance()
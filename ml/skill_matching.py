@@ -0,0 +1,148 @@
+"""Assign candidate skills to JD skills for a batch of applications.
+
+The JD skills x candidate skills distance matrix is computed once (for the
+distinct skills of all candidates) and the assignment runs on the
+candidates x skills score matrix:
+  * greedy (default): every JD skill in order takes the matching candidate
+    skill with the highest score, then smallest distance, preferring skills
+    not used by an earlier JD skill. Same result as the previous per skill
+    sorting.
+  * optimal: maximum total score assignment with each candidate skill used
+    once (scipy linear_sum_assignment), JD skills left without a skill then
+    reuse their best match like greedy does.
+"""
+
+import os
+from enum import Enum
+
+import numpy as np
+
+# Tie breaker weight of the distance in the optimal assignment.
+_DISTANCE_TIE_BREAK = 1e-6
+
+
+class SkillMatchingMethod(str, Enum):
+    """Assignment method for the candidate skills."""
+
+    GREEDY = "greedy"
+    OPTIMAL = "optimal"
+
+
+SKILL_MATCHING_METHOD = SkillMatchingMethod(os.getenv("SKILL_MATCHING_METHOD", "greedy"))
+
+
+def build_score_matrix(candidates_skills):
+    """Build the candidates x skills score matrix.
+
+    candidates_skills is a list (one per candidate) of [(skill_name, score)].
+    Returns (skill_names, scores) where skill_names are the distinct lower
+    case skills in order of first use and scores is nan where the candidate
+    doesn't have the skill (max score for repeated skills).
+    """
+    skill_names = list(
+        dict.fromkeys(name.lower() for skills in candidates_skills for name, _ in skills)
+    )
+    columns = {name: col for col, name in enumerate(skill_names)}
+    scores = np.full((len(candidates_skills), len(skill_names)), np.nan)
+    for row, skills in enumerate(candidates_skills):
+        for name, score in skills:
+            col = columns[name.lower()]
+            scores[row, col] = np.fmax(scores[row, col], score)
+    return skill_names, scores
+
+
+def _select_best(scores, eligible, distances):
+    """Column of the highest score and then smallest distance per candidate."""
+    masked_scores = np.where(eligible, scores, -np.inf)
+    best = eligible & (masked_scores == masked_scores.max(axis=1, keepdims=True))
+    return np.argmin(np.where(best, distances, np.inf), axis=1)
+
+
+def greedy_assignment(scores, is_match, distances):
+    """Greedy assignment for all candidates at once.
+
+    scores is (candidates, skills), is_match and distances are (jd skills,
+    skills). Returns (candidates, jd skills) selected columns, -1 if none.
+    """
+    num_candidates = scores.shape[0]
+    has_skill = ~np.isnan(scores)
+    rows = np.arange(num_candidates)
+    used = np.zeros_like(has_skill)
+    selected = np.full((num_candidates, len(is_match)), -1, dtype=np.int64)
+    for jd_row in range(len(is_match)):
+        eligible = has_skill & is_match[jd_row]
+        matched = eligible.any(axis=1)
+        if not matched.any():
+            continue
+        unused = eligible & ~used
+        choice = np.where(
+            unused.any(axis=1),
+            _select_best(scores, unused, distances[jd_row]),
+            _select_best(scores, eligible, distances[jd_row]),
+        )
+        selected[matched, jd_row] = choice[matched]
+        used[rows[matched], choice[matched]] = True
+    return selected
+
+
+def optimal_assignment(scores, is_match, distances):
+    """Maximum total score assignment per candidate (see module doc)."""
+    from scipy.optimize import linear_sum_assignment
+
+    selected = np.full((scores.shape[0], len(is_match)), -1, dtype=np.int64)
+    for row in range(scores.shape[0]):
+        # Only the columns of the candidate's own skills.
+        cols = np.flatnonzero(~np.isnan(scores[row]))
+        eligible = is_match[:, cols]
+        if not eligible.any():
+            continue
+        row_scores = scores[row, cols]
+        row_distances = distances[:, cols]
+        weights = np.where(eligible, row_scores - _DISTANCE_TIE_BREAK * row_distances, 0.0)
+        jd_rows, assigned_cols = linear_sum_assignment(weights, maximize=True)
+        assigned = eligible[jd_rows, assigned_cols]
+        selected[row, jd_rows[assigned]] = cols[assigned_cols[assigned]]
+        for jd_row in np.flatnonzero((selected[row] < 0) & eligible.any(axis=1)):
+            best = _select_best(row_scores[None, :], eligible[jd_row][None, :], row_distances[jd_row])
+            selected[row, jd_row] = cols[best[0]]
+    return selected
+
+
+def match_skills_batch(jd_skills, skill_names, scores, distances, threshold, method=None):
+    """Assign the candidate skills of every candidate to the jd skills.
+
+    distances is the (jd skills, skill_names) cosine distance matrix and
+    scores the matrix from build_score_matrix.
+    Returns (total_scores, matching_skills, used_skills) with one entry per
+    candidate where matching_skills is
+    {jd_skill_lower: [(skill_name, score, distance)]} of all candidate
+    skills within the threshold and used_skills is {jd_skill_lower: skill_name}.
+    """
+    method = SkillMatchingMethod(method or SKILL_MATCHING_METHOD)
+    num_candidates = scores.shape[0]
+    matching_skills = [{} for _ in range(num_candidates)]
+    used_skills = [{} for _ in range(num_candidates)]
+    if not skill_names or not jd_skills:
+        return np.zeros(num_candidates), matching_skills, used_skills
+
+    is_match = distances < threshold
+    # NOTE: Ties are broken on the rounded distance which is also persisted.
+    distances = np.round(distances, 2)
+    if method == SkillMatchingMethod.OPTIMAL:
+        selected = optimal_assignment(scores, is_match, distances)
+    else:
+        selected = greedy_assignment(scores, is_match, distances)
+
+    rows, jd_rows = np.nonzero(selected >= 0)
+    total_scores = np.zeros(num_candidates)
+    np.add.at(total_scores, rows, scores[rows, selected[rows, jd_rows]])
+    for row, jd_row in zip(rows, jd_rows):
+        used_skills[row][jd_skills[jd_row].lower()] = skill_names[selected[row, jd_row]]
+
+    has_skill = ~np.isnan(scores)
+    for jd_row, jd_skill in enumerate(jd_skills):
+        for row, col in zip(*np.nonzero(has_skill & is_match[jd_row])):
+            matching_skills[row].setdefault(jd_skill.lower(), []).append(
+                (skill_names[col], float(scores[row, col]), float(distances[jd_row, col]))
+            )
+    return total_scores, matching_skills, used_skills
@@ -0,0 +1,86 @@
+"""Token counting and truncation (tiktoken) for budgeting the prompts."""
+
+from functools import lru_cache
+
+import tiktoken
+from loguru import logger
+
+# Encoding of the gpt-4o models, used for unknown model names.
+DEFAULT_ENCODING = "o200k_base"
+# {model name: (context window, max output tokens)}, see LLMModelType.
+MODEL_TOKEN_LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4-turbo-preview": (128000, 4096),
+    "gpt-4o-2024-08-06": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+}
+DEFAULT_TOKEN_LIMITS = (16385, 4096)
+# Tokens added for every chat message (role, separators) and to prime the reply.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class _CharEncoding:
+    """Approximate encoding (4 chars per token) if the tiktoken encoding can't be loaded."""
+
+    CHARS_PER_TOKEN = 4
+
+    def encode(self, text: str, disallowed_special=()) -> list[str]:
+        return [text[i : i + self.CHARS_PER_TOKEN] for i in range(0, len(text), self.CHARS_PER_TOKEN)]
+
+    def decode(self, tokens: list[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = None):
+    """Get the tiktoken encoding of the model.
+
+    NOTE: tiktoken downloads the encoding on first use, budgeting must not
+    fail the LLM call so an approximate encoding is used if that fails.
+    """
+    try:
+        if model_name is not None:
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                logger.debug(f"No tiktoken encoding for {model_name}, using {DEFAULT_ENCODING}")
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as err:
+        logger.error(f"Failed to load tiktoken encoding, using approximate token counts: {err}")
+        return _CharEncoding()
+
+
+def get_token_limits(model_name: str) -> tuple[int, int]:
+    """Get (context window, max output tokens) of the model."""
+    return MODEL_TOKEN_LIMITS.get(model_name, DEFAULT_TOKEN_LIMITS)
+
+
+def count_tokens(text: str, model_name: str = None) -> int:
+    """Number of tokens in the text."""
+    if not text:
+        return 0
+    return len(get_encoding(model_name).encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list[dict[str, str]], model_name: str = None) -> int:
+    """Number of prompt tokens of the chat messages."""
+    tokens = TOKENS_PER_REPLY
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        for value in message.values():
+            tokens += count_tokens(str(value), model_name)
+    return tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = None) -> str:
+    """Keep the first max_tokens tokens of the text."""
+    if not text or max_tokens is None:
+        return text
+    encoding = get_encoding(model_name)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    logger.warning(f"Truncating text from {len(tokens)} to {max_tokens} tokens")
+    return encoding.decode(tokens[:max_tokens])
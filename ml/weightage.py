@@ -0,0 +1,115 @@
+"""Weightage config as a half-year indexed table with prefix sums.
+
+weightage_config.json maps a year of experience ("0.5", "1", "1.5", ...)
+to the weightage of a skill used in that year. Scoring used to loop over
+every (half) year for every skill and look the weightage up by string key.
+The table keeps the weightages in a numpy array indexed by half-year with
+cumulative sums, so the score of any (start_year, duration) interval is
+O(1) and a batch of intervals is scored with one vectorized pass.
+"""
+
+import threading
+
+import numpy as np
+from loguru import logger
+
+import intai.config as config
+
+# Weightage of a year past the configured years in the ideal candidate score.
+IDEAL_DEFAULT_WEIGHTAGE = 1
+
+
+class WeightageTable:
+    """Weightage per half year of experience.
+
+    Half year index h is the year h / 2, so "0.5" is index 1 and "1" is
+    index 2. Years past the configured ones get a default weightage.
+    """
+
+    def __init__(self, weightage_dict: dict):
+        assert "max" in weightage_dict
+        self.max_score = float(weightage_dict["max"])
+        half_years = {
+            int(round(float(year) * 2)): float(weightage)
+            for year, weightage in weightage_dict.items()
+            if year != "max"
+        }
+        self.size = max(half_years, default=0) + 1
+        self._weightages = np.full(self.size, np.nan)
+        for half_year, weightage in half_years.items():
+            self._weightages[half_year] = weightage
+        # NOTE: Half years missing in the config count as max_score like the
+        # previous string key lookup did.
+        self._half_year_cumsum = np.concatenate(
+            ([0.0], np.cumsum(np.nan_to_num(self._weightages, nan=self.max_score)))
+        )
+        whole_years = self._weightages[2::2]
+        self._whole_year_cumsum = np.concatenate(
+            ([0.0], np.cumsum(np.nan_to_num(whole_years, nan=IDEAL_DEFAULT_WEIGHTAGE)))
+        )
+
+    def __repr__(self):
+        return "<WeightageTable: half_years: {}; max: {}>".format(self.size - 1, self.max_score)
+
+    @classmethod
+    def from_config(cls) -> "WeightageTable":
+        return WeightageTable(config.load_weightage_config())
+
+    def get_weightage(self, year: float, default: float = None) -> float:
+        """Get the weightage of the year or default (max_score) if not configured."""
+        half_year = int(year * 2)
+        if 0 <= half_year < self.size and not np.isnan(self._weightages[half_year]):
+            return float(self._weightages[half_year])
+        return self.max_score if default is None else default
+
+    def ideal_skill_score(self, years: int) -> float:
+        """Sum of weightages for years 1..years (whole years only).
+
+        Years past the configured ones count IDEAL_DEFAULT_WEIGHTAGE.
+        """
+        years = max(int(years), 0)
+        configured = min(years, len(self._whole_year_cumsum) - 1)
+        return float(
+            self._whole_year_cumsum[configured]
+            + (years - configured) * IDEAL_DEFAULT_WEIGHTAGE
+        )
+
+    def interval_scores(self, start_years, durations):
+        """Score a batch of experience intervals.
+
+        Every interval covers the half years start_year, start_year + 0.5, ...
+        for duration years. Half years past the configured ones count
+        max_score. Returns a numpy array with one score per interval.
+        """
+        start = np.floor(np.asarray(start_years, dtype=np.float64) * 2).astype(np.int64)
+        count = np.floor(np.asarray(durations, dtype=np.float64) * 2).astype(np.int64)
+        count = np.maximum(count, 0)
+        end = start + count
+        last = len(self._half_year_cumsum) - 1
+        clipped_start = np.clip(start, 0, last)
+        clipped_end = np.clip(end, 0, last)
+        scores = self._half_year_cumsum[clipped_end] - self._half_year_cumsum[clipped_start]
+        overflow = end - np.maximum(start, last)
+        return scores + np.maximum(overflow, 0) * self.max_score
+
+    def interval_score(self, start_year: float, duration: float) -> float:
+        """Score of one experience interval (see interval_scores)."""
+        return float(self.interval_scores([start_year], [duration])[0])
+
+
+_weightage_table = None
+_weightage_table_mtime = None
+_weightage_table_lock = threading.Lock()
+
+
+def get_weightage_table() -> WeightageTable:
+    """Get the process wide WeightageTable, reloaded if the config file changed."""
+    global _weightage_table, _weightage_table_mtime
+    mtime = config.WEIGHTAGE_CONFIG_PATH.stat().st_mtime_ns
+    if _weightage_table is None or mtime != _weightage_table_mtime:
+        with _weightage_table_lock:
+            if _weightage_table is None or mtime != _weightage_table_mtime:
+                _weightage_table = WeightageTable.from_config()
+                _weightage_table_mtime = mtime
+                logger.info(f"Loaded {_weightage_table}")
+    return _weightage_table
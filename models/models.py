@@ -1,12 +1,14 @@
 """JobApplicationDb SQL model."""
 
 import os
+import threading
 import timeit
 import traceback
 from dotenv import load_dotenv
 from enum import Enum as PyEnum
 from sqlalchemy import (
     LargeBinary,
+    bindparam,
     DateTime,
     ForeignKey,
     String,
@@ -16,10 +18,12 @@ from sqlalchemy import (
     select,
     update,
     Enum,
+    Index,
     Integer,
     UniqueConstraint,
+    event,
 )
-from sqlalchemy.engine import URL, create_engine
+from sqlalchemy.engine import URL, create_engine, make_url
 from sqlalchemy.orm import (
     declarative_base,
     joinedload,
@@ -28,7 +32,7 @@ from sqlalchemy.orm import (
     mapped_column,
     relationship,
 )
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from typing import List, Optional
 from sqlalchemy.sql import func
@@ -50,12 +54,68 @@ from intai.schemas.job_application import (
     JobApplicationVolunteer,
     JobApplicationScore,
 )
+from intai.models.skill_id_cache import skill_id_cache
 from intai.schemas.company import Company
 from intai.schemas.job_posting import JobPosting
 from loguru import logger
 
 Base = declarative_base()
 
+# Columns filled by the database on insert.
+_SERVER_COLUMNS = ("id", "created_at", "updated_at")
+
+
+def bulk_insert(session, db_objects: list):
+    """Insert the db objects with one multi-row INSERT per table.
+
+    NOTE: Doesn't commit so the caller can insert all rows of an entity in
+    one transaction, and doesn't set the generated ids on the objects.
+    """
+    objects_by_model = {}
+    for db_object in db_objects:
+        objects_by_model.setdefault(type(db_object), []).append(db_object)
+    for model, objects in objects_by_model.items():
+        columns = [
+            column.key for column in model.__table__.columns if column.key not in _SERVER_COLUMNS
+        ]
+        rows = [{column: getattr(db_object, column) for column in columns} for db_object in objects]
+        logger.debug(f"Bulk inserting {len(rows)} rows into {model.__tablename__}")
+        session.execute(insert(model).values(rows))
+
+
+
+def insert_ignore_duplicates(session, model, rows: list[dict]):
+    """INSERT statement of the rows skipping the rows duplicate of a unique key.
+
+    NOTE: The MySQL and SQLite upserts differ, the dialect of the session's
+    engine picks one.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(model).values(rows).on_conflict_do_nothing()
+    from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+    return mysql_insert(model).values(rows).on_duplicate_key_update(id=model.id)
+
+
+def insert_update_duplicates(session, model, row: dict, update_columns: list[str], index_elements: list[str]):
+    """INSERT statement of the row updating update_columns of the row duplicate of the unique key.
+
+    index_elements are the columns of the unique key, SQLite needs them for
+    the conflict target.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        stmt = sqlite_insert(model).values(row)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements, set_={column: stmt.excluded[column] for column in update_columns}
+        )
+    from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+    stmt = mysql_insert(model).values(row)
+    return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in update_columns})
 
 class CompanyDb(Base):
     """
@@ -153,6 +213,19 @@ class CompanyDb(Base):
             logger.error(f"{err}")
             raise err
 
+    @classmethod
+    async def aget_company(cls, session: AsyncSession, company_id):
+        """Get company for company id (async session)."""
+        logger.debug(f"{company_id} ")
+        try:
+            stmt = select(CompanyDb).filter(CompanyDb.id == company_id)
+            result = await session.execute(stmt)
+            return result.scalars().first()
+
+        except Exception as err:
+            logger.error(f"{err}")
+            raise err
+
     @classmethod
     def delete(cls, session, company_id: int):
         try:
@@ -191,6 +264,13 @@ class JobPostingDb(Base):
     created_at = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at = mapped_column(DateTime(timezone=True), onupdate=func.now())
     status: Mapped[Optional[str]] = mapped_column(String(32))
+    # Serialized JobPostingArtifact (JD skill matrix, title etc.) used for scoring.
+    # NOTE: Deferred so loading the job posting doesn't fetch the blob.
+    jd_artifact: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary(length=2**32 - 1), deferred=True
+    )
+    # Bumped on every jd_artifact update so per process caches see the change.
+    jd_artifact_version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     job_applications: Mapped[List["JobApplicationDb"]] = relationship(
         back_populates="job_posting"
     )
@@ -298,8 +378,11 @@ class JobPostingDb(Base):
             logger.error(f"error update_job_posting {err}")
             raise err
 
-    def update_ideal_candidate_score(self, session, score: float):
-        """Update the ideal candidate score for this job posting."""
+    def update_ideal_candidate_score(self, session, score: float, commit: bool = True):
+        """Update the ideal candidate score for this job posting.
+
+        commit False leaves the update in the session transaction.
+        """
         try:
             stmt = (
                 update(JobPostingDb)
@@ -307,11 +390,62 @@ class JobPostingDb(Base):
                 .values(ideal_candidate_score=score)
             )
             session.execute(stmt)
-            session.commit()
+            if commit:
+                session.commit()
         except Exception as err:
             logger.error(f"error update ideal candidate score {err}")
             raise err
 
+    @classmethod
+    def update_jd_artifact(cls, session, job_posting_id: int, jd_artifact: bytes, commit: bool = True) -> int:
+        """Update the serialized jd artifact for this job posting, returns its new version.
+
+        commit False leaves the update in the session transaction.
+        """
+        try:
+            stmt = (
+                update(JobPostingDb)
+                .where(JobPostingDb.id == job_posting_id)
+                .values(
+                    jd_artifact=jd_artifact,
+                    jd_artifact_version=JobPostingDb.jd_artifact_version + 1,
+                )
+            )
+            session.execute(stmt)
+            # NOTE: Read before the commit, the updated row is locked until then.
+            version = cls.get_jd_artifact_version(session, job_posting_id)
+            if commit:
+                session.commit()
+            return version
+        except Exception as err:
+            logger.error(f"error update jd artifact {err}")
+            raise err
+
+    @classmethod
+    def get_jd_artifact(cls, session, job_posting_id: int):
+        """Get (serialized jd artifact bytes or None, version) for job posting."""
+        try:
+            stmt = select(JobPostingDb.jd_artifact, JobPostingDb.jd_artifact_version).filter(
+                JobPostingDb.id == job_posting_id
+            )
+            row = session.execute(stmt).one_or_none()
+            return (row.jd_artifact, row.jd_artifact_version) if row is not None else (None, None)
+        except Exception as err:
+            logger.error(f"{err}")
+            raise err
+
+    @classmethod
+    def get_jd_artifact_version(cls, session, job_posting_id: int):
+        """Get the jd artifact version for job posting or None."""
+        try:
+            stmt = select(JobPostingDb.jd_artifact_version).filter(
+                JobPostingDb.id == job_posting_id
+            )
+            return session.execute(stmt).scalar_one_or_none()
+        except Exception as err:
+            logger.error(f"{err}")
+            raise err
+
     @classmethod
     def get_job_posting(cls, session, company_id, client_job_id):
         """Get job posting for company and client-job-id."""
@@ -332,7 +466,24 @@ class JobPostingDb(Base):
             raise err
 
     @classmethod
-    def delete(cls, session, company_id: int, job_posting_id: int):
+    async def aget_job_posting(cls, session: AsyncSession, company_id, client_job_id):
+        """Get job posting for company and client-job-id (async session)."""
+        logger.trace(f"{company_id} {client_job_id}")
+        try:
+            stmt = (
+                select(JobPostingDb)
+                .filter(JobPostingDb.company_id == company_id)
+                .filter(JobPostingDb.client_job_id == client_job_id)
+            )
+            result = await session.execute(stmt)
+            return result.scalars().first()
+
+        except Exception as err:
+            logger.error(f"{err}")
+            raise err
+
+    @classmethod
+    def delete(cls, session, company_id: int, job_posting_id: int, commit: bool = True):
         try:
             logger.info(
                 f"Deleting entity JobPostingDb company_id: {company_id}; ja_id: {job_posting_id}"
@@ -342,7 +493,8 @@ class JobPostingDb(Base):
                 .where(JobPostingDb.company_id == company_id)
                 .where(JobPostingDb.id == job_posting_id)
             )
-            session.commit()
+            if commit:
+                session.commit()
         except Exception as err:
             logger.error(str(err))
             raise err
@@ -352,21 +504,27 @@ class JobPostingDb(Base):
         """Delete JobPosting and JobPostingSkills for this client_job_id.
 
         Also delete all the job applications which exist for this job posting.
+        The jp_skills are deleted by the database (cascade) and everything
+        is deleted in one transaction.
         """
         try:
             logger.info(
                 f"Deleting job posting entities: cid: {company_id}, cjid: {client_job_id}"
             )
+            start_time = timeit.default_timer()
             existing_job_posting_db = JobPostingDb.get_job_posting(
                 session, company_id, client_job_id
             )
             if existing_job_posting_db:
                 job_posting_id: int = existing_job_posting_db.id
                 JobApplicationDb.delete_entities_for_job_posting(
-                    session, company_id, client_job_id
+                    session, company_id, client_job_id, commit=False
+                )
+                JobPostingDb.delete(session, company_id, job_posting_id, commit=False)
+                session.commit()
+                logger.info(
+                    f"Deleted job posting entities in {timeit.default_timer() - start_time:.3f} seconds"
                 )
-                JobPostingSkillDb.delete(session, company_id, job_posting_id)
-                JobPostingDb.delete(session, company_id, job_posting_id)
             else:
                 logger.error(
                     f"Existing JobPostingDb not found for update case: [cid: {company_id}], [cj_id: {client_job_id}]"
@@ -400,13 +558,14 @@ class JobApplicationDb(Base):
     __tablename__ = "job_applications"
     __table_args__ = (
         UniqueConstraint("company_id", "client_job_application_id", name="uix_ci_cjai"),
+        Index("ix_ja_ci_jpi", "company_id", "job_posting_id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[int]
     client_job_application_id: Mapped[int]
-    job_posting_id: Mapped[int] = mapped_column(ForeignKey("job_postings.id"))
-    jad_id: Mapped[int] = mapped_column(ForeignKey("ja_details.id"))
+    job_posting_id: Mapped[int] = mapped_column(ForeignKey("job_postings.id", ondelete="CASCADE"))
+    jad_id: Mapped[int] = mapped_column(ForeignKey("ja_details.id", ondelete="CASCADE"))
 
     # TODO #B: Can candidate email be null?
     candidate_email: Mapped[Optional[str]] = mapped_column(String(255))
@@ -540,7 +699,7 @@ class JobApplicationDb(Base):
             raise err
 
     @classmethod
-    def delete(cls, session, company_id: int, job_application_id: int):
+    def delete(cls, session, company_id: int, job_application_id: int, commit: bool = True):
         try:
             logger.info(
                 f"Deleting JobApplicationDb entity company_id: {company_id}; ja_id: {job_application_id}"
@@ -550,19 +709,24 @@ class JobApplicationDb(Base):
                 .where(JobApplicationDb.company_id == company_id)
                 .where(JobApplicationDb.id == job_application_id)
             )
-            session.commit()
+            if commit:
+                session.commit()
         except Exception as err:
             logger.error(str(err))
             raise err
 
     @classmethod
     def delete_entities_for_job_posting(
-        cls, session, company_id: int, client_job_id: int
+        cls, session, company_id: int, client_job_id: int, commit: bool = True
     ):
-        """Delete all job application entities for client job id."""
+        """Delete all job application entities for client job id.
+
+        NOTE: Deletes the ja_details of all the applications with one
+        statement, the database cascades to the applications and entities.
+        """
         try:
             logger.info(
-                "Deleting all job application entities for job_posting. cid:{company_id}, cjid: {client_job_id}"
+                f"Deleting all job application entities for job_posting. cid:{company_id}, cjid: {client_job_id}"
             )
             # Find all the job applications for this job posting id.
             job_applications = JobApplicationDb.get_job_application_for_posting(
@@ -570,12 +734,22 @@ class JobApplicationDb(Base):
             )
             logger.info(job_applications)
 
-            if job_applications is not None:
-                for job_application in job_applications:
-                    logger.info(job_application)
-                    cjaid = job_application.client_job_application_id
-                    logger.info(cjaid)
-                    JobApplicationDb.delete_entities(session, company_id, cjaid)
+            if job_applications:
+                jad_ids = [ja.jad_id for ja in job_applications if ja.jad_id is not None]
+                if jad_ids:
+                    session.execute(
+                        delete(JobApplicationDetailDb)
+                        .where(JobApplicationDetailDb.company_id == company_id)
+                        .where(JobApplicationDetailDb.id.in_(jad_ids))
+                    )
+                # Applications without a jad.
+                session.execute(
+                    delete(JobApplicationDb)
+                    .where(JobApplicationDb.company_id == company_id)
+                    .where(JobApplicationDb.id.in_([ja.id for ja in job_applications]))
+                )
+                if commit:
+                    session.commit()
             else:
                 logger.info("no Job applications found for this job posting.")
 
@@ -586,12 +760,17 @@ class JobApplicationDb(Base):
 
     @classmethod
     def delete_entities(cls, session, company_id: int, client_job_application_id: int):
-        """Delete all the jobapplication entities for this ja."""
+        """Delete all the jobapplication entities for this ja.
+
+        One delete of the root row (ja_details) in one transaction, see
+        JobApplicationDetailDb.delete.
+        """
         logger.info(
             f"Deleting job applications for company_id: {company_id}; ja_id: {client_job_application_id}"
         )
 
         try:
+            start_time = timeit.default_timer()
             existing_job_application_db = JobApplicationDb.get_job_application(
                 session, company_id, client_job_application_id
             )
@@ -599,9 +778,14 @@ class JobApplicationDb(Base):
                 job_application_id: int = existing_job_application_db.id
                 jad_id: int = existing_job_application_db.jad_id
 
-                JobApplicationScoreDb.delete(session, company_id, job_application_id)
-                JobApplicationDb.delete(session, company_id, job_application_id)
-                JobApplicationDetailDb.delete(session, company_id, jad_id=jad_id)
+                if jad_id is not None:
+                    JobApplicationDetailDb.delete(session, company_id, jad_id=jad_id, commit=False)
+                else:
+                    JobApplicationDb.delete(session, company_id, job_application_id, commit=False)
+                session.commit()
+                logger.info(
+                    f"Deleted job application entities in {timeit.default_timer() - start_time:.3f} seconds"
+                )
             else:
                 logger.error(
                     f"Existing Job ApplicationDb not found for update case: [cid: {company_id}], [cja_id: {client_job_application_id}]"
@@ -646,6 +830,29 @@ class JobApplicationDb(Base):
             logger.error(str(err))
             raise err
 
+    @classmethod
+    async def aget_job_application(
+        cls, session: AsyncSession, company_id, client_job_application_id
+    ):
+        """Get the job application for client-job-application_id (async session)."""
+        logger.debug(
+            f"{company_id} for job application client id: {client_job_application_id}"
+        )
+        try:
+            stmt = (
+                select(JobApplicationDb)
+                .filter(JobApplicationDb.company_id == company_id)
+                .filter(
+                    JobApplicationDb.client_job_application_id
+                    == client_job_application_id
+                )
+            )
+            result = await session.execute(stmt)
+            return result.scalars().first()
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def get_job_application_for_posting(cls, session, company_id, client_job_id):
         """Get the job application for the company and client-job-id."""
@@ -836,8 +1043,11 @@ class JobApplicationDetailDb(Base):
             logger.error(str(err))
             raise err
 
-    def update(self, session, job_application_detail):
-        """Update the job application detail in database."""
+    def update(self, session, job_application_detail, commit: bool = True):
+        """Update the job application detail in database.
+
+        commit False leaves the update in the session transaction.
+        """
         try:
             logger.debug(f"self: {self}\n job_application_detail: {job_application_detail}")
             
@@ -856,7 +1066,8 @@ class JobApplicationDetailDb(Base):
                     update(JobApplicationDetailDb).where(JobApplicationDetailDb.id == self.id).values(val)
                 )
                 session.execute(stmt)
-                session.commit()
+                if commit:
+                    session.commit()
                 logger.info(f"Updated JAD ID: {self.id} Updated:{self}")
             else:
                 raise Exception("No changes to update")
@@ -866,41 +1077,24 @@ class JobApplicationDetailDb(Base):
 
 
     @classmethod
-    def delete(cls, session, company_id: int, jad_id: int):
-        """Delete the jobapplicationdetail based on jad_id."""
+    def delete(cls, session, company_id: int, jad_id: int, commit: bool = True):
+        """Delete the jobapplicationdetail based on jad_id.
+
+        NOTE: ja_details is the root row of the applicant entities, the
+        database cascades the delete to all ja_* tables, the ja_skills,
+        the job application (and its score) or candidate of the jad.
+        """
         try:
             logger.info(
                 f"Deleting JobApplicationDetailDb entity company_id: {company_id}; ja_id: {jad_id}"
             )
-
-            JobApplicationAddressDb.delete(session, company_id, jad_id)
-            JobApplicationAwardDb.delete(session, company_id, jad_id)
-            JobApplicationCertificationDb.delete(
-                session, company_id, jad_id
-            )
-            JobApplicationEducationDb.delete(
-                session, company_id, jad_id
-            )
-            JobApplicationExperienceDb.delete(
-                session, company_id, jad_id
-            )
-            JobApplicationInterestDb.delete(session, company_id, jad_id)
-            JobApplicationLanguageDb.delete(session, company_id, jad_id)
-            JobApplicationProjectDb.delete(session, company_id, jad_id)
-            JobApplicationPublicationDb.delete(
-                session, company_id, jad_id
-            )
-            JobApplicationVolunteerDb.delete(
-                session, company_id, jad_id
-            )
-            JobApplicationSkillDb.delete(session, company_id, jad_id)
-
             session.execute(
                 delete(JobApplicationDetailDb)
                 .where(JobApplicationDetailDb.company_id == company_id)
                 .where(JobApplicationDetailDb.id == jad_id)
             )
-            session.commit()
+            if commit:
+                session.commit()
         except Exception as err:
             logger.error(str(err))
             raise err
@@ -967,10 +1161,11 @@ class CandidateDb(Base):
     # __table_args__ = (
     #     UniqueConstraint("company_id", "client_candidate_id", name="uix_ci_cci"),
     # )
+    __table_args__ = (Index("ix_candidates_ci_cci", "company_id", "client_candidate_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[int]
-    jad_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ja_details.id"), nullable=True)
+    jad_id: Mapped[Optional[int]] = mapped_column(ForeignKey("ja_details.id", ondelete="CASCADE"), nullable=True)
     client_candidate_id: Mapped[Optional[int]]
 
     # TODO #B: Can candidate email be null?
@@ -1088,7 +1283,7 @@ class CandidateDb(Base):
             raise err
 
     @classmethod
-    def delete(cls, session, company_id: int, candidate_id: int):
+    def delete(cls, session, company_id: int, candidate_id: int, commit: bool = True):
         """Delete the Candidate object."""
         try:
             logger.info(
@@ -1099,7 +1294,8 @@ class CandidateDb(Base):
                 .where(CandidateDb.company_id == company_id)
                 .where(CandidateDb.id == candidate_id)
             )
-            session.commit()
+            if commit:
+                session.commit()
         except Exception as err:
             logger.error(str(err))
             raise err
@@ -1119,9 +1315,14 @@ class CandidateDb(Base):
             logger.warning(existing_candidate_db)
             if existing_candidate_db:
                 candidate_id: int = existing_candidate_db.id
+                jad_id: int = existing_candidate_db.jad_id
 
-                CandidateDb.delete(session, company_id, candidate_id)
-                JobApplicationDetailDb.delete(session, company_id, existing_candidate_db.jad_id)
+                # The delete of the jad cascades to the candidate.
+                if jad_id is not None:
+                    JobApplicationDetailDb.delete(session, company_id, jad_id, commit=False)
+                else:
+                    CandidateDb.delete(session, company_id, candidate_id, commit=False)
+                session.commit()
             else:
                 logger.error(
                     f"Existing CandidateDb not found for update case: [cid: {company_id}], [cc_id: {client_candidate_id}]"
@@ -1176,10 +1377,11 @@ class JobApplicationAddressDb(Base):
     """
 
     __tablename__ = "ja_addresses"
+    __table_args__ = (Index("ix_ja_addresses_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1287,10 +1489,11 @@ class JobApplicationAwardDb(Base):
     """
 
     __tablename__ = "ja_awards"
+    __table_args__ = (Index("ix_ja_awards_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1394,10 +1597,11 @@ class JobApplicationExperienceDb(Base):
     """
 
     __tablename__ = "ja_experiences"
+    __table_args__ = (Index("ix_ja_experiences_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1532,10 +1736,11 @@ class JobApplicationEducationDb(Base):
     """
 
     __tablename__ = "ja_educations"
+    __table_args__ = (Index("ix_ja_educations_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1650,10 +1855,11 @@ class JobApplicationLanguageDb(Base):
     """
 
     __tablename__ = "ja_languages"
+    __table_args__ = (Index("ix_ja_languages_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1757,10 +1963,11 @@ class JobApplicationProjectDb(Base):
     """
 
     __tablename__ = "ja_projects"
+    __table_args__ = (Index("ix_ja_projects_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1870,10 +2077,11 @@ class JobApplicationCertificationDb(Base):
     """
 
     __tablename__ = "ja_certifications"
+    __table_args__ = (Index("ix_ja_certifications_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -1978,6 +2186,7 @@ class JobApplicationCertificationDb(Base):
                     JobApplicationCertificationDb.jad_id
                     == jad_id
                 )
+                .order_by(JobApplicationCertificationDb.id)
             )
             logger.debug(f"{stmt}")
             result = session.execute(stmt).scalars().all()
@@ -1998,9 +2207,12 @@ class JobApplicationCertificationSkillDb(Base):
     """
 
     __tablename__ = "ja_certification_skills"
+    __table_args__ = (
+        Index("ix_ja_certification_skills_ci_certi", "company_id", "certification_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    certification_id: Mapped[int] = mapped_column(ForeignKey("ja_certifications.id"))
+    certification_id: Mapped[int] = mapped_column(ForeignKey("ja_certifications.id", ondelete="CASCADE"))
     company_id: Mapped[int]
 
     skill_name: Mapped[Optional[str]] = mapped_column(String(512))
@@ -2183,10 +2395,11 @@ class JobApplicationPublicationDb(Base):
     """
 
     __tablename__ = "ja_publications"
+    __table_args__ = (Index("ix_ja_publications_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -2295,10 +2508,11 @@ class JobApplicationInterestDb(Base):
     """
 
     __tablename__ = "ja_interests"
+    __table_args__ = (Index("ix_ja_interests_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -2399,10 +2613,11 @@ class JobApplicationVolunteerDb(Base):
     """
 
     __tablename__ = "ja_volunteers"
+    __table_args__ = (Index("ix_ja_volunteers_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     jad_id: Mapped[int] = mapped_column(
-        ForeignKey("ja_details.id")
+        ForeignKey("ja_details.id", ondelete="CASCADE")
     )
     company_id: Mapped[int]
 
@@ -2512,6 +2727,9 @@ class SkillDb(Base):
     """
 
     __tablename__ = "skills"
+    __table_args__ = (
+        UniqueConstraint("company_id", "skill_name", name="uix_skills_ci_sn"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[int]
@@ -2589,23 +2807,103 @@ class SkillDb(Base):
             logger.error(str(err))
             raise err
 
+    @classmethod
+    def get_skill_ids(cls, session, company_id: int, skill_names: [str]):
+        """Get {skill_name: id} for skills already in the skills table.
+
+        Skills not in the per company cache are selected with one query.
+        Raises if a skill is not in the skills table.
+        """
+        skill_ids, misses = skill_id_cache.get_many(company_id, skill_names)
+        if not misses:
+            return skill_ids
+        try:
+            # Skills upserted in this transaction are not cached until it commits.
+            pending = skill_id_cache.get_pending(session, company_id)
+            for skill_name in [name for name in misses if name.lower() in pending]:
+                skill_ids[skill_name] = pending[skill_name.lower()]
+            misses = [name for name in misses if name.lower() not in pending]
+            if misses:
+                stmt = (
+                    select(SkillDb.id, SkillDb.skill_name)
+                    .filter(SkillDb.company_id == company_id)
+                    .filter(SkillDb.skill_name.in_(misses))
+                )
+                ids_by_name = {skill_name.lower(): skill_id for skill_id, skill_name in session.execute(stmt).all()}
+                found = {}
+                for skill_name in misses:
+                    if skill_name.lower() not in ids_by_name:
+                        raise Exception(f"SkillDb: Skill name not found in skill_db. {skill_name}")
+                    found[skill_name] = ids_by_name[skill_name.lower()]
+                skill_id_cache.put_many(company_id, found)
+                skill_ids.update(found)
+            return skill_ids
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
+    @classmethod
+    def upsert_skill_ids(
+        cls, session, company_id: int, skill_names: [str], standardize=None, commit: bool = True
+    ):
+        """Insert the skills not in the skills table and get {skill_name: id}.
+
+        standardize maps a list of new skill names to their standard skill
+        names. Skills not in the per company cache cost one INSERT ignoring
+        the existing skills and one select, cached skills none.
+        commit False leaves the insert in the session transaction.
+        """
+        skill_ids, misses = skill_id_cache.get_many(company_id, dict.fromkeys(skill_names))
+        if not misses:
+            return skill_ids
+        try:
+            standard_skill_names = standardize(misses) if standardize else [None] * len(misses)
+            skills = [
+                SkillDb(company_id, skill_name, standard_skill_name).get_dict()
+                for skill_name, standard_skill_name in zip(misses, standard_skill_names)
+            ]
+            # NOTE: Existing skills keep their row and standard skill name.
+            stmt = insert_ignore_duplicates(session, SkillDb, skills)
+            session.execute(stmt)
+
+            stmt = (
+                select(SkillDb.id, SkillDb.skill_name)
+                .filter(SkillDb.company_id == company_id)
+                .filter(SkillDb.skill_name.in_(misses))
+            )
+            ids_by_name = {skill_name.lower(): skill_id for skill_id, skill_name in session.execute(stmt).all()}
+            found = {skill_name: ids_by_name[skill_name.lower()] for skill_name in misses}
+            skill_ids.update(found)
+            if commit:
+                session.commit()
+                skill_id_cache.put_many(company_id, found)
+            else:
+                skill_id_cache.put_pending(session, company_id, found)
+            logger.debug(f"Upserted skills: {found} {skill_id_cache}")
+            return skill_ids
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def delete_all(cls, session, company_id: int):
         """Delete skills by company_id."""
         try:
             session.execute(delete(SkillDb).where(SkillDb.company_id == company_id))
             session.commit()
+            skill_id_cache.invalidate(company_id)
         except Exception as err:
             logger.error(str(err))
             raise err
 
     @classmethod
     def insert_skills_no_duplicates(
-        cls, session, company_id: int, skills_list: [(str, str)]
+        cls, session, company_id: int, skills_list: [(str, str)], commit: bool = True
     ):
         """Insert skills tuples (skillname, standard_skill_name).
 
         NOTE: If skill name is already in data base it doesn't inserts it.
+        commit False leaves the insert in the session transaction.
         """
         # Filter skills already in Db.
         # logger.debug(skills_list)
@@ -2641,9 +2939,11 @@ class SkillDb(Base):
 
             # Insert the skills to Skills db
             if len(skills) > 0:
-                stmt = insert(SkillDb).values(skills)
+                # NOTE: Case variants of an existing skill are duplicates of the unique key.
+                stmt = insert_ignore_duplicates(session, SkillDb, skills)
                 session.execute(stmt)
-                session.commit()
+                if commit:
+                    session.commit()
             else:
                 logger.warning(
                     f"No new skills to insert as length is 0. company_id: {company_id} skills: {skills_list}"
@@ -2663,12 +2963,12 @@ class JobPostingSkillDb(Base):
     """
 
     __tablename__ = "jp_skills"
+    __table_args__ = (Index("ix_jp_skills_ci_jpi", "company_id", "job_posting_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[int]
 
-    # TODO #D: Do we need a foreign key here for some reason.
-    job_posting_id: Mapped[int]
+    job_posting_id: Mapped[int] = mapped_column(ForeignKey("job_postings.id", ondelete="CASCADE"))
     skill_id: Mapped[int] = mapped_column(ForeignKey("skills.id"))
 
     score: Mapped[float]
@@ -2748,26 +3048,8 @@ class JobPostingSkillDb(Base):
         jp_skills = []
 
         try:
-            # TODO #D Just select skill name and id that we need here.
-            skill_names_ip = skills_score.keys()
-            skill_stmt = (
-                select(SkillDb)
-                .filter(SkillDb.skill_name.in_(skill_names_ip))
-                .filter(SkillDb.company_id == company_id)
-            )
-            result = session.execute(skill_stmt).all()
-            skills_db_list = [r[0] for r in result]
-            # logger.debug(f"{skills_db_list}")
-
-            for skill_name in skill_names_ip:
-                skill_db_matching = [
-                    x.id for x in skills_db_list if x.skill_name == skill_name
-                ]
-                if len(skill_db_matching) == 0:
-                    raise Exception(
-                        f"SkillDb: Skill name not found in skill_db. {skill_name}"
-                    )
-                skill_id = skill_db_matching[0]
+            skill_ids = SkillDb.get_skill_ids(session, company_id, list(skills_score.keys()))
+            for skill_name, skill_id in skill_ids.items():
                 # logger.debug(f"{skill_name} {skill_id}")
                 jp_skill = JobPostingSkillDb(
                     company_id=company_id,
@@ -2830,13 +3112,13 @@ class JobApplicationSkillDb(Base):
     """
 
     __tablename__ = "ja_skills"
+    __table_args__ = (Index("ix_ja_skills_ci_jadi", "company_id", "jad_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     company_id: Mapped[int]
 
     # TODO #C: Add a column and relationship to Experience table.
-    # TODO #C: Do we need a foreign key here for some reason.
-    jad_id: Mapped[int]
+    jad_id: Mapped[int] = mapped_column(ForeignKey("ja_details.id", ondelete="CASCADE"))
     skill_id: Mapped[int] = mapped_column(ForeignKey("skills.id"))
 
     score: Mapped[float]
@@ -2877,10 +3159,15 @@ class JobApplicationSkillDb(Base):
         company_id: int,
         jad_id: int,
         skills_score: {str: float},
+        commit: bool = True,
+        skill_ids: {str: int} = None,
     ):
         """Insert list of job application skills into database.
 
         This assumes skills were inserted into skills table.
+        skill_ids is the {skill_name: id} from SkillDb.upsert_skill_ids,
+        otherwise the ids are read with SkillDb.get_skill_ids.
+        commit False leaves the insert in the session transaction.
 
         """
         logger.debug(f"{company_id}, {jad_id}, {skills_score}")
@@ -2889,26 +3176,10 @@ class JobApplicationSkillDb(Base):
         ja_skills = []
 
         try:
-            # TODO #D Just select skill name and id that we need here.
-            skill_names_ip = skills_score.keys()
-            skill_stmt = (
-                select(SkillDb)
-                .filter(SkillDb.skill_name.in_(skill_names_ip))
-                .filter(SkillDb.company_id == company_id)
-            )
-            result = session.execute(skill_stmt).all()
-            skills_db_list = [r[0] for r in result]
-            logger.debug(f"{skills_db_list}")
-
-            for skill_name in skill_names_ip:
-                skill_db_matching = [
-                    x.id for x in skills_db_list if x.skill_name == skill_name
-                ]
-                if len(skill_db_matching) == 0:
-                    raise Exception(
-                        f"SkillDb: Skill name not found in skill_db. {skill_name}"
-                    )
-                skill_id = skill_db_matching[0]
+            if skill_ids is None:
+                skill_ids = SkillDb.get_skill_ids(session, company_id, list(skills_score.keys()))
+            for skill_name in skills_score.keys():
+                skill_id = skill_ids[skill_name]
                 logger.debug(f"{skill_name} {skill_id}")
                 ja_skill = JobApplicationSkillDb(
                     company_id=company_id,
@@ -2924,7 +3195,8 @@ class JobApplicationSkillDb(Base):
             if len(ja_skills) > 0:
                 stmt = insert(JobApplicationSkillDb).values(ja_skills)
                 session.execute(stmt)
-                session.commit()
+                if commit:
+                    session.commit()
             else:
                 logger.debug("No new skills to insert as length is 0")
         except Exception as err:
@@ -2970,6 +3242,29 @@ class JobApplicationSkillDb(Base):
             logger.error(str(err))
             raise err
 
+    @classmethod
+    def get_skills_by_job_posting(cls, session, company_id: int, job_posting_id: int):
+        """Get the skills of all applications for the job posting in one query.
+
+        Returns list of (job_application_id, skill_name, score) ordered by
+        job_application_id.
+        """
+        logger.trace(f"get_skills_by_job_posting: {company_id} {job_posting_id}")
+        try:
+            stmt = (
+                select(JobApplicationDb.id, SkillDb.skill_name, JobApplicationSkillDb.score)
+                .join(JobApplicationDb, JobApplicationDb.jad_id == JobApplicationSkillDb.jad_id)
+                .join(SkillDb, SkillDb.id == JobApplicationSkillDb.skill_id)
+                .filter(JobApplicationSkillDb.company_id == company_id)
+                .filter(JobApplicationDb.job_posting_id == job_posting_id)
+                .order_by(JobApplicationDb.id, JobApplicationSkillDb.id)
+            )
+            logger.debug(f"{stmt} {company_id} {job_posting_id}")
+            return [tuple(row) for row in session.execute(stmt).all()]
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def get_skills_by_jad(
         cls, session, company_id: int, jad_id: int
@@ -3020,7 +3315,7 @@ class JobApplicationScoreDb(Base):
     __tablename__ = "ja_scores"
 
     job_application_id: Mapped[int] = mapped_column(
-        ForeignKey("job_applications.id"), primary_key=True
+        ForeignKey("job_applications.id", ondelete="CASCADE"), primary_key=True
     )
     company_id: Mapped[int]
     score: Mapped[Optional[float]]
@@ -3159,6 +3454,49 @@ class JobApplicationScoreDb(Base):
             logger.error(str(err))
             raise err
 
+    @classmethod
+    def bulk_update_scores(cls, session, company_id: int, scores: list[dict], commit: bool = True):
+        """Update score, match_percent, bucket and matching_skills of many applications.
+
+        scores is a list of dicts with job_application_id and the updated
+        values. Runs as one executemany UPDATE and a single commit, commit
+        False leaves the update in the session transaction.
+        """
+        logger.debug(f"bulk_update_scores: {company_id} {len(scores)}")
+        if not scores:
+            return
+        try:
+            table = JobApplicationScoreDb.__table__
+            stmt = (
+                update(table)
+                .where(table.c.company_id == company_id)
+                .where(table.c.job_application_id == bindparam("b_job_application_id"))
+                .values(
+                    score=bindparam("b_score"),
+                    match_percent=bindparam("b_match_percent"),
+                    bucket=bindparam("b_bucket"),
+                    matching_skills=bindparam("b_matching_skills"),
+                )
+            )
+            session.execute(
+                stmt,
+                [
+                    {
+                        "b_job_application_id": score["job_application_id"],
+                        "b_score": score["score"],
+                        "b_match_percent": score["match_percent"],
+                        "b_bucket": score["bucket"],
+                        "b_matching_skills": score["matching_skills"],
+                    }
+                    for score in scores
+                ],
+            )
+            if commit:
+                session.commit()
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def get_job_application_score(cls, session, company_id, job_application_id):
         """Get the job application score for the company and job_application_id."""
@@ -3241,6 +3579,16 @@ class BackgroundTaskDb(Base):
             logger.error(str(err))
             raise err
 
+    async def ainsert_background_task(self, session: AsyncSession):
+        """Insert the background task database (async session)."""
+        logger.debug(self)
+        try:
+            session.add(self)
+            await session.commit()
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def delete_all(cls, session, company_id):
         """Delete all the background task for this company."""
@@ -3370,25 +3718,28 @@ class JobConversationChatDb(Base):
             self.status,
         )
 
+    def _get_upsert_statement(self, session):
+        """Insert of the conversation chat updating the existing (company_id, conversation_id) row."""
+        return insert_update_duplicates(
+            session,
+            JobConversationChatDb,
+            {
+                "company_id": self.company_id,
+                "conversation_id": self.conversation_id,
+                "result": self.result,
+                "message": self.message,
+                "status": self.status,
+            },
+            ["result", "message", "status"],
+            ["company_id", "conversation_id"],
+        )
+
     def insert_job_conversation_chat(self, session):
         """Insert the covnersation in  database."""
         logger.debug(self)
-        from sqlalchemy.dialects.mysql import insert
-
         try:
 
-            stmt = insert(JobConversationChatDb).values(
-                company_id=self.company_id,
-                conversation_id=self.conversation_id,
-                result=self.result,
-                message=self.message,
-                status=self.status,
-            )
-            stmt = stmt.on_duplicate_key_update(
-                result=self.result,
-                message=self.message,
-                status=self.status,
-            )
+            stmt = self._get_upsert_statement(session)
             result = session.execute(stmt)
             session.commit()
             if result is not None and len(result.inserted_primary_key) > 0:
@@ -3400,6 +3751,21 @@ class JobConversationChatDb(Base):
             logger.error(str(err))
             raise err
 
+    async def ainsert_job_conversation_chat(self, session: AsyncSession):
+        """Insert the conversation in database (async session)."""
+        logger.debug(self)
+        try:
+            stmt = self._get_upsert_statement(session)
+            result = await session.execute(stmt)
+            await session.commit()
+            if result is not None and len(result.inserted_primary_key) > 0:
+                self.id = result.inserted_primary_key[0]
+            else:
+                logger.error(f"Insert failed for JobConversationChatDb: {self}")
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def delete_all(cls, session, company_id):
         """Delete all the conversation chat for this company."""
@@ -3432,6 +3798,24 @@ class JobConversationChatDb(Base):
             logger.error(str(err))
             raise err
 
+    @classmethod
+    async def aget_job_conversation_chat(
+        cls, session: AsyncSession, company_id, conversation_id
+    ):
+        """Get the conversation chat given the conversation id and company_id (async session)."""
+        logger.debug(f"{company_id} {conversation_id}")
+        try:
+            stmt = (
+                select(JobConversationChatDb)
+                .filter(JobConversationChatDb.company_id == company_id)
+                .filter(JobConversationChatDb.conversation_id == conversation_id)
+            )
+            result = await session.execute(stmt)
+            return result.scalars().first()
+        except Exception as err:
+            logger.error(str(err))
+            raise err
+
     @classmethod
     def update_job_conversation_chat(
         cls,
@@ -3477,21 +3861,131 @@ class JobConversationChatDb(Base):
             raise err
 
 
-# TODO #B: Should we remove this from here and move to migration scripts.
-
 load_dotenv()
-db_conn_str = os.getenv("DB_CONNECTION_STR")
-assert db_conn_str
-print(db_conn_str)
-
-engine = create_engine(
-    db_conn_str,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    echo=False,
-    #isolation_level="READ COMMITTED"
-)
-Base.metadata.create_all(engine)
-SessionLocal = sessionmaker(bind=engine)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_db_url() -> str:
+    db_conn_str = os.getenv("DB_CONNECTION_STR")
+    assert db_conn_str, "DB_CONNECTION_STR is not set"
+    return db_conn_str
+
+
+def get_engine():
+    """Get the engine, created on first use.
+
+    NOTE: Importing the models doesn't touch the database, the tables are
+    created by init_db (python -m intai.models.scripts.init_db).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                db_url = get_db_url()
+                kwargs = {"pool_pre_ping": True, "echo": False}
+                if make_url(db_url).get_backend_name() != "sqlite":
+                    kwargs.update(pool_size=10, max_overflow=20)
+                engine = create_engine(
+                    db_url,
+                    **kwargs,
+                    #isolation_level="READ COMMITTED"
+                )
+                enable_sqlite_foreign_keys(engine)
+                _engine = engine
+    return _engine
+
+
+def _set_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def enable_sqlite_foreign_keys(engine):
+    """Enforce the foreign keys on the connections of a SQLite engine.
+
+    NOTE: SQLite ignores foreign keys, and so the ON DELETE CASCADE of the
+    ja_* rows, unless enabled per connection.
+    """
+    if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", _set_sqlite_foreign_keys):
+        event.listen(engine, "connect", _set_sqlite_foreign_keys)
+
+
+def init_db(engine=None):
+    """Create the missing tables."""
+    engine = engine or get_engine()
+    enable_sqlite_foreign_keys(engine)
+    Base.metadata.create_all(engine)
+
+
+class _LazySessionLocal:
+    """sessionmaker bound to the engine on the first session."""
+
+    def __init__(self):
+        self._factory = None
+
+    def __call__(self, **kwargs):
+        if self._factory is None:
+            # NOTE: get_engine takes _engine_lock itself, get the engine before locking.
+            engine = get_engine()
+            with _engine_lock:
+                if self._factory is None:
+                    self._factory = sessionmaker(bind=engine)
+        return self._factory(**kwargs)
+
+
+SessionLocal = _LazySessionLocal()
+
+
+def get_async_db_url(db_url: str):
+    """Async driver url for the DB_CONNECTION_STR (aiomysql / aiosqlite)."""
+    url = make_url(db_url)
+    if url.get_backend_name() == "mysql":
+        return url.set(drivername="mysql+aiomysql")
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+_async_engine = None
+_async_session_factory = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine():
+    """Get the async engine for the API layer, created on first use.
+
+    NOTE: ASYNC_DB_CONNECTION_STR overrides the url derived from
+    DB_CONNECTION_STR (e.g. to use asyncmy instead of aiomysql).
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                async_db_url = os.getenv("ASYNC_DB_CONNECTION_STR") or get_async_db_url(get_db_url())
+                kwargs = {"pool_pre_ping": True, "echo": False}
+                if make_url(async_db_url).get_backend_name() != "sqlite":
+                    kwargs.update(pool_size=10, max_overflow=20)
+                async_engine = create_async_engine(async_db_url, **kwargs)
+                enable_sqlite_foreign_keys(async_engine.sync_engine)
+                _async_engine = async_engine
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Create an AsyncSession, use as `async with AsyncSessionLocal() as session`.
+
+    NOTE: expire_on_commit is off as expired attributes can't be lazy
+    loaded on an async session (e.g. the id of an inserted row).
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        # NOTE: get_async_engine takes _async_engine_lock itself, get the engine before locking.
+        engine = get_async_engine()
+        with _async_engine_lock:
+            if _async_session_factory is None:
+                _async_session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    return _async_session_factory()
 
@@ -0,0 +1,81 @@
+"""Make the foreign keys of the applicant / job posting entities ON DELETE CASCADE.
+
+Deleting a ja_details row (the root of the applicant entities) or a
+job_postings row then removes all its child rows in the database, see
+JobApplicationDetailDb.delete. jp_skills.job_posting_id and ja_skills.jad_id
+had no foreign key, their orphan rows are deleted before the key is added.
+Run this once against the existing database.
+"""
+
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import create_engine
+
+# (table, column, parent table) in parent -> child order.
+CASCADE_FOREIGN_KEYS = [
+    ("job_applications", "job_posting_id", "job_postings"),
+    ("job_applications", "jad_id", "ja_details"),
+    ("candidates", "jad_id", "ja_details"),
+    ("ja_addresses", "jad_id", "ja_details"),
+    ("ja_awards", "jad_id", "ja_details"),
+    ("ja_experiences", "jad_id", "ja_details"),
+    ("ja_educations", "jad_id", "ja_details"),
+    ("ja_languages", "jad_id", "ja_details"),
+    ("ja_projects", "jad_id", "ja_details"),
+    ("ja_certifications", "jad_id", "ja_details"),
+    ("ja_certification_skills", "certification_id", "ja_certifications"),
+    ("ja_publications", "jad_id", "ja_details"),
+    ("ja_interests", "jad_id", "ja_details"),
+    ("ja_volunteers", "jad_id", "ja_details"),
+    ("jp_skills", "job_posting_id", "job_postings"),
+    ("ja_skills", "jad_id", "ja_details"),
+    ("ja_scores", "job_application_id", "job_applications"),
+]
+
+
+def start():
+    engine = create_engine(os.getenv("DB_CONNECTION_STR"), echo=True)
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table, column, parent in CASCADE_FOREIGN_KEYS:
+            foreign_keys = [
+                fk
+                for fk in inspector.get_foreign_keys(table)
+                if fk["constrained_columns"] == [column] and fk["referred_table"] == parent
+            ]
+            if any(
+                (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE"
+                for fk in foreign_keys
+            ):
+                print(f"{table}.{column} already cascades")
+                continue
+
+            result = conn.execute(
+                text(
+                    f"""
+                    DELETE c FROM {table} c
+                    LEFT JOIN {parent} p ON p.id = c.{column}
+                    WHERE c.{column} IS NOT NULL AND p.id IS NULL
+                    """
+                )
+            )
+            print(f"Deleted {result.rowcount} orphan rows of {table}.{column}")
+
+            for fk in foreign_keys:
+                conn.execute(text(f"ALTER TABLE {table} DROP FOREIGN KEY {fk['name']}"))
+            conn.execute(
+                text(
+                    f"""
+                    ALTER TABLE {table}
+                    ADD CONSTRAINT fk_{table}_{column} FOREIGN KEY ({column})
+                    REFERENCES {parent} (id) ON DELETE CASCADE
+                    """
+                )
+            )
+            print(f"Added cascading foreign key on {table}.{column}")
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,32 @@
+"""Add the (company_id, jad_id / job_posting_id / client_*_id) indexes.
+
+The indexes are declared in the __table_args__ of the models, this creates
+the ones missing in an existing database (create_all only creates them for
+new tables). Run this once against the existing database.
+"""
+
+import os
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import create_engine
+
+from intai.models.models import Base
+
+
+def start():
+    engine = create_engine(os.getenv("DB_CONNECTION_STR"), echo=True)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                print(f"{index.name} already exists")
+                continue
+            index.create(engine)
+            print(f"Added {index.name} to {table.name}")
+
+
+if __name__ == "__main__":
+    start()
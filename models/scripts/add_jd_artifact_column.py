@@ -0,0 +1,30 @@
+"""Add the jd_artifact and jd_artifact_version columns to the job_postings table.
+
+create_all() does not alter existing tables, run this once against the
+existing database. The artifact is built lazily for old job postings.
+"""
+
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import create_engine
+
+
+def start():
+    engine = create_engine(os.getenv("DB_CONNECTION_STR"), echo=True)
+    columns = [column["name"] for column in inspect(engine).get_columns("job_postings")]
+    new_columns = {
+        "jd_artifact": "LONGBLOB NULL",
+        "jd_artifact_version": "INTEGER NOT NULL DEFAULT 0",
+    }
+    for column, definition in new_columns.items():
+        if column in columns:
+            print(f"{column} column already exists")
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE job_postings ADD COLUMN {column} {definition}"))
+        print(f"Added {column} column to job_postings")
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,67 @@
+"""Add the (company_id, skill_name) unique key to the skills table.
+
+SkillDb.upsert_skill_ids relies on the key for INSERT ... ON DUPLICATE KEY.
+Existing duplicate skills (including case variants, the collation is case
+insensitive) are merged into the row with the lowest id first and the
+jp_skills / ja_skills rows are pointed to it. Run this once against the
+existing database and restart the workers so the skill id caches are empty.
+"""
+
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import create_engine
+
+CONSTRAINT_NAME = "uix_skills_ci_sn"
+
+
+def start():
+    engine = create_engine(os.getenv("DB_CONNECTION_STR"), echo=True)
+    constraints = [constraint["name"] for constraint in inspect(engine).get_unique_constraints("skills")]
+    if CONSTRAINT_NAME in constraints:
+        print(f"{CONSTRAINT_NAME} already exists")
+        return
+
+    with engine.begin() as conn:
+        # NOTE: MySQL can't select from the table a DELETE targets, keep the
+        # lowest skill id for every (company_id, skill_name) in a temporary table.
+        conn.execute(
+            text(
+                """
+                CREATE TEMPORARY TABLE skill_keep_ids AS
+                SELECT company_id, skill_name, MIN(id) AS keep_id
+                FROM skills
+                GROUP BY company_id, skill_name
+                """
+            )
+        )
+        for table in ("jp_skills", "ja_skills"):
+            conn.execute(
+                text(
+                    f"""
+                    UPDATE {table} t
+                    JOIN skills s ON s.id = t.skill_id
+                    JOIN skill_keep_ids k ON k.company_id = s.company_id AND k.skill_name = s.skill_name
+                    SET t.skill_id = k.keep_id
+                    WHERE t.skill_id <> k.keep_id
+                    """
+                )
+            )
+        result = conn.execute(
+            text(
+                """
+                DELETE s FROM skills s
+                JOIN skill_keep_ids k ON k.company_id = s.company_id AND k.skill_name = s.skill_name
+                WHERE s.id <> k.keep_id
+                """
+            )
+        )
+        print(f"Merged {result.rowcount} duplicate skills")
+        conn.execute(
+            text(f"ALTER TABLE skills ADD CONSTRAINT {CONSTRAINT_NAME} UNIQUE (company_id, skill_name)")
+        )
+    print(f"Added {CONSTRAINT_NAME} to skills")
+
+
+if __name__ == "__main__":
+    start()
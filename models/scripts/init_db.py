@@ -0,0 +1,16 @@
+"""Create the missing tables of the models in the DB_CONNECTION_STR database.
+
+Importing intai.models.models no longer creates the tables, run this once
+for a new database (python -m intai.models.scripts.init_db).
+"""
+
+from intai.models.models import init_db
+
+
+def start():
+    init_db()
+    print("Created the missing tables")
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,108 @@
+"""Per company skill name -> skills.id cache.
+
+Persisting the skills of an application used to select the same skills
+three times and match names to ids with nested loops. Skill ids never
+change once inserted, so the cache only needs a bound on memory and an
+invalidation when the skills of a company are deleted (SkillDb.delete_all).
+
+Names are cached lower case as the skills unique key (company_id,
+skill_name) uses the case insensitive collation of the database.
+
+Ids of skills inserted in a transaction are kept on the session until it
+commits (dropped on rollback) so a rolled back insert never leaves a
+dangling id in the cache.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Max number of (company_id, skill_name) entries in the cache.
+SKILL_ID_CACHE_SIZE = int(os.getenv("SKILL_ID_CACHE_SIZE", "100000"))
+
+_PENDING_KEY = "pending_skill_ids"
+
+
+class SkillIdCache:
+    """LRU of (company_id, skill_name lower case) -> skill id."""
+
+    def __init__(self, max_size: int = SKILL_ID_CACHE_SIZE):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return "<SkillIdCache: size: {}; max_size: {}; hits: {}; misses: {}>".format(
+            len(self._ids), self.max_size, self.hits, self.misses
+        )
+
+    def get_many(self, company_id: int, skill_names) -> tuple[dict, list]:
+        """Get ({skill_name: id} of cached skills, [skill_name] of the misses)."""
+        found = {}
+        misses = []
+        with self._lock:
+            for skill_name in skill_names:
+                key = (company_id, skill_name.lower())
+                skill_id = self._ids.get(key)
+                if skill_id is None:
+                    misses.append(skill_name)
+                else:
+                    self._ids.move_to_end(key)
+                    found[skill_name] = skill_id
+            self.hits += len(found)
+            self.misses += len(misses)
+        return found, misses
+
+    def put_many(self, company_id: int, skill_ids: dict):
+        """Cache {skill_name: id} of committed skills."""
+        with self._lock:
+            for skill_name, skill_id in skill_ids.items():
+                key = (company_id, skill_name.lower())
+                self._ids[key] = skill_id
+                self._ids.move_to_end(key)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def put_pending(self, session, company_id: int, skill_ids: dict):
+        """Cache {skill_name: id} once the session commits."""
+        session.info.setdefault(_PENDING_KEY, []).append((company_id, skill_ids))
+
+    def get_pending(self, session, company_id: int) -> dict:
+        """Get {skill_name lower case: id} not committed yet in the session."""
+        return {
+            skill_name.lower(): skill_id
+            for pending_company_id, skill_ids in session.info.get(_PENDING_KEY, [])
+            if pending_company_id == company_id
+            for skill_name, skill_id in skill_ids.items()
+        }
+
+    def invalidate(self, company_id: int = None):
+        """Drop the skills of the company (or all companies)."""
+        with self._lock:
+            if company_id is None:
+                self._ids.clear()
+            else:
+                for key in [key for key in self._ids if key[0] == company_id]:
+                    del self._ids[key]
+
+
+skill_id_cache = SkillIdCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_pending_skill_ids(session):
+    for company_id, skill_ids in session.info.pop(_PENDING_KEY, []):
+        skill_id_cache.put_many(company_id, skill_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_skill_ids(session):
+    session.info.pop(_PENDING_KEY, None)
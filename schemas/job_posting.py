@@ -33,3 +33,14 @@ class JobPosting(BaseModel):
     is_update: Optional[bool] = Field(
         default=False, description="Whether this is update or insert"
     )
+
+
+class RescoreRequest(BaseModel):
+    """Rescore request object."""
+
+    model_config = {
+        "extra": "forbid",
+    }
+
+    company_id: int = Field(..., description="CompanyId for Intalent Client")
+    client_job_id: int = Field(..., description="Client Job Id of the job posting to rescore")
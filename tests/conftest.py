@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def db_tables():
+    """Create the tables once for the tests using the database."""
+    from intai.models.models import init_db
+
+    init_db()
@@ -38,6 +38,11 @@ from subprocess import Popen
 from pathlib import Path
 import os
 
+import pytest
+
+pytestmark = pytest.mark.usefixtures("db_tables")
+
+
 def delete_candidate_entities(session, company_id):
     JobApplicationAddressDb.delete_all(session, company_id)
     JobApplicationAwardDb.delete_all(session, company_id)
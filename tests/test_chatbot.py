@@ -9,6 +9,8 @@ from intai.utils.file_utils import get_bytes_from_file, extract_text
 import pytest
 from icecream import ic
 
+pytestmark = pytest.mark.usefixtures("db_tables")
+
 
 class TestChatbot:
     # @pytest.mark.skip(reason="disable openai calls test")
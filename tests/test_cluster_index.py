@@ -0,0 +1,18 @@
+import numpy as np
+
+from intai.ml.cluster_index import ClusterCenterIndex
+
+
+def test_search_top_k():
+    centers = np.array([[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 0.0, 3.0]])
+    index = ClusterCenterIndex(centers, ["python", "excel", "aws"])
+    queries = np.array([[0.1, 5.0, 0.2], [0.0, 0.0, 0.0], [3.0, 0.0, 1.0]])
+
+    indices, similarities = index.search(queries, k=2)
+    assert indices.shape == (3, 2)
+    assert indices[0, 0] == 1 and indices[2].tolist() == [0, 2]
+    assert np.all(similarities[:, 0] >= similarities[:, 1])
+    assert np.isclose(similarities[2, 0], 3.0 / np.sqrt(10.0))
+
+    assert index.nearest_names(queries[[0, 2]]) == ["excel", "python"]
+    assert len(index.top_k(queries[0], k=10)[0]) == 3
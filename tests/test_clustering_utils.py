@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+import intai.config as config
+from intai.ml import clustering_utils
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Two well separated groups of skills with one skill not in the lookup."""
+    skills = ["python", "java", "excel", "powerpoint", "golang"]
+    embeddings = np.array(
+        [[1.0, 0.1, 0], [0.9, 0.2, 0], [0.1, 1.0, 0], [0.2, 0.9, 0], [0.95, 0.0, 0.1]]
+    )
+    paths = {
+        "UNIQUE_SKILL_CONFIG_PATH": tmp_path / "unique_skills.json",
+        "SKILL_CONFIG_PATH": tmp_path / "skill_lookup.json",
+        "EMBEDDINGS_CONFIG_PATH": tmp_path / "embeddings.npy",
+        "CLUSTER_EMBEDDINGS_CONFIG_PATH": tmp_path / "cluster_embeddings.npy",
+        "CLUSTER_NAMES_CONFIG_PATH": tmp_path / "cluster_names.json",
+    }
+    paths["UNIQUE_SKILL_CONFIG_PATH"].write_text(json.dumps(skills))
+    paths["SKILL_CONFIG_PATH"].write_text(
+        json.dumps({"python": "python", "java": "python", "excel": "excel", "powerpoint": "excel"})
+    )
+    paths["CLUSTER_NAMES_CONFIG_PATH"].write_text(json.dumps(["python", "excel"]))
+    np.save(paths["EMBEDDINGS_CONFIG_PATH"], embeddings)
+    np.save(paths["CLUSTER_EMBEDDINGS_CONFIG_PATH"], embeddings[[0, 2]])
+    for name, path in paths.items():
+        monkeypatch.setattr(config, name, path)
+    return tmp_path
+
+
+def test_incremental_run(config_dir):
+    assert clustering_utils.run_clustering() == 1
+    lookup = config.load_skill_lookup()
+    assert lookup["golang"] == "python"
+    assert lookup["java"] == "python"
+    assert (config_dir / "clusters" / "v1" / "skill_lookup.json").exists()
+    # Nothing changed since the last run.
+    assert clustering_utils.run_clustering() is None
+
+
+def test_full_run(config_dir):
+    assert clustering_utils.run_clustering(full=True, n_clusters=2) == 1
+    lookup = config.load_skill_lookup()
+    assert len(lookup) == 5
+    assert lookup["python"] == lookup["java"] == lookup["golang"]
+    assert lookup["excel"] == lookup["powerpoint"] != lookup["python"]
+    assert len(np.load(config.CLUSTER_EMBEDDINGS_CONFIG_PATH)) == 2
@@ -21,10 +21,14 @@ from intai.models.models import (
     JobApplicationSkillDb,
     JobApplicationScoreDb,
     SkillDb,
+    bulk_insert,
     BackgroundTaskDb,
     BackgroundTaskTypeEnum,
     CompanyDb,
-    CandidateDb
+    CandidateDb,
+    AsyncSessionLocal,
+    get_async_db_url,
+    init_db,
 )
 from intai.schemas.job_posting import JobPosting
 from intai.schemas.company import Company
@@ -46,12 +50,16 @@ from intai.schemas.job_application import (
     JobApplicationVolunteer,
 )
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import select, delete
+from sqlalchemy import create_engine, inspect, select, delete, text
 from icecream import ic
 from sqlalchemy.orm import joinedload
+import asyncio
 import pytest
 import msgpack
 
+pytestmark = pytest.mark.usefixtures("db_tables")
+
+
 Base = declarative_base()
 
 COMPANY_ID_JA_TEST = 1009
@@ -932,6 +940,40 @@ class TestJobApplicationDb(BaseTestJobApplicationDb):
         )
         assert actual_ja is None
 
+    def test_bulk_insert(self):
+        """Insert children of a jad with one INSERT per table and one commit."""
+        company_id = self.valid_job_posting.company_id
+        ja_detail_db = JobApplicationDetailDb(
+            JobApplicationDetail(company_id=company_id, applicant_name="Bulk Applicant")
+        )
+        ja_detail_db.insert(self.session)
+        jad_id = ja_detail_db.id
+
+        db_objects = [
+            JobApplicationAwardDb(
+                JobApplicationAward(company_id=company_id, title=f"Award {i}"), jad_id=jad_id
+            )
+            for i in range(3)
+        ]
+        db_objects += [
+            JobApplicationCertificationDb(
+                JobApplicationCertification(company_id=company_id, title=title), jad_id=jad_id
+            )
+            for title in ["Cert 1", "Cert 2"]
+        ]
+        bulk_insert(self.session, db_objects)
+        self.session.commit()
+
+        actual_awards = JobApplicationAwardDb.get_awards_by_jad(self.session, company_id, jad_id=jad_id)
+        assert sorted(award.title for award in actual_awards) == ["Award 0", "Award 1", "Award 2"]
+        actual_certifications = JobApplicationCertificationDb.get_job_application_certification(
+            self.session, company_id, jad_id
+        )
+        assert [cert.title for cert in actual_certifications] == ["Cert 1", "Cert 2"]
+        assert all(cert.id is not None for cert in actual_certifications)
+
+        JobApplicationDetailDb.delete(self.session, company_id, jad_id)
+
 
 class TestJobApplicationScoreDb(BaseTestJobApplicationDb):
     def test_job_application_score_db(self):
@@ -1755,3 +1797,175 @@ class TestCompany:
         actual_company = CompanyDb.get_company(self.session, self.company.id)
         ic(actual_company)
         assert actual_company.context_doc == "Context987"
+
+
+class TestQueryPlans:
+    """The hot company_id + jad_id / job_posting_id / client_*_id queries use an index."""
+
+    HOT_QUERIES = [
+        (JobPostingDb, JobPostingDb.client_job_id),
+        (JobApplicationDb, JobApplicationDb.client_job_application_id),
+        (JobApplicationDb, JobApplicationDb.job_posting_id),
+        (CandidateDb, CandidateDb.client_candidate_id),
+        (JobApplicationAddressDb, JobApplicationAddressDb.jad_id),
+        (JobApplicationAwardDb, JobApplicationAwardDb.jad_id),
+        (JobApplicationExperienceDb, JobApplicationExperienceDb.jad_id),
+        (JobApplicationEducationDb, JobApplicationEducationDb.jad_id),
+        (JobApplicationLanguageDb, JobApplicationLanguageDb.jad_id),
+        (JobApplicationProjectDb, JobApplicationProjectDb.jad_id),
+        (JobApplicationCertificationDb, JobApplicationCertificationDb.jad_id),
+        (JobApplicationCertificationSkillDb, JobApplicationCertificationSkillDb.certification_id),
+        (JobApplicationPublicationDb, JobApplicationPublicationDb.jad_id),
+        (JobApplicationInterestDb, JobApplicationInterestDb.jad_id),
+        (JobApplicationVolunteerDb, JobApplicationVolunteerDb.jad_id),
+        (JobPostingSkillDb, JobPostingSkillDb.job_posting_id),
+        (JobApplicationSkillDb, JobApplicationSkillDb.jad_id),
+        (JobApplicationScoreDb, JobApplicationScoreDb.job_application_id),
+    ]
+
+    def setup_class(self):
+        self.session = SessionLocal()
+
+    def teardown_class(self):
+        self.session.close()
+
+    @pytest.mark.parametrize("model, column", HOT_QUERIES)
+    def test_query_uses_index(self, model, column):
+        stmt = (
+            select(model)
+            .filter(model.company_id == COMPANY_ID_JA_TEST)
+            .filter(column == 1)
+        )
+        sql = stmt.compile(
+            dialect=self.session.get_bind().dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = self.session.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        ic(plan)
+        assert plan[0]["key"] is not None, f"{model.__tablename__} scans on {column.key}"
+        assert plan[0]["type"] != "ALL"
+
+
+class TestAsyncDb:
+    def test_get_async_db_url(self):
+        assert get_async_db_url("mysql://u:p@localhost:3306/intalent").drivername == "mysql+aiomysql"
+        assert get_async_db_url("mysql+pymysql://u:p@localhost/intalent").drivername == "mysql+aiomysql"
+        assert get_async_db_url("sqlite:///intalent.db").drivername == "sqlite+aiosqlite"
+
+    def test_async_dao(self):
+        company_id = COMPANY_ID_JP_TEST
+        session = SessionLocal()
+        job_posting_db = JobPostingDb(global_test_get_job_posting(session))
+        job_posting_db.insert_job_posting(session)
+
+        async def run():
+            async with AsyncSessionLocal() as async_session:
+                bg_task = BackgroundTaskDb(
+                    company_id,
+                    message="async task",
+                    message_type=BackgroundTaskTypeEnum.JobPosting,
+                )
+                await bg_task.ainsert_background_task(async_session)
+                job_posting = await JobPostingDb.aget_job_posting(
+                    async_session, company_id, job_posting_db.client_job_id
+                )
+                return bg_task.id, job_posting
+
+        try:
+            task_id, job_posting = asyncio.run(run())
+            assert task_id > 0
+            assert job_posting.id == job_posting_db.id
+        finally:
+            BackgroundTaskDb.delete_all(session, company_id)
+            JobPostingDb.delete_all(session, company_id)
+            session.close()
+
+
+class TestInitDb:
+    def test_init_db(self):
+        engine = create_engine("sqlite://")
+        init_db(engine)
+        tables = inspect(engine).get_table_names()
+        assert "ja_details" in tables and "ja_skills" in tables
+
+    def test_session_local_without_init_db(self):
+        import os
+        import subprocess
+        import sys
+
+        code = (
+            "from sqlalchemy import text\n"
+            "from intai.models.models import SessionLocal\n"
+            "with SessionLocal() as session:\n"
+            "    assert session.execute(text('select 1')).scalar() == 1\n"
+        )
+        env = dict(os.environ, DB_CONNECTION_STR="sqlite://")
+        # NOTE: A fresh process, the engine and session factory aren't created yet.
+        subprocess.run([sys.executable, "-c", code], env=env, check=True, timeout=60)
+
+    def test_upsert_skill_ids_sqlite(self):
+        from sqlalchemy.orm import Session
+
+        from intai.models.skill_id_cache import skill_id_cache
+
+        engine = create_engine("sqlite://")
+        init_db(engine)
+        company_id = 987654
+        with Session(engine) as session:
+            skill_ids = SkillDb.upsert_skill_ids(session, company_id, ["Python", "AWS"])
+            skill_id_cache.invalidate(company_id)
+            # Existing skills keep their row.
+            assert SkillDb.upsert_skill_ids(session, company_id, ["AWS", "Go"])["AWS"] == skill_ids["AWS"]
+            assert session.query(SkillDb).filter(SkillDb.company_id == company_id).count() == 3
+        skill_id_cache.invalidate(company_id)
+
+    def test_ainsert_job_conversation_chat_sqlite(self, tmp_path):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        db_path = tmp_path / "chat.sqlite3"
+        init_db(create_engine(f"sqlite:///{db_path}"))
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+
+        async def run():
+            async with AsyncSession(engine) as session:
+                for status in ("INIT", "DONE"):
+                    chat = JobConversationChatDb(company_id=1, message=b"hi", conversation_id="c1")
+                    chat.status = status
+                    await chat.ainsert_job_conversation_chat(session)
+                rows = (await session.execute(select(JobConversationChatDb.status))).scalars().all()
+            await engine.dispose()
+            return rows
+
+        # The second insert updates the (company_id, conversation_id) row.
+        assert asyncio.run(run()) == ["DONE"]
+
+    def test_delete_job_application_detail_cascades_sqlite(self):
+        from sqlalchemy import insert
+        from sqlalchemy.orm import Session
+
+        engine = create_engine("sqlite://")
+        init_db(engine)
+        company_id = 987654
+        with Session(engine) as session:
+            jad_id = session.execute(
+                insert(JobApplicationDetailDb).values(company_id=company_id)
+            ).inserted_primary_key[0]
+            skill_id = session.execute(
+                insert(SkillDb).values(company_id=company_id, skill_name="Python")
+            ).inserted_primary_key[0]
+            session.execute(
+                insert(JobApplicationExperienceDb).values(company_id=company_id, jad_id=jad_id, title="Engineer")
+            )
+            session.execute(
+                insert(JobApplicationCertificationDb).values(company_id=company_id, jad_id=jad_id, title="AWS")
+            )
+            session.execute(
+                insert(JobApplicationSkillDb).values(
+                    company_id=company_id, jad_id=jad_id, skill_id=skill_id, score=1.0
+                )
+            )
+            session.commit()
+
+            JobApplicationDetailDb.delete(session, company_id, jad_id)
+            for model in (JobApplicationExperienceDb, JobApplicationCertificationDb, JobApplicationSkillDb):
+                assert session.query(model).filter(model.jad_id == jad_id).count() == 0
@@ -0,0 +1,26 @@
+import numpy as np
+
+from intai.ml.embedding_cache import EmbeddingCache, normalize_embedding_text
+
+
+def test_normalize_embedding_text():
+    assert normalize_embedding_text("  Machine   Learning ") == "machine learning"
+
+
+def test_cache_read_through(tmp_path):
+    path = tmp_path / "embedding_cache.sqlite3"
+    cache = EmbeddingCache(path, lru_size=1)
+    assert cache.get_many("ada", ["python"]) == {}
+    cache.put_many("ada", {"python": np.ones(3), "excel": np.zeros(3)})
+
+    found = cache.get_many("ada", ["python", "excel", "java"])
+    assert set(found) == {"python", "excel"}
+    assert found["python"].dtype == np.float32
+    assert cache.get_many("other-model", ["python"]) == {}
+
+    stats = cache.stats()
+    assert stats["misses"] == 3
+    assert stats["memory_hits"] + stats["disk_hits"] == 2
+
+    # A new process reads the embeddings back from disk.
+    assert set(EmbeddingCache(path).get_many("ada", ["python", "excel"])) == {"python", "excel"}
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+from intai.ml.embedding_store import SkillEmbeddingStore
+
+
+@pytest.fixture
+def store_paths(tmp_path):
+    embeddings_path = tmp_path / "embeddings.npy"
+    skills_path = tmp_path / "unique_skills.json"
+    np.save(embeddings_path, np.eye(2, 3))
+    skills_path.write_text(json.dumps(["python", "excel"]))
+    return embeddings_path, skills_path
+
+
+def test_append_visible_to_other_store(store_paths):
+    writer = SkillEmbeddingStore(*store_paths)
+    reader = SkillEmbeddingStore(*store_paths)
+
+    added = writer.append(["aws", "python", "aws"], [np.ones(3), np.ones(3), np.ones(3)])
+    assert added == 1
+    assert writer.count == 3
+
+    reader.refresh()
+    assert reader.count == 3
+    assert reader.skill_to_row["aws"] == 2
+    assert np.allclose(reader.embeddings[2], 1.0)
+    # Base files are not rewritten on append.
+    assert json.loads(store_paths[1].read_text()) == ["python", "excel"]
+
+
+def test_compaction(store_paths):
+    writer = SkillEmbeddingStore(*store_paths, compaction_threshold=2)
+    reader = SkillEmbeddingStore(*store_paths)
+
+    writer.append(["aws"], [np.ones(3)])
+    writer.append(["sql"], [np.full(3, 2.0)])
+    config_dir = store_paths[0].parent
+    meta = json.loads((config_dir / "skill_embeddings.meta.json").read_text())
+    assert meta == {
+        "generation": 1,
+        "base_rows": 4,
+        "embeddings": "embeddings.g1.npy",
+        "skills": "unique_skills.g1.json",
+    }
+    assert json.loads((config_dir / "unique_skills.g1.json").read_text()) == ["python", "excel", "aws", "sql"]
+    assert np.load(config_dir / "embeddings.g1.npy").shape == (4, 3)
+    # The configured base files are kept as they are.
+    assert json.loads(store_paths[1].read_text()) == ["python", "excel"]
+
+    reader.refresh()
+    assert reader.count == 4
+    assert np.allclose(reader.embeddings[3], 2.0)
+
+    writer.append(["java"], [np.zeros(3)])
+    assert SkillEmbeddingStore(*store_paths).skills == ["python", "excel", "aws", "sql", "java"]
+
+    writer.append(["rust"], [np.zeros(3)])
+    # Files of the previous generation are deleted.
+    assert not (config_dir / "unique_skills.g1.json").exists()
+    assert not (config_dir / "skill_embeddings.g1.wal").exists()
+    assert SkillEmbeddingStore(*store_paths).count == 6
+
+
+def test_crash_before_compaction_commit(store_paths):
+    writer = SkillEmbeddingStore(*store_paths)
+    writer.append(["aws"], [np.ones(3)])
+    # A compaction which crashed before replacing the meta file.
+    config_dir = store_paths[0].parent
+    np.save(config_dir / "embeddings.g1.npy", np.ones((5, 3)))
+    (config_dir / "unique_skills.g1.json").write_text(json.dumps(["python"]))
+
+    store = SkillEmbeddingStore(*store_paths)
+    assert store.skills == ["python", "excel", "aws"]
+    store.compact()
+    assert SkillEmbeddingStore(*store_paths).skills == ["python", "excel", "aws"]
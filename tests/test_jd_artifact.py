@@ -0,0 +1,51 @@
+import numpy as np
+
+from intai.ml.jd_artifact import JobPostingArtifact
+
+
+def test_artifact_round_trip():
+    artifact = JobPostingArtifact(
+        skill_names=["Python", "AWS"],
+        skill_matrix=np.arange(8, dtype=np.float64).reshape(2, 4),
+        industries=["software"],
+        job_title="Backend Engineer",
+        ideal_score=12.5,
+    )
+    loaded = JobPostingArtifact.from_bytes(artifact.to_bytes())
+    assert loaded.skill_names == ["Python", "AWS"]
+    assert loaded.skill_matrix.dtype == np.float32
+    assert np.array_equal(loaded.skill_matrix, artifact.skill_matrix)
+    assert loaded.industries == ["software"]
+    assert loaded.job_title == "Backend Engineer"
+    assert loaded.ideal_score == 12.5
+    assert loaded.version == JobPostingArtifact.VERSION
+
+
+def test_get_jd_artifact_reloads_changed_version(monkeypatch):
+    from types import SimpleNamespace
+
+    from intai.ml import jd_artifact
+    from intai.models.models import JobPostingDb
+
+    def make_artifact(job_title):
+        return JobPostingArtifact(
+            skill_names=["Python"],
+            skill_matrix=np.ones((1, 4)),
+            industries=[],
+            job_title=job_title,
+            ideal_score=1.0,
+        )
+
+    stored = {"data": make_artifact("Backend Engineer").to_bytes(), "version": 1}
+    monkeypatch.setattr(
+        JobPostingDb, "get_jd_artifact", classmethod(lambda cls, session, id: (stored["data"], stored["version"]))
+    )
+    monkeypatch.setattr(JobPostingDb, "get_jd_artifact_version", classmethod(lambda cls, session, id: stored["version"]))
+    monkeypatch.setattr(jd_artifact, "_jd_artifact_cache", jd_artifact.OrderedDict())
+    job_posting_db = SimpleNamespace(id=1)
+
+    assert jd_artifact.get_jd_artifact(None, job_posting_db, None, None).job_title == "Backend Engineer"
+    # Rescored by another process.
+    stored.update(data=make_artifact("Data Engineer").to_bytes(), version=2)
+    assert jd_artifact.get_jd_artifact(None, job_posting_db, None, None).job_title == "Data Engineer"
+    assert jd_artifact._jd_artifact_cache[1][0] == 2
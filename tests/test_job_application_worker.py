@@ -41,6 +41,10 @@ import asyncio
 
 # import requests
 
+import pytest
+
+pytestmark = pytest.mark.usefixtures("db_tables")
+
 
 def delete_application_entities(session, company_id):
     JobApplicationAddressDb.delete_all(session, company_id)
@@ -12,6 +12,10 @@ import os
 
 # import requests
 
+import pytest
+
+pytestmark = pytest.mark.usefixtures("db_tables")
+
 
 def delete_job_posting_entities(session, company_id):
     ic("Test: Deleting job posting entities")
@@ -12,6 +12,7 @@ from intai.utils.json_data_utils import (
     ja_get_experience_from_json,
     ja_get_certifications_from_json,
     ja_calculate_years_of_experience,
+    ja_parse_entities,
 )
 
 
@@ -97,3 +98,16 @@ class TestJsonDataUtils:
         exp_years = ja_calculate_years_of_experience(exp_dict_null)
         ic(exp_years)
         assert exp_years == 5
+
+    def test_ja_parse_entities(self):
+        """Parse all entity lists from the json in one call."""
+        entities = ja_parse_entities(self.entities.encode(), 2)
+        ic(entities)
+        assert entities.json_data == self.json_entities
+        assert json.loads(entities.json_text) == self.json_entities
+        assert len(entities.json_text) <= len(self.entities)
+        assert entities.addresses[0].city == "Ahmedabad"
+        assert entities.experiences[0].title == "Sr. Executive-Costing"
+        assert entities.experience_skills["Stock Audit"] > 0
+        assert "ICAI Final" in entities.certification_skills
+        assert entities.parse_time > 0
@@ -0,0 +1,39 @@
+from intai.ml.lexical_resolver import LexicalSkillResolver, bounded_levenshtein, tokenize_skill
+
+
+def test_tokenize_skill():
+    assert tokenize_skill("REST APIs") == ("rest", "api")
+    assert tokenize_skill("Node.js / Technologies") == ("node", "js", "technology")
+    assert tokenize_skill("C++") == ("c++",)
+
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein("kubernetes", "kubernets", 1) == 1
+    assert bounded_levenshtein("python", "java", 2) == 3
+
+
+def test_resolve():
+    resolver = LexicalSkillResolver()
+    for row, skill in enumerate(["rest api", "kubernetes", "machine learning", "c++"]):
+        resolver.add(skill, row)
+
+    assert resolver.resolve("REST-APIs") == 0
+    assert resolver.resolve("Kubernets") is None
+    assert resolver.resolve("c") is None
+    assert resolver.resolve("golang") is None
+
+    stats = resolver.stats()
+    assert stats["exact_hits"] == 1 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.25
+
+
+def test_resolve_fuzzy():
+    resolver = LexicalSkillResolver()
+    for row, skill in enumerate(["rest api", "kubernetes", "machine learning", "art"]):
+        resolver.add(skill, row)
+
+    assert resolver.resolve_fuzzy("Kubernets") == 1
+    assert resolver.resolve_fuzzy("machine lerning") == 2
+    # Shorter vocabulary tokens aren't reached through a deletion.
+    assert resolver.resolve_fuzzy("dart") is None
+    assert resolver.stats()["fuzzy_hits"] == 2
@@ -1,8 +1,10 @@
+import asyncio
 import os
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 from intai.ml.ai_prompt import AIPrompt, JobPostingAIPrompt
-from intai.ml.llm_client import LLMClient, get_llm_client
+from intai.ml.llm_client import AsyncLLMClient, LLMClient
+from intai.ml.utils.llm_types import LLMModelType
 from dotenv import load_dotenv
 
 from intai.utils.file_utils import extract_text, get_bytes_from_file
@@ -12,10 +14,6 @@ def ai_client():
     load_dotenv()
     return LLMClient(client_id="1234")
 
-def test_get_ai_client():
-    client = get_llm_client("1234")
-    assert isinstance(client, LLMClient)
-
 def test_ai_client_initialization():
     client = LLMClient("1234")
     assert client.api_key == os.environ.get("OPENAI_API_KEY")
@@ -47,4 +45,88 @@ def test_job_posting(ai_client):
             prompt = JobPostingAIPrompt(jp_text=extracted_text)
             response = ai_client.get_model_response(prompt)
             print(f"Response from OpenAI:\n {response}")
-            assert len(response) > 0
\ No newline at end of file
+            assert len(response) > 0
+
+def _completion_response(content, finish_reason="stop"):
+    choice = MagicMock(finish_reason=finish_reason)
+    choice.message.content = content
+    return MagicMock(choices=[choice])
+
+def test_async_llm_response_fallback_on_length():
+    prompt = AIPrompt(prompt_messages=[{"role": "user", "content": "Return json"}])
+    acompletion = AsyncMock(
+        side_effect=[_completion_response("{", "length"), _completion_response(' {"a": 1} ')]
+    )
+    with patch("intai.ml.llm_client.litellm.acompletion", acompletion), patch(
+        "intai.ml.llm_client.is_response_cache_enabled", return_value=False
+    ):
+        response = asyncio.run(AsyncLLMClient(client_id="1234").aget_model_response(prompt))
+    assert response == '{"a": 1}'
+    assert acompletion.await_count == 2
+    assert acompletion.await_args_list[1].kwargs["model"] == LLMModelType.GPT35.get_model_name()
+    assert acompletion.await_args_list[1].kwargs["max_tokens"] == 4096
+
+def test_async_llm_embeddings_batch():
+    texts = ["async skill one", "async skill two"]
+    response = MagicMock(data=[{"index": 1, "embedding": [0.0, 1.0]}, {"index": 0, "embedding": [1.0, 0.0]}])
+    cache = MagicMock()
+    cache.get_many.return_value = {}
+    with patch("intai.ml.llm_client.litellm.aembedding", AsyncMock(return_value=response)), patch(
+        "intai.ml.llm_client.get_embedding_cache", return_value=cache
+    ):
+        embeddings = asyncio.run(AsyncLLMClient(client_id="1234").aget_embeddings_batch(texts))
+    assert embeddings.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+    cache.put_many.assert_called_once()
+
+def test_llm_response_cache(tmp_path):
+    from intai.ml.response_cache import ResponseCache
+
+    prompt = AIPrompt(prompt_messages=[{"role": "user", "content": "Return cached json"}])
+    completion = MagicMock(return_value=_completion_response('{"a": 1}'))
+    with patch("intai.ml.llm_client.litellm.completion", completion), patch(
+        "intai.ml.llm_client.get_response_cache", return_value=ResponseCache(tmp_path / "responses.sqlite3")
+    ):
+        client = LLMClient(client_id="1234")
+        assert client.get_model_response(prompt) == '{"a": 1}'
+        assert client.get_model_response(prompt) == '{"a": 1}'
+    assert completion.call_count == 1
+
+def test_llm_response_cache_skips_fallback_response(tmp_path):
+    from intai.ml.response_cache import ResponseCache
+
+    prompt = AIPrompt(prompt_messages=[{"role": "user", "content": "Return fallback json"}])
+    completion = MagicMock(
+        side_effect=[_completion_response("{", "length"), _completion_response('{"a": 1}')] * 2
+    )
+    with patch("intai.ml.llm_client.litellm.completion", completion), patch(
+        "intai.ml.llm_client.get_response_cache", return_value=ResponseCache(tmp_path / "responses.sqlite3")
+    ):
+        client = LLMClient(client_id="1234")
+        assert client.get_model_response(prompt) == '{"a": 1}'
+        assert client.get_model_response(prompt) == '{"a": 1}'
+    # The primary model is retried instead of serving the fallback model response.
+    assert completion.call_count == 4
+
+def test_async_llm_response_single_flight():
+    from intai.ml.llm_client import completion_single_flight
+
+    prompt = AIPrompt(prompt_messages=[{"role": "user", "content": "Return coalesced json"}])
+
+    async def acompletion(**kwargs):
+        await asyncio.sleep(0.01)
+        return _completion_response('{"a": 1}')
+
+    acompletion_mock = AsyncMock(side_effect=acompletion)
+    coalesced = completion_single_flight.coalesced
+
+    async def run():
+        client = AsyncLLMClient(client_id="1234")
+        return await asyncio.gather(*(client.aget_model_response(prompt) for _ in range(3)))
+
+    with patch("intai.ml.llm_client.litellm.acompletion", acompletion_mock), patch(
+        "intai.ml.llm_client.is_response_cache_enabled", return_value=False
+    ):
+        responses = asyncio.run(run())
+    assert responses == ['{"a": 1}'] * 3
+    assert acompletion_mock.await_count == 1
+    assert completion_single_flight.coalesced == coalesced + 2
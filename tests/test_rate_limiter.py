@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from intai.ml import rate_limiter
+from intai.ml.rate_limiter import ModelRateLimiter, get_rate_limiter, get_rate_limiter_stats
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_concurrency_window():
+    limiter = ModelRateLimiter("test-model", rpm=0, tpm=0, initial_concurrency=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.2)
+    limiter.release(0.1)
+    assert acquired.wait(1)
+    thread.join()
+    limiter.release(0.1)
+    assert limiter.in_flight == 0
+    assert limiter.stats()["queue_wait_max_seconds"] >= 0.2
+
+
+def test_request_bucket(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_BURST_SECONDS", 0.1)
+    # 10 requests per second, one at a time.
+    limiter = ModelRateLimiter("test-model", rpm=600, tpm=0)
+    with limiter.limit():
+        pass
+    start = time.monotonic()
+    with limiter.limit():
+        pass
+    assert time.monotonic() - start >= 0.05
+
+
+def test_aimd():
+    limiter = ModelRateLimiter("test-model", rpm=0, tpm=0, max_concurrency=8, initial_concurrency=4)
+    for _ in range(4):
+        with limiter.limit():
+            pass
+    assert limiter.concurrency == pytest.approx(5, abs=0.1)
+
+    with pytest.raises(RateLimitError):
+        with limiter.limit():
+            raise RateLimitError()
+    assert limiter.concurrency == pytest.approx(2.5, abs=0.1)
+    assert limiter.rate_limited == 1
+    # Paused for RATE_LIMIT_PAUSE_SECONDS.
+    assert limiter.acquire() >= 0.5
+    limiter.release(0.1)
+
+
+def test_async_limit():
+    limiter = ModelRateLimiter("test-model", rpm=0, tpm=0, initial_concurrency=2)
+    running = []
+    max_running = []
+
+    async def call():
+        async with limiter.alimit(100):
+            running.append(1)
+            max_running.append(len(running))
+            await asyncio.sleep(0.05)
+            running.pop()
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(max_running) <= 3
+    assert limiter.in_flight == 0
+    assert limiter.stats()["calls"] == 6
+
+
+def test_get_rate_limiter():
+    assert get_rate_limiter("test-shared-model") is get_rate_limiter("test-shared-model")
+    assert "test-shared-model" in get_rate_limiter_stats()
@@ -0,0 +1,59 @@
+import time
+
+from intai.ml.ai_prompt import AIPrompt, ChatbotAIPrompt, MatchTitleAIPrompt
+from intai.ml.response_cache import ResponseCache, is_response_cache_enabled, make_response_cache_key
+
+
+def _key(messages, version=1, model="gpt-4o"):
+    prompt = AIPrompt(prompt_messages=messages)
+    prompt.CACHE_VERSION = version
+    return make_response_cache_key(model, prompt.messages, {"type": "JSON_OBJECT", "schema": None}, prompt)
+
+
+def test_cache_key():
+    messages = [{"role": "user", "content": "Match titles"}]
+    assert _key(messages) == _key([dict(message) for message in messages])
+    assert _key(messages) != _key(messages, version=2)
+    assert _key(messages) != _key(messages, model="gpt-4o-mini")
+    assert _key(messages) != _key([{"role": "user", "content": "Match title"}])
+
+
+def test_prompt_enablement():
+    assert is_response_cache_enabled(MatchTitleAIPrompt(jp_title="Engineer", ja_titles="Developer"))
+    assert not ChatbotAIPrompt.CACHE_ENABLED
+
+
+def test_cache_read_through(tmp_path):
+    path = tmp_path / "response_cache.sqlite3"
+    cache = ResponseCache(path)
+    assert cache.get("k1", "MatchTitleAIPrompt") is None
+    cache.put("k1", "MatchTitleAIPrompt", '{"result": true}')
+    assert cache.get("k1", "MatchTitleAIPrompt") == '{"result": true}'
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["prompts"]["MatchTitleAIPrompt"] == {"hits": 1, "misses": 1}
+
+    # A new process reads the responses back from disk.
+    assert ResponseCache(path).get("k1", "MatchTitleAIPrompt") == '{"result": true}'
+
+
+def test_cache_ttl(tmp_path):
+    cache = ResponseCache(tmp_path / "response_cache.sqlite3", ttl_seconds=0)
+    cache.put("k1", "MatchTitleAIPrompt", "response")
+    time.sleep(0.01)
+    assert cache.get("k1", "MatchTitleAIPrompt") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "response_cache.sqlite3", max_entries=10)
+    for i in range(10):
+        cache.put(f"k{i}", "MatchTitleAIPrompt", str(i))
+        time.sleep(0.001)
+    cache.get("k0", "MatchTitleAIPrompt")
+    cache.put("k10", "MatchTitleAIPrompt", "10")
+    assert len(cache) == 9
+    assert cache.get("k0", "MatchTitleAIPrompt") == "0"
+    assert cache.get("k1", "MatchTitleAIPrompt") is None
+    assert cache.get("k10", "MatchTitleAIPrompt") == "10"
@@ -18,6 +18,11 @@ from dotenv import load_dotenv
 import os
 from subprocess import Popen
 
+import pytest
+
+pytestmark = pytest.mark.usefixtures("db_tables")
+
+
 client = TestClient(app)
 
 
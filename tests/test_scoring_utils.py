@@ -4,8 +4,11 @@ import json
 
 from dotenv import load_dotenv
 from icecream import ic
+import numpy as np
+import intai.ml.scoring_utils as scoring_utils
 from intai.ml.scoring_utils import (
     get_ideal_candidate_score_for_job,
+    ja_get_skill_distance_matrix,
     ja_calculate_matching_skill_score,
     match_certificate_skills_with_jd_skills,
     ja_match_industry_with_jd,
@@ -138,3 +141,49 @@ class TestScoringUtils:
         jd_title = "Fashion Designer"
         match = ja_match_industry_with_jd(experiences, jd_title)
         assert not match
+
+    def test_ja_get_skill_distance_matrix(self, monkeypatch):
+        def resolve_skill_embeddings(skills, ai_client):
+            vectors = {"aws": [1.0, 0.0], "excel": [0.0, 1.0], "cloud": [1.0, 1.0]}
+            skill_rows = {}
+            for skill in dict.fromkeys(skill.lower() for skill in skills):
+                skill_rows[skill] = len(skill_rows)
+            matrix = np.array([vectors[skill] for skill in skill_rows], dtype=np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+            return skill_rows, matrix
+
+        monkeypatch.setattr(scoring_utils, "resolve_skill_embeddings", resolve_skill_embeddings)
+        distances = ja_get_skill_distance_matrix(["AWS", "Cloud"], ["aws", "Excel", "aws"], None)
+        assert distances.shape == (2, 3)
+        assert np.allclose(distances[0], [0.0, 1.0, 0.0], atol=1e-6)
+        assert np.allclose(distances[1], [1 - np.sqrt(0.5)] * 3, atol=1e-6)
+
+
+    def test_matching_skill_scores_batch(self, monkeypatch):
+        """Greedy selection over a candidates x skills matrix."""
+        jd_skills = ["Python", "AWS"]
+        # distances of jd skills (rows) to python, django, aws, excel
+        distances = np.array([[0.0, 0.1, 0.9, 0.9], [0.9, 0.9, 0.05, 0.9]])
+
+        def ja_get_skill_distance_matrix(jd_skills, ja_skill_names, ai_client, jd_skill_matrix=None):
+            assert ja_skill_names == ["python", "django", "aws", "excel"]
+            return distances
+
+        monkeypatch.setenv("distance_based_threshold", "0.2")
+        monkeypatch.setattr(scoring_utils, "ja_get_skill_distance_matrix", ja_get_skill_distance_matrix)
+        scores, matching_skills = scoring_utils.ja_calculate_matching_skill_scores_batch(
+            [
+                [("Python", 0.5), ("Django", 0.75), ("AWS", 0.5)],
+                [("excel", 0.5)],
+                [("python", 0.25)],
+            ],
+            jd_skills,
+            session_id=1,
+            client_id=1,
+        )
+        assert scores.tolist() == [1.25, 0.0, 0.25]
+        assert matching_skills[0] == {
+            "python": [("python", 0.5, 0.0), ("django", 0.75, 0.1)],
+            "aws": [("aws", 0.5, 0.05)],
+        }
+        assert matching_skills[1] == {}
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from intai.ml.single_flight import SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    single_flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(single_flight.do, "key", fn)
+        started.wait(5)
+        followers = [executor.submit(single_flight.do, "key", fn) for _ in range(3)]
+        while single_flight.coalesced < 3:
+            pass
+        release.set()
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert single_flight.stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_do_calls_again_after_completion():
+    single_flight = SingleFlight("test")
+    assert single_flight.do("key", lambda: 1) == 1
+    assert single_flight.do("key", lambda: 2) == 2
+    assert single_flight.stats()["calls"] == 2
+
+
+def test_do_many_error_propagates_to_followers():
+    single_flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+
+    def fn(keys):
+        started.set()
+        release.wait(5)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do_many, ["a", "b"], fn)
+        started.wait(5)
+        follower = executor.submit(single_flight.do_many, ["b", "c"], lambda keys: {key: key for key in keys})
+        while single_flight.coalesced < 1:
+            pass
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+    # The failed keys are no longer in flight.
+    assert single_flight.do_many(["a", "b"], lambda keys: {key: key for key in keys}) == {"a": "a", "b": "b"}
+
+
+def test_ado_many_coalesces_overlapping_keys():
+    single_flight = SingleFlight("test")
+    requested = []
+
+    async def fn(keys):
+        requested.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key.upper() for key in keys}
+
+    async def run():
+        return await asyncio.gather(
+            single_flight.ado_many(["a", "b"], fn),
+            single_flight.ado_many(["b", "c", "c"], fn),
+        )
+
+    first, second = asyncio.run(run())
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert requested == [["a", "b"], ["c"]]
+    assert single_flight.stats() == {"calls": 3, "coalesced": 1, "in_flight": 0}
+
+
+def test_do_many_missing_result():
+    single_flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+
+    def fn(keys):
+        started.set()
+        release.wait(5)
+        return {"a": 1}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do_many, ["a", "b"], fn)
+        started.wait(5)
+        follower = executor.submit(single_flight.do_many, ["b"], lambda keys: {key: 2 for key in keys})
+        while single_flight.coalesced < 1:
+            pass
+        release.set()
+        assert leader.result() == {"a": 1}
+        with pytest.raises(KeyError):
+            follower.result(5)
+    assert single_flight.stats()["in_flight"] == 0
+    assert single_flight.do_many(["b"], lambda keys: {key: 2 for key in keys}) == {"b": 2}
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+import intai.config as config
+import intai.ml.skill_index as skill_index_module
+from intai.ml.skill_canonicalizer import SkillCanonicalizer, normalize_skill_name
+from intai.ml.skill_index import SkillEmbeddingIndex
+
+
+@pytest.fixture
+def canonicalizer(tmp_path, monkeypatch):
+    """Canonicalizer over a small vocabulary in a temporary config dir."""
+    skills = ["react.js", "excel", "c++"]
+    paths = {
+        "UNIQUE_SKILL_CONFIG_PATH": tmp_path / "unique_skills.json",
+        "SKILL_CONFIG_PATH": tmp_path / "skill_lookup.json",
+        "EMBEDDINGS_CONFIG_PATH": tmp_path / "embeddings.npy",
+        "CLUSTER_EMBEDDINGS_CONFIG_PATH": tmp_path / "cluster_embeddings.npy",
+        "CLUSTER_NAMES_CONFIG_PATH": tmp_path / "cluster_names.json",
+        "SKILL_ALIASES_CONFIG_PATH": tmp_path / "skill_aliases.json",
+    }
+    paths["UNIQUE_SKILL_CONFIG_PATH"].write_text(json.dumps(skills))
+    paths["SKILL_CONFIG_PATH"].write_text(json.dumps({}))
+    paths["CLUSTER_NAMES_CONFIG_PATH"].write_text(json.dumps(["excel"]))
+    np.save(paths["EMBEDDINGS_CONFIG_PATH"], np.eye(3, 4))
+    np.save(paths["CLUSTER_EMBEDDINGS_CONFIG_PATH"], np.eye(1, 4))
+    for name, path in paths.items():
+        monkeypatch.setattr(config, name, path)
+        if hasattr(skill_index_module, name):
+            monkeypatch.setattr(skill_index_module, name, path)
+    return SkillCanonicalizer(SkillEmbeddingIndex(), epsilon=0.05)
+
+
+def test_normalize_skill_name():
+    assert normalize_skill_name("React.js") == normalize_skill_name(" react js ") == "reactjs"
+    assert normalize_skill_name("C++") != normalize_skill_name("C#") != normalize_skill_name("c")
+
+
+def test_spelling_variants(canonicalizer):
+    rows = canonicalizer.get_rows(["ReactJS", "react js", "Excel", "golang"])
+    assert rows == {"reactjs": 0, "react js": 0, "excel": 1, "golang": None}
+    assert canonicalizer.canonical_names(["React JS", "golang"]) == ["react.js", "golang"]
+    aliases = json.loads(config.SKILL_ALIASES_CONFIG_PATH.read_text())
+    assert aliases["reactjs"] == "react.js"
+
+
+def test_add_skills_merges_close_embeddings(canonicalizer):
+    new_embeddings = np.array([[0.0, 0.999, 0.01, 0.0], [0.0, 0.0, 0.0, 1.0], [0.0, 0.0, 0.0, 2.0]])
+    rows = canonicalizer.add_skills(["ms excel", "golang", "go-lang"], new_embeddings)
+    assert rows == {"ms excel": 1, "golang": 3, "go-lang": 3}
+    # Only golang got a new vocabulary row.
+    assert canonicalizer.get_rows(["ms excel", "go lang"]) == {"ms excel": 1, "go lang": 3}
+
+
+def test_add_skills_verifies_typo_candidates(canonicalizer):
+    # Neither is within epsilon of a vocabulary skill, both are a typo of excel.
+    assert canonicalizer.get_rows(["exel", "excet"]) == {"exel": None, "excet": None}
+    new_embeddings = np.array([[0.0, 0.9, 0.3, 0.0], [0.0, 0.0, 0.0, 1.0]])
+    rows = canonicalizer.add_skills(["exel", "excet"], new_embeddings)
+    assert rows == {"exel": 1, "excet": 3}
+    aliases = json.loads(config.SKILL_ALIASES_CONFIG_PATH.read_text())
+    assert aliases["exel"] == "excel"
+    assert "excet" not in aliases
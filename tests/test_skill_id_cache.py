@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from intai.models.skill_id_cache import SkillIdCache, skill_id_cache
+
+
+class TestSkillIdCache:
+    def test_get_put_case_insensitive(self):
+        cache = SkillIdCache(max_size=10)
+        cache.put_many(1, {"Python": 10, "AWS": 11})
+        found, misses = cache.get_many(1, ["python", "aws", "excel"])
+        assert found == {"python": 10, "aws": 11}
+        assert misses == ["excel"]
+        # Other companies don't share the ids.
+        assert cache.get_many(2, ["python"]) == ({}, ["python"])
+        assert cache.hits == 2 and cache.misses == 2
+
+    def test_bounded_lru(self):
+        cache = SkillIdCache(max_size=2)
+        cache.put_many(1, {"a": 1, "b": 2})
+        cache.get_many(1, ["a"])
+        cache.put_many(1, {"c": 3})
+        assert len(cache) == 2
+        found, misses = cache.get_many(1, ["a", "b", "c"])
+        assert found == {"a": 1, "c": 3}
+        assert misses == ["b"]
+
+    def test_invalidate(self):
+        cache = SkillIdCache()
+        cache.put_many(1, {"a": 1})
+        cache.put_many(2, {"a": 2})
+        cache.invalidate(1)
+        assert cache.get_many(1, ["a"])[0] == {}
+        assert cache.get_many(2, ["a"])[0] == {"a": 2}
+        cache.invalidate()
+        assert len(cache) == 0
+
+    def test_pending_until_commit(self):
+        engine = create_engine("sqlite://")
+        skill_id_cache.invalidate(-1)
+        with Session(engine) as session:
+            session.connection()
+            skill_id_cache.put_pending(session, -1, {"Rust": 5})
+            assert skill_id_cache.get_pending(session, -1) == {"rust": 5}
+            assert skill_id_cache.get_many(-1, ["rust"])[0] == {}
+            session.commit()
+            assert skill_id_cache.get_many(-1, ["rust"])[0] == {"rust": 5}
+
+            session.connection()
+            skill_id_cache.put_pending(session, -1, {"Go": 6})
+            session.rollback()
+            assert skill_id_cache.get_many(-1, ["go"])[0] == {}
+            assert skill_id_cache.get_pending(session, -1) == {}
+        skill_id_cache.invalidate(-1)
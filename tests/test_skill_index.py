@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+
+import intai.config as config
+import intai.ml.skill_index as skill_index_module
+from intai.ml.skill_index import SkillEmbeddingIndex
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Write a small vocabulary and point the config paths at it."""
+    skills = ["python", "excel", "aws"]
+    embeddings = np.eye(3, 4)
+    cluster_embeddings = np.eye(2, 4)
+    paths = {
+        "UNIQUE_SKILL_CONFIG_PATH": tmp_path / "unique_skills.json",
+        "SKILL_CONFIG_PATH": tmp_path / "skill_lookup.json",
+        "EMBEDDINGS_CONFIG_PATH": tmp_path / "embeddings.npy",
+        "CLUSTER_EMBEDDINGS_CONFIG_PATH": tmp_path / "cluster_embeddings.npy",
+        "CLUSTER_NAMES_CONFIG_PATH": tmp_path / "cluster_names.json",
+    }
+    paths["UNIQUE_SKILL_CONFIG_PATH"].write_text(json.dumps(skills))
+    paths["SKILL_CONFIG_PATH"].write_text(json.dumps({"python": "python"}))
+    paths["CLUSTER_NAMES_CONFIG_PATH"].write_text(json.dumps(["python", "excel"]))
+    np.save(paths["EMBEDDINGS_CONFIG_PATH"], embeddings)
+    np.save(paths["CLUSTER_EMBEDDINGS_CONFIG_PATH"], cluster_embeddings)
+    for name, path in paths.items():
+        monkeypatch.setattr(config, name, path)
+        if hasattr(skill_index_module, name):
+            monkeypatch.setattr(skill_index_module, name, path)
+    return paths
+
+
+def test_lookup(config_dir):
+    index = SkillEmbeddingIndex()
+    assert index.get_row("Excel") == 1
+    assert index.get_row("java") is None
+    embedding = index.get_embedding("AWS")
+    assert embedding.dtype == np.float32
+    assert embedding[2] == 1.0
+    assert index.get_standard_skill("Python") == "python"
+
+
+def test_add_skills(config_dir):
+    index = SkillEmbeddingIndex()
+    index.add_skills(["Java", "java", "python"], [np.ones(4), np.ones(4), np.ones(4)])
+    assert index.get_row("java") == 3
+    assert len(index.snapshot().skills) == 4
+    # Another process picks up the new row from the store.
+    assert SkillEmbeddingIndex().get_row("java") == 3
+
+
+def test_reload_on_change(config_dir):
+    index = SkillEmbeddingIndex()
+    config_dir["SKILL_CONFIG_PATH"].write_text(json.dumps({"aws": "cloud"}))
+    index.refresh(force=True)
+    assert index.get_standard_skill("aws") == "cloud"
+    assert index.get_standard_skill("python") is None
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from intai.ml.skill_matching import (
+    SkillMatchingMethod,
+    build_score_matrix,
+    greedy_assignment,
+    match_skills_batch,
+    optimal_assignment,
+)
+
+
+class TestSkillMatching:
+    def test_build_score_matrix(self):
+        skill_names, scores = build_score_matrix(
+            [[("Python", 0.5), ("python", 0.75)], [("AWS", 0.25)]]
+        )
+        assert skill_names == ["python", "aws"]
+        assert scores[0, 0] == 0.75 and np.isnan(scores[0, 1])
+        assert np.isnan(scores[1, 0]) and scores[1, 1] == 0.25
+
+    def test_greedy_prefers_unused_skills(self):
+        # Both jd skills match python and django.
+        scores = np.array([[1.0, 0.5]])
+        is_match = np.array([[True, True], [True, True]])
+        distances = np.array([[0.1, 0.1], [0.1, 0.1]])
+        selected = greedy_assignment(scores, is_match, distances)
+        assert selected.tolist() == [[0, 1]]
+
+    def test_greedy_reuses_only_match(self):
+        scores = np.array([[1.0, np.nan]])
+        is_match = np.array([[True, False], [True, False]])
+        distances = np.zeros((2, 2))
+        selected = greedy_assignment(scores, is_match, distances)
+        assert selected.tolist() == [[0, 0]]
+
+    def test_optimal_uses_distinct_skills(self):
+        pytest.importorskip("scipy")
+        # Greedy gives the first jd skill the best skill which the second
+        # jd skill is the only one to match, so it has to reuse it.
+        scores = np.array([[1.0, 0.5]])
+        is_match = np.array([[True, True], [True, False]])
+        distances = np.zeros((2, 2))
+        greedy = greedy_assignment(scores, is_match, distances)
+        optimal = optimal_assignment(scores, is_match, distances)
+        assert greedy.tolist() == [[0, 0]]
+        assert optimal.tolist() == [[1, 0]]
+
+    def test_match_skills_batch_methods(self):
+        pytest.importorskip("scipy")
+        jd_skills = ["Python", "AWS"]
+        skill_names, scores = build_score_matrix(
+            [[("python", 0.5), ("django", 0.75), ("aws", 0.5)], [("excel", 0.5)]]
+        )
+        distances = np.array([[0.0, 0.1, 0.9, 0.9], [0.9, 0.9, 0.05, 0.9]])
+        greedy = match_skills_batch(
+            jd_skills, skill_names, scores, distances, 0.2, method=SkillMatchingMethod.GREEDY
+        )
+        optimal = match_skills_batch(
+            jd_skills, skill_names, scores, distances, 0.2, method=SkillMatchingMethod.OPTIMAL
+        )
+        assert greedy[0].tolist() == optimal[0].tolist() == [1.25, 0.0]
+        assert greedy[2][0] == optimal[2][0] == {"python": "django", "aws": "aws"}
+        assert greedy[1] == optimal[1]
@@ -0,0 +1,38 @@
+from intai.ml.ai_prompt import AIPrompt, FactorAnalysisAIPrompt, MatchTitleAIPrompt
+from intai.ml.utils.token_utils import count_message_tokens, count_tokens, truncate_to_tokens
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("Senior Software Engineer") > 0
+    messages = [{"role": "user", "content": "Senior Software Engineer"}]
+    assert count_message_tokens(messages) > count_tokens("Senior Software Engineer")
+
+
+def test_truncate_to_tokens():
+    text = "python developer " * 100
+    assert truncate_to_tokens(text, None) == text
+    assert truncate_to_tokens(text, 1000) == text
+    truncated = truncate_to_tokens(text, 10)
+    assert count_tokens(truncated) <= 10
+    assert text.startswith(truncated)
+
+
+def test_prompt_section_truncation():
+    long_resume = "Managed AWS infrastructure for payment systems. " * 5000
+    prompt = FactorAnalysisAIPrompt(jp_text="Cloud Engineer", ja_text=long_resume)
+    assert prompt.count_tokens() < count_tokens(long_resume)
+    assert prompt.count_tokens() < FactorAnalysisAIPrompt.SECTION_MAX_TOKENS["ja_text"] + 5000
+
+
+def test_prompt_max_tokens():
+    prompt = MatchTitleAIPrompt(jp_title="Engineer", ja_titles="Developer")
+    assert prompt.get_max_tokens("gpt-4o", prompt.count_tokens("gpt-4o")) == MatchTitleAIPrompt.MAX_TOKENS
+    # The structured extraction prompts get the model max output.
+    factor_prompt = FactorAnalysisAIPrompt(jp_text="Cloud Engineer", ja_text="AWS")
+    assert factor_prompt.get_max_tokens("gpt-4o-2024-08-06", factor_prompt.count_tokens()) == 16384
+    # The model max output when the prompt has no budget.
+    generic = AIPrompt(prompt_messages=[{"role": "user", "content": "Return json"}])
+    assert generic.get_max_tokens("gpt-3.5-turbo", 10) == 4096
+    # Capped by the context left.
+    assert generic.get_max_tokens("gpt-3.5-turbo", 15000) < 16385 - 15000
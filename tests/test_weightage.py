@@ -0,0 +1,29 @@
+import pytest
+
+from intai.ml.weightage import WeightageTable
+
+WEIGHTAGE_DICT = {"max": 12, "0.5": 0.5, "1": 0.5, "1.5": 0.75, "2": 0.75, "3": 1}
+
+
+def test_ideal_skill_score():
+    table = WeightageTable(WEIGHTAGE_DICT)
+    # Same as summing weightage_dict.get(str(year), 1) for years 1..n.
+    for years in range(0, 6):
+        expected = sum(WEIGHTAGE_DICT.get(str(year), 1) for year in range(1, years + 1))
+        assert table.ideal_skill_score(years) == expected
+
+
+def test_interval_scores():
+    table = WeightageTable(WEIGHTAGE_DICT)
+    assert table.get_weightage(1.0) == 0.5
+    assert table.get_weightage(2.5) == 12
+
+    # 0.5, 1, 1.5
+    assert table.interval_score(0.5, 1.5) == 1.75
+    # 1.5, 2, 2.5 (not configured), 3, 3.5 (past the config)
+    assert table.interval_score(1.5, 2.5) == 0.75 + 0.75 + 12 + 1 + 12
+    assert table.interval_score(10, 1) == 24
+    assert table.interval_score(0.5, 0) == 0
+
+    scores = table.interval_scores([0.5, 1.5, 10], [1.5, 2.5, 1])
+    assert scores.tolist() == pytest.approx([1.75, 26.5, 24])
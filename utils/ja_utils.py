@@ -1,5 +1,5 @@
 import json
-from intai.ml.llm_client import LLMClient
+from intai.ml.llm_client import AsyncLLMClient, LLMClient
 from intai.models.models import JobApplicationScore
 from typing import Any
 from intai.ml.ai_prompt import (
@@ -9,6 +9,7 @@ from intai.ml.ai_prompt import (
     JobApplicationBasicsAIPrompt
 )
 from intai.ml.utils.llm_types import LLMResponseType
+from intai.utils.json_data_utils import ApplicantEntities, ja_parse_entities
 
 from loguru import logger
 
@@ -48,11 +49,12 @@ def ja_parse_jd(jd_json):
 
         return organizationsIndustrySegment, job_title, jd_skill_names, overall_experience, management_experience
 
-def ja_parse_application(ja_extracted_text: str, session_id, client_id):
+def ja_parse_application(ja_extracted_text: str, session_id, client_id) -> ApplicantEntities:
         """Extract the entities from JobApplication & store in the database.
 
-        This will call openAI and get the parsed json entities for
-        job application.
+        This will call openAI and parse the json entities for the
+        job application into ApplicantEntities in one pass.
+        client_id is the company id.
         """
         # TODO #C Potentially refactor extract_entities
         # into a common utility method later.
@@ -73,26 +75,43 @@ def ja_parse_application(ja_extracted_text: str, session_id, client_id):
             execution_time = end_time - start_time
             logger.warning(f"[[[[[[[[[ ------   Execution time for resume parsing get_model_response: {execution_time} seconds  ------ ]]]]]]]]")
 
-            if extracted_entities is not None and len(extracted_entities) > 0:
-                logger.debug(f"len of Extracted ENtities: {len(extracted_entities)}")
-                logger.debug(f"Extracted ENtities: {extracted_entities}")
+            return _ja_get_applicant_entities(extracted_entities, client_id)
 
-                extracted_entities_dict = json.loads(
-                    extracted_entities
-                )  # Can throw Json decode exception
-                extracted_entities = json.dumps(
-                    extracted_entities_dict
-                )  # Trim the json by dumping from dict.
-                logger.debug(f"Length after trimming is {len(extracted_entities)}")
-
-            return extracted_entities
-            
         except Exception as err:
             logger.error(
                 f"Exception while extracting save entities: {err}\n ja_text: {ja_extracted_text}"
             )
             raise err
 
+
+async def aja_parse_application(ja_extracted_text: str, session_id, client_id) -> ApplicantEntities:
+    """Async ja_parse_application with the AsyncLLMClient."""
+    try:
+        if ja_extracted_text is None or len(ja_extracted_text) == 0:
+            raise Exception("Extracted text is null. Check if previous task to _extract_text finished succesfully.")
+
+        ai_client = AsyncLLMClient(session_id=session_id, client_id=client_id)
+        prompt = JobApplicationAIPrompt(ja_text=ja_extracted_text)
+        extracted_entities = await ai_client.aget_model_response(ai_prompt=prompt, response_type=LLMResponseType.JSON_OBJECT)
+        return _ja_get_applicant_entities(extracted_entities, client_id)
+
+    except Exception as err:
+        logger.error(
+            f"Exception while extracting save entities: {err}\n ja_text: {ja_extracted_text}"
+        )
+        raise err
+
+
+def _ja_get_applicant_entities(extracted_entities: str, client_id) -> ApplicantEntities:
+    assert extracted_entities is not None and len(extracted_entities) > 0
+    logger.debug(f"len of Extracted ENtities: {len(extracted_entities)}")
+    logger.debug(f"Extracted ENtities: {extracted_entities}")
+
+    # Can throw Json decode exception
+    applicant_entities = ja_parse_entities(extracted_entities, company_id=client_id)
+    logger.debug(f"Length after trimming is {len(applicant_entities.json_text)}")
+    return applicant_entities
+
 def ja_get_basics (ja_text: str, session_id, client_id):
     """ Get the basics from openai for this resume and return"""
     try:
@@ -106,6 +125,20 @@ def ja_get_basics (ja_text: str, session_id, client_id):
             f"Exception while extracting basic ja entity: {err}\n ja_text: {ja_text}"
         )
         raise err   
+
+async def aja_get_basics(ja_text: str, session_id, client_id):
+    """Async ja_get_basics with the AsyncLLMClient."""
+    try:
+        prompt = JobApplicationBasicsAIPrompt(ja_text=ja_text)
+        ai_client = AsyncLLMClient(session_id=session_id, client_id=client_id)
+        response = await ai_client.aget_model_response(prompt, response_type = LLMResponseType.JSON_SCHEMA, response_json=prompt.response_schema)
+        logger.debug(f"Job Application Basics Response from OpenAI:\n {response}")
+        return response
+    except Exception as err:
+        logger.error(
+            f"Exception while extracting basic ja entity: {err}\n ja_text: {ja_text}"
+        )
+        raise err
         
 def ja_calculate_factor_score(ja_text: str, jp_text: str, jp_parsed: Any, session_id, client_id):
     """Calculate the ranking based on factors.
@@ -120,29 +153,53 @@ def ja_calculate_factor_score(ja_text: str, jp_text: str, jp_parsed: Any, sessio
         
         factor_response = ai_client.get_model_response(factor_prompt)
         
-        logger.debug(f"Factor Analysis Response from OpenAI:\n {factor_response}")
+        return _ja_get_factor_data(factor_response, jp_parsed)
+    except Exception as err:
+        logger.error(
+            f"Exception while calculating factor score: {err}\n ja_text={ja_text}\n jp_text={jp_text}\n jp_parsed = {jp_parsed}"
+        )
+        raise err
 
-        factor_data = json.loads(factor_response)
-        
-    
-        logger.debug(factor_data["final_score_explanation"])
-        logger.debug(factor_data["calculations"])
-        logger.debug(factor_data["final_score"])
-        ja_get_adjusted_factor_score(factor_data=factor_data, parsed_jd=jp_parsed)
-        logger.debug(f"factor_data after adjusting: {factor_data}")
-        
-        return factor_data
+async def aja_calculate_factor_score(ja_text: str, jp_text: str, jp_parsed: Any, session_id, client_id):
+    """Async ja_calculate_factor_score with the AsyncLLMClient."""
+    try:
+        factor_prompt = FactorAnalysisAIPrompt(jp_text=jp_text, ja_text=ja_text)
+        ai_client = AsyncLLMClient(session_id=session_id, client_id=client_id)
+        factor_response = await ai_client.aget_model_response(factor_prompt)
+        return _ja_get_factor_data(factor_response, jp_parsed)
     except Exception as err:
         logger.error(
-            f"Exception while calculating factor score: {err}\n ja_text={ja_text}\n jp_text={jp_text}\n jp_parsed = {jp_parsed}\n factor_data: {factor_data}"
+            f"Exception while calculating factor score: {err}\n ja_text={ja_text}\n jp_text={jp_text}\n jp_parsed = {jp_parsed}"
         )
         raise err
 
+def _ja_get_factor_data(factor_response: str, jp_parsed: Any):
+    logger.debug(f"Factor Analysis Response from OpenAI:\n {factor_response}")
+
+    factor_data = json.loads(factor_response)
+
+    logger.debug(factor_data["final_score_explanation"])
+    logger.debug(factor_data["calculations"])
+    logger.debug(factor_data["final_score"])
+    ja_get_adjusted_factor_score(factor_data=factor_data, parsed_jd=jp_parsed)
+    logger.debug(f"factor_data after adjusting: {factor_data}")
+    return factor_data
+
 def ja_get_score_summary(ja_text: str, jp_text: str, session_id, client_id) -> str:
     summary_prompt = JobApplicationMatchSummaryAIPrompt(jp_text=jp_text, ja_text=ja_text)
     ai_client = LLMClient(session_id=session_id, client_id=client_id)
     
     summary_response = ai_client.get_model_response(summary_prompt)
+    return _ja_get_score_summary(summary_response)
+
+async def aja_get_score_summary(ja_text: str, jp_text: str, session_id, client_id) -> str:
+    """Async ja_get_score_summary with the AsyncLLMClient."""
+    summary_prompt = JobApplicationMatchSummaryAIPrompt(jp_text=jp_text, ja_text=ja_text)
+    ai_client = AsyncLLMClient(session_id=session_id, client_id=client_id)
+    summary_response = await ai_client.aget_model_response(summary_prompt)
+    return _ja_get_score_summary(summary_response)
+
+def _ja_get_score_summary(summary_response: str) -> str:
     summary_data = json.loads(summary_response)
     
     score_summary = json.dumps(summary_data["summary"])
@@ -1,5 +1,7 @@
 from datetime import datetime
 import json
+import timeit
+import orjson
 from intai.models.models import (
     JobApplicationAddress,
     JobApplicationAward,
@@ -16,7 +18,7 @@ from intai.models.models import (
 from intai.schemas.candidate_fe import CandidateFrontEnd
 from intai.utils.str_utils import check_str_not_null
 from intai.schemas.job_application import JobApplicationDetail
-from intai.config import load_weightage_config
+from intai.ml.weightage import get_weightage_table
 import traceback
 
 from loguru import logger
@@ -78,6 +80,7 @@ def ja_calculate_avg_tenure_in_organization(data):
     total_organizations = len(unique_organizations)
     overall_years_of_experience = ja_calculate_overall_years_of_experience(data)
 
+    average_tenure_in_organization = 0
     if overall_years_of_experience is not None and total_organizations > 0:
         # Calculating average tenure in organization in years
         average_tenure_in_organization = (
@@ -106,6 +109,7 @@ def ja_calculate_avg_tenure_in_roles(data):
     total_unique_roles = len(unique_roles)
     overall_years_of_experience = ja_calculate_overall_years_of_experience(data)
 
+    average_tenure_in_role = 0
     if overall_years_of_experience is not None and total_unique_roles > 0:
         # Calculating average tenure in role in years
         average_tenure_in_role = overall_years_of_experience / total_unique_roles
@@ -433,6 +437,8 @@ def ja_get_experience_from_json(json_data, company_id) -> tuple[list[JobApplicat
     # List of dictionary of each skill and scores
     # [{"skillname": 34.2}]
     skills_score_dict = {}
+    # (skill_name, start_year, years_experience) for every skill of every experience.
+    skill_intervals = []
     current_year = 0.5
     experience_details = json_data.get("experience", [])
     if (
@@ -472,83 +478,40 @@ def ja_get_experience_from_json(json_data, company_id) -> tuple[list[JobApplicat
                 start_year = current_year
                 current_year += years_experience
 
-            # TODO #D: Do we need to return the skill_score_dict as we
-            # are passing by reference.
-            # NOTE: It is modified and returned.
-            skills_score_dict = ja_get_experience_skills_from_json(
-                exp, ja_experience, company_id, skills_score_dict, start_year
+            skill_intervals.extend(
+                ja_get_experience_skills_from_json(exp, ja_experience, start_year)
             )
 
+        # NOTE: Score the skills of all experiences in one pass.
+        skills_score_dict = ja_get_skills_scores(skill_intervals)
         return experiences_list, skills_score_dict
     else:
         return None, None
 
 
-def ja_get_yearwise_skills_scores(years_experience, start_year, skills_list):
-    """Process and get yearwise skills-score-dict."""
-
-    i = 0
-    skills_score_dict = {}
-    while i < years_experience:
-        for skill in skills_list:
-            skill_name = get_json_skip_null(skill, "skillName")
-            if skill_name:
-                assert skill_name != "null"
-                if skill_name not in skills_score_dict:
-                    skills_score_dict[skill_name] = {}
-
-                year_key = i + start_year
-                # NOTE: Mark the score for this skill and this year
-                # to be 1.0
-                skills_score_dict[skill_name][year_key] = 1.0
-
-        # After processsing all sills for this year, go to next year.
-        i += 0.5
-    return skills_score_dict
-
-
-def ja_get_aggregate_skills_scores(skills_score_yearwise_dict, ret_skills_score_dict):
-    """Aggregate the yearwise skills_score_dict.
+def ja_get_skills_scores(skill_intervals):
+    """Score the skills of all experiences.
 
     Args:
-    yearwise_skills_scores_dict:
-    Dictionary with {"skill_names:str", {"year:str", score}}
-
-    Returns a dictionary with {"skill_names:str", score}
+    skill_intervals is a list of (skill_name, start_year, years_experience)
+    where the skill is used for the half years start_year, start_year + 0.5,
+    ... for years_experience years.
 
+    Returns a dictionary with {"skill_names:str", score} where the score is
+    the sum of the weightages of those half years across experiences.
     """
-    # Calculate Skill Scores
-    # TODO: Refactor this into a function for easier understanding.
-    logger.debug(
-        f"skills_score_yearwise_dict is {skills_score_yearwise_dict}; ret_skills_score_dict is {ret_skills_score_dict}"
-    )
+    ret_skills_score_dict = {}
+    if not skill_intervals:
+        return ret_skills_score_dict
     try:
-        weightage_dict = load_weightage_config()
-        max_score = weightage_dict.get("max")
-        for skill, yearly_scores in skills_score_yearwise_dict.items():
-            logger.debug(f"skill: {skill} # yearl_scores: {yearly_scores}")
-            new_score = 0
-            for year, _ in yearly_scores.items():
-                year_weightage = weightage_dict.get(
-                    str(year), max_score
-                )  # Handle 'max' key
-                new_score += year_weightage
-            if skill not in ret_skills_score_dict.keys():
-                # TODO #B: We are maxing the max score across experiences for
-                # a skill. Verify if its ok.
-                # ret_skills_score_dict[skill] = min(max_score, round(new_score, 2))
-                ret_skills_score_dict[skill] = round(new_score, 2)
-            else:
-                # TODO #B: We might be going above all the max score across experiences for
-                # a skill if it exists across experiences. Verify if its ok.
-                new_score_total = ret_skills_score_dict[skill] + round(new_score, 2)
-
-                logger.debug(
-                    f"skill in ret_score_dict already so adding \n ret_score_dict item: {ret_skills_score_dict[skill]} \n skill: {skill} \nnew score: {new_score_total}"
-                )
-                # max_score_skill = max_score * total years? or get from json
-                # ret_skills_score_dict[skill] = min(max_score_skill, new_score_total)
-                ret_skills_score_dict[skill] = new_score_total
+        skill_names, start_years, durations = zip(*skill_intervals)
+        scores = get_weightage_table().interval_scores(start_years, durations)
+        for skill_name, score in zip(skill_names, scores):
+            # TODO #B: We might be going above all the max score across experiences for
+            # a skill if it exists across experiences. Verify if its ok.
+            ret_skills_score_dict[skill_name] = ret_skills_score_dict.get(skill_name, 0) + round(
+                float(score), 2
+            )
     except Exception as e:
         logger.error(
             f"Error in calculating final resume scores {e} {traceback.format_exc()}"
@@ -556,37 +519,36 @@ def ja_get_aggregate_skills_scores(skills_score_yearwise_dict, ret_skills_score_
     return ret_skills_score_dict
 
 
-def ja_get_experience_skills_from_json(
-    exp_dict, ja_experience, company_id, ret_skill_score_dict, start_year
-):
+def ja_get_experience_skills_from_json(exp_dict, ja_experience, start_year):
     """Get the experience skills for job application from json.
 
     Args:
     exp_dict is the json dictionary of specific experience details.
     ja_experience is the jobapplicationExperience object.
-    ret_score_dict is dictionary of {"SkillName: Str": score:float}
     start_year is 0.5 if dates are missing or actual start_year based
     on calculations of experience years
 
-    Return: updates the ret_score_dict and returns it.
-
+    Return: list of (skill_name, start_year, years_experience) for the
+    distinct skills of the experience.
+    NOTE: Skills of an experience shorter than half a year are skipped.
     """
     logger.debug(f"***** Experience is {ja_experience}")
     years_experience = _floor_half_year(ja_experience.years_experience)
+    if years_experience <= 0:
+        return []
     skills_list = exp_dict.get("skills", [])
 
-    # Process Skills now for experience
-    skills_score_yearwise_dict = ja_get_yearwise_skills_scores(
-        years_experience, start_year, skills_list
-    )
-    logger.debug(f"Yearwise skills score is: {skills_score_yearwise_dict}")
-
-    # NOTE ret_skill_score_dict is passed in and modified
-    ret_skill_score_dict = ja_get_aggregate_skills_scores(
-        skills_score_yearwise_dict, ret_skill_score_dict
-    )
-    logger.debug(f" Skills score dict is: {ret_skill_score_dict}")
-    return ret_skill_score_dict
+    skill_names = []
+    for skill in skills_list:
+        skill_name = get_json_skip_null(skill, "skillName")
+        if skill_name:
+            assert skill_name != "null"
+            skill_names.append(skill_name)
+    skill_intervals = [
+        (skill_name, start_year, years_experience) for skill_name in dict.fromkeys(skill_names)
+    ]
+    logger.debug(f"Experience skill intervals: {skill_intervals}")
+    return skill_intervals
 
 
 def ja_get_address_from_json(json_data, company_id):
@@ -668,3 +630,73 @@ def ja_get_details_from_json(json_data, json_basics, company_id:int):
         
     logger.debug(f"JobApplicationDetail: {ja_details}")
     return ja_details
+
+
+class ApplicantEntities:
+    """All entity lists of a parsed resume.
+
+    Built with one decode of the LLM response (see ja_parse_entities) so the
+    insert functions don't need to decode or walk the json again.
+    json_text is the compact json stored as the parsed resume.
+    """
+
+    def __init__(self, json_data: dict, json_text: str, company_id: int):
+        self.json_data = json_data
+        self.json_text = json_text
+        self.company_id = company_id
+        self.details: JobApplicationDetail = None
+        self.addresses: list[JobApplicationAddress] = []
+        self.experiences: list[JobApplicationExperience] = None
+        # {"SkillName:str": score:float} summed over the half years of all experiences.
+        self.experience_skills: dict[str, float] = None
+        self.educations: list[JobApplicationEducation] = []
+        self.languages: list[JobApplicationLanguage] = None
+        self.certifications: list[JobApplicationCertification] = None
+        # {"Cert title:str": ["SkillName:str"]}
+        self.certification_skills: dict[str, list[str]] = None
+        self.projects: list[JobApplicationProject] = None
+        self.awards: list[JobApplicationAward] = None
+        self.publications: list[JobApplicationPublication] = None
+        self.volunteers: list[JobApplicationVolunteer] = None
+        self.interests: list[JobApplicationInterest] = None
+        self.parse_time = 0.0
+
+    def __repr__(self):
+        return "<ApplicantEntities: bytes: {}; experiences: {}; skills: {}; educations: {}; parse_time: {:.4f}>".format(
+            len(self.json_text),
+            len(self.experiences or []),
+            len(self.experience_skills or {}),
+            len(self.educations),
+            self.parse_time,
+        )
+
+
+def ja_parse_entities(entities, company_id: int) -> ApplicantEntities:
+    """Parse the resume json (str or bytes) into ApplicantEntities.
+
+    The json is decoded once and every section is read once.
+    Raises orjson.JSONDecodeError (a ValueError) for invalid json.
+    """
+    start_time = timeit.default_timer()
+    json_data = orjson.loads(entities)
+    # NOTE: Compact json without the whitespace of the LLM response.
+    json_text = orjson.dumps(json_data).decode()
+    applicant_entities = ApplicantEntities(json_data, json_text, company_id)
+    applicant_entities.details = ja_get_details_from_json(json_data, None, company_id)
+    applicant_entities.addresses = ja_get_address_from_json(json_data, company_id)
+    applicant_entities.experiences, applicant_entities.experience_skills = ja_get_experience_from_json(
+        json_data, company_id
+    )
+    applicant_entities.educations = ja_get_education_from_json(json_data, company_id)
+    applicant_entities.languages = ja_get_languages_from_json(json_data, company_id)
+    applicant_entities.certifications, applicant_entities.certification_skills = (
+        ja_get_certifications_from_json(json_data, company_id)
+    )
+    applicant_entities.projects = ja_get_projects_from_json(json_data, company_id)
+    applicant_entities.awards = ja_get_awards_from_json(json_data, company_id)
+    applicant_entities.publications = ja_get_publications_from_json(json_data, company_id)
+    applicant_entities.volunteers = ja_get_volunteers_from_json(json_data, company_id)
+    applicant_entities.interests = ja_get_interests_from_json(json_data, company_id)
+    applicant_entities.parse_time = timeit.default_timer() - start_time
+    logger.info(f"Parsed {applicant_entities}")
+    return applicant_entities
@@ -9,13 +9,14 @@ the job application data.
 import json
 import timeit
 import traceback
+from intai.ml.jd_artifact import get_jd_artifact
 from intai.ml.scoring_utils import (
     match_certificate_skills_with_jd_skills,
     ja_calculate_matching_skill_score,
     ja_calculate_matching_percentage,
     ja_get_bucket,
     ja_match_industry_with_jd,
-    ja_match_title_with_jd,
+    aja_match_title_with_jd,
 )
 from intai.models.models import (
     JobApplicationDb,
@@ -36,8 +37,8 @@ from intai.schemas.job_application import (
 from intai.schemas.job_application_fe import JobApplicationFrontEnd
 from intai.utils.fe_utils import update_candidate_frontend_service, update_ja_frontend_service
 from intai.utils.file_utils import extract_text, get_bytes_from_url
-from intai.utils.ja_utils import ja_get_basics, ja_parse_jd, ja_parse_application, ja_calculate_factor_score, ja_get_score_summary
-from intai.utils.json_data_utils import ja_populate_from_basics
+from intai.utils.ja_utils import aja_get_basics, aja_parse_application, aja_calculate_factor_score, aja_get_score_summary
+from intai.utils.json_data_utils import ApplicantEntities, ja_populate_from_basics
 from intai.utils.model_utils import insert_applicant_entities, update_job_application_detail
 from loguru import logger
 import asyncio
@@ -115,16 +116,9 @@ class JobApplicationWorker:
             
             self._load_job()
 
-            # Insert or update the entity in db.
-            # NOTE: In case of update it will delete the previous entities.
-            asyncio.run(self._save_db_and_extract_text(is_update))
-
-            asyncio.run(self._get_score_summay_and_basics())
-
-            # Filtering Criteria: Check if Candidate meets the criteria
-            self.check_job_criteria()                # Send FE with failur      
-
-            asyncio.run(self._finish_processing())
+            # NOTE: One event loop for the whole job, the LLM calls are
+            # awaited on it instead of holding a thread each.
+            asyncio.run(self._run_async(is_update))
 
         except Exception as err:
             # Log the error and continue
@@ -141,6 +135,18 @@ class JobApplicationWorker:
 
     ### - Top Level methods called by run 
 
+    async def _run_async(self, is_update: bool):
+        # Insert or update the entity in db.
+        # NOTE: In case of update it will delete the previous entities.
+        await self._save_db_and_extract_text(is_update)
+
+        await self._get_score_summay_and_basics()
+
+        # Filtering Criteria: Check if Candidate meets the criteria
+        self.check_job_criteria()                # Send FE with failur      
+
+        await self._finish_processing()
+
     def _load_job(self):
         """Load the job posting db from the database for this jobapplication"""
         logger.trace("Loading JobPosting from application")
@@ -205,10 +211,10 @@ class JobApplicationWorker:
         try:
             logger.info("Calculating score summary and parsing application")
             start_time = timeit.default_timer()
-            parse_task = asyncio.create_task(asyncio.to_thread(self._parse_and_match_application))
+            parse_task = asyncio.create_task(self._parse_and_match_application())
             
             # Create tasks for parallel execution
-            parse_basic_task = asyncio.create_task(asyncio.to_thread(self._get_ja_basics))
+            parse_basic_task = asyncio.create_task(self._get_ja_basics())
             factor_score_summary_task = asyncio.create_task(self._get_factor_score_summary())  # Call as coroutine
 
             async def update_progress():
@@ -241,9 +247,9 @@ class JobApplicationWorker:
 
             #combine the parsed data score and factor score response. 
             # Save score to database after we have the fully parsed data.
-            self._save_job_application_score(ja_score_parse)
+            await asyncio.to_thread(self._save_job_application_score, ja_score_parse)
             self.progressBarCompletion = min(self.progressBarCompletion + 10, 90)
-            update_ja_frontend_service(
+            await asyncio.to_thread(update_ja_frontend_service,
                 client_job_application_id=self.job_application.client_job_application_id,
                 job_application_fe=self.job_application_fe)
 
@@ -294,7 +300,7 @@ class JobApplicationWorker:
         self.ja_extracted_text = await asyncio.to_thread(extract_text, ja_bytes_data, ja_docType)
         logger.debug(self.ja_extracted_text)
 
-    def _parse_and_match_application(self):
+    async def _parse_and_match_application(self):
         """
         Parse the job application, match it with the job description, and calculate various scores.
 
@@ -318,23 +324,43 @@ class JobApplicationWorker:
         """
         try:
             logger.debug(f"Parsing and matching application")
+            start_time = timeit.default_timer()
+            extracted_entities = await aja_parse_application(self.ja_extracted_text, session_id=self.task_id, client_id=self.company_id)
+            ja_score, latest_experiences, job_title = await asyncio.to_thread(self._match_application, extracted_entities)
+            ja_score.title_match = await aja_match_title_with_jd(latest_experiences, job_title, session_id=self.task_id, client_id=self.company_id)
+
+            end_time = timeit.default_timer()
+            execution_time = end_time - start_time
+            logger.warning(f"oooooo=====( Execution time for full parsing is: {execution_time} seconds )===ooooo")
+            return ja_score
+        except Exception as err:
+            logger.error(
+                            f"Exception while calculate save ranking: {err}\n JobApplication: {self}"
+                        )
+            raise err
+
+    def _match_application(self, extracted_entities: ApplicantEntities):
+        """Save the parsed entities and match them with the job description.
+
+        Returns (JobApplicationScore without title_match, latest experiences, jd job title).
+        """
+        try:
             jad_id = self.job_application.jad_id
             assert jad_id is not None
             with SessionLocal() as db:
-                start_time = timeit.default_timer()
-
-                extracted_entities = ja_parse_application(self.ja_extracted_text, session_id=self.task_id, client_id=self.company_id)
                 # Save extracted entities, parsed_resume etc. in db.
                 self._update_applicant_entities(db, jad_id, extracted_entities)
 
-                organizationsIndustrySegment, job_title, jd_skill_names, overall_experience, management_experience = ja_parse_jd(self.job_posting_db.parsed_jd)
+                # NOTE: JD skills embeddings, title etc. are precomputed once per job posting.
+                jd_artifact = get_jd_artifact(
+                    db, self.job_posting_db, session_id=self.task_id, client_id=self.company_id
+                )
+                jd_skill_names = jd_artifact.skill_names
+                organizationsIndustrySegment = jd_artifact.industries
+                job_title = jd_artifact.job_title
 
                 logger.debug(
-                    f"JD Information \n skills: {jd_skill_names} \n"
-                    f"experience in years: {overall_experience}\n"
-                    f"peopleManagementExperience: {management_experience}\n"
-                    f"orgIndSeg: {organizationsIndustrySegment}\n"
-                    f"job_title: {job_title}\n"
+                    f"JD Information \n {jd_artifact}\n"
                     f"jad_id: {self.job_application.jad_id}"
                 )
 
@@ -355,7 +381,8 @@ class JobApplicationWorker:
                     f"Experience Skills: {experience_skills}\n Certification Skills: {certification_skills}"
                 )
                 learnability = match_certificate_skills_with_jd_skills(
-                    certification_skills, jd_skill_names, company_id=self.company_id, session_id=self.task_id
+                    certification_skills, jd_skill_names, company_id=self.company_id, session_id=self.task_id,
+                    jd_skill_matrix=jd_artifact.skill_matrix
                 )
                 logger.debug(
                     f"learnability (match cert skills with jd skills) {learnability}"
@@ -364,12 +391,13 @@ class JobApplicationWorker:
                 # get the standardized skill name for candidate skills and
                 # calculate skill score
                 ja_matching_score, ja_matching_skills = ja_calculate_matching_skill_score(
-                    experience_skills, jd_skill_names, session_id=self.task_id, client_id=self.company_id
+                    experience_skills, jd_skill_names, session_id=self.task_id, client_id=self.company_id,
+                    jd_skill_matrix=jd_artifact.skill_matrix
                 )
                 #
                 # Calculate the percentage for candidate based on ideal candidate score and skill score.
                 ja_matching_percentage = ja_calculate_matching_percentage(
-                    ja_matching_score, self.job_posting_db.ideal_candidate_score
+                    ja_matching_score, jd_artifact.ideal_score
                 )
                 logger.debug(
                     f"ja_matching_score: {ja_matching_score} \n ja_matching_skills: {ja_matching_skills} \nPercentage: {ja_matching_percentage}"
@@ -383,7 +411,6 @@ class JobApplicationWorker:
                 industry_match = ja_match_industry_with_jd(
                     latest_experiences, organizationsIndustrySegment
                 )
-                title_match = ja_match_title_with_jd(latest_experiences, job_title, session_id=self.task_id, client_id=self.company_id)
                 #
                 # Create a new JobApplicationScore with the calculated values
                 ja_score = JobApplicationScore(
@@ -393,28 +420,35 @@ class JobApplicationWorker:
                     match_percent=ja_matching_percentage,
                     learnability=learnability,
                     industry_match=industry_match,
-                    title_match=title_match,
                     matching_skills=str(ja_matching_skills)
                 )
                 # Return the calculated data
-                
-                end_time = timeit.default_timer()
-                execution_time = end_time - start_time
-                logger.warning(f"oooooo=====( Execution time for full parsing is: {execution_time} seconds )===ooooo")
-                return ja_score
+                return ja_score, latest_experiences, job_title
         except Exception as err:
             logger.error(
                             f"Exception while calculate save ranking: {err}\n JobApplication: {self}"
                         )
             raise err
 
-    def _get_ja_basics(self):
+    async def _get_ja_basics(self):
         try:
             logger.info(f"Getting ja basics for {self.job_application}")
             start_time = timeit.default_timer()
 
-            ja_basics_str = ja_get_basics(self.ja_extracted_text, session_id=self.task_id, client_id=self.company_id)
-            ja_basics = json.loads(ja_basics_str)
+            ja_basics_str = await aja_get_basics(self.ja_extracted_text, session_id=self.task_id, client_id=self.company_id)
+            await asyncio.to_thread(self._save_ja_basics, json.loads(ja_basics_str))
+            end_time = timeit.default_timer()
+            execution_time = end_time - start_time
+            logger.warning(f"oooooo=====( Execution time for basics parsing is: {execution_time} seconds )===ooooo")
+        except Exception as err:
+            logger.error(
+                            f"Exception while getting ja basics: {err}\n JobApplication: {self}"
+                        )
+            raise err
+
+    def _save_ja_basics(self, ja_basics):
+        """Save the basics in the jad and send them to the frontend."""
+        try:
             logger.debug(f"ja_basics: {ja_basics}")
             
             self.progressBarCompletion = min(self.progressBarCompletion + 10, 90)
@@ -429,12 +463,9 @@ class JobApplicationWorker:
                 
             update_ja_frontend_service(client_job_application_id=self.job_application.client_job_application_id,
                     job_application_fe=self.job_application_fe)
-            end_time = timeit.default_timer()
-            execution_time = end_time - start_time
-            logger.warning(f"oooooo=====( Execution time for basics parsing is: {execution_time} seconds )===ooooo")
         except Exception as err:
             logger.error(
-                            f"Exception while getting ja basics: {err}\n JobApplication: {self}"
+                            f"Exception while saving ja basics: {err}\n JobApplication: {self}"
                         )
             raise err
     
@@ -447,8 +478,8 @@ class JobApplicationWorker:
             jp_text = self.job_posting_db.extracted_text
             jp_parsed = json.loads(self.job_posting_db.parsed_jd)
             logger.debug(f"jp_parsed: {jp_parsed}")
-            factor_score_task = asyncio.create_task(asyncio.to_thread(ja_calculate_factor_score, ja_text=ja_text, jp_text=jp_text, jp_parsed=jp_parsed, session_id=self.task_id, client_id=self.company_id))
-            summary_task = asyncio.create_task(asyncio.to_thread(ja_get_score_summary, ja_text, jp_text, self.task_id, self.company_id))
+            factor_score_task = asyncio.create_task(aja_calculate_factor_score(ja_text=ja_text, jp_text=jp_text, jp_parsed=jp_parsed, session_id=self.task_id, client_id=self.company_id))
+            summary_task = asyncio.create_task(aja_get_score_summary(ja_text, jp_text, self.task_id, self.company_id))
 
             factor_score_dict, score_summary = await asyncio.gather(factor_score_task, summary_task)
             assert "final_score_explanation" in factor_score_dict
@@ -466,7 +497,7 @@ class JobApplicationWorker:
             # Update frontend with factor score and summary
             self.job_application_fe.score = str(ja_score.factor_score)
             self.job_application_fe.scoreSummary = str(ja_score.factor_summary)
-            update_ja_frontend_service(
+            await asyncio.to_thread(update_ja_frontend_service,
                 client_job_application_id=self.job_application.client_job_application_id,
                 job_application_fe=self.job_application_fe
             )
@@ -500,14 +531,14 @@ class JobApplicationWorker:
             logger.error(f"Exception while saving job application score: {err}")
             raise err
 
-    def _update_applicant_entities(self, db, jad_id, entities):
+    def _update_applicant_entities(self, db, jad_id, entities: ApplicantEntities):
         """Update entities tables with extracted entities."""
         try:
             # Store the jobapplication data in the table
             self.job_application_db.update_job_application(
                 db,
                 jad_id=jad_id,
-                parsed_resume=entities,
+                parsed_resume=entities.json_text,
                 extracted_text=self.ja_extracted_text,
                 status="Extracted Entities",
             )
@@ -9,10 +9,13 @@ import json
 import traceback
 import intai.config as config
 import requests
-from intai.config import load_weightage_config
+from intai.ml.jd_artifact import build_jd_artifact, save_jd_artifact
 from intai.ml.llm_client import LLMClient
+from intai.ml.skill_canonicalizer import get_skill_canonicalizer
 from intai.ml.openai_client import OpenAIClient
+from intai.ml.utils.llm_types import LLMModelType
 from intai.ml.scoring_utils import get_ideal_candidate_score_for_job
+from intai.ml.weightage import get_weightage_table
 from intai.ml.ai_prompt import JobPostingAIPrompt
 from intai.models.models import (
     JobPostingDb,
@@ -139,8 +142,8 @@ class JobPostingWorker:
             # standardized_new_skills = find_cluster_center_skills(new_skills, open_ai_client)
 
             # NOTE: List of Tuple where first entry in tuple is skill_name
-            # and second is standard skill name.
-            skills_list = list(zip(new_skills, new_skills))
+            # and second is standard skill name (canonical vocabulary skill).
+            skills_list = list(zip(new_skills, get_skill_canonicalizer().canonical_names(new_skills)))
             SkillDb.insert_skills_no_duplicates(self.db, self.company_id, skills_list)
             return new_skills
         except Exception as err:
@@ -152,13 +155,13 @@ class JobPostingWorker:
     def calc_save_candidate_score(self, skills, experience):
         """Calculate the ideal candidate score and save in db."""
         try:
-            weightage_dict = load_weightage_config()
-            logger.debug(f"{weightage_dict}")
+            weightage_table = get_weightage_table()
+            logger.debug(f"{weightage_table}")
             logger.debug(f"{skills} {experience}")
 
             # skill_cum_score is a dict
             total_cum_score, skill_cum_scores = get_ideal_candidate_score_for_job(
-                skills, experience, weightage_dict
+                skills, experience, weightage_table
             )
             logger.debug(f"{total_cum_score} skill_cum_scores:{skill_cum_scores}")
 
@@ -169,6 +172,7 @@ class JobPostingWorker:
             )
 
             self.jobPostingDb.update_ideal_candidate_score(self.db, total_cum_score)
+            return total_cum_score
 
         except Exception as err:
             logger.error(
@@ -176,6 +180,18 @@ class JobPostingWorker:
             )
             raise err
 
+    def build_save_jd_artifact(self, parsed_jd: str, ideal_score: float):
+        """Build the jd artifact used to score the applications and save in db."""
+        try:
+            ai_client = LLMClient(model=LLMModelType.EMBEDDING_ADA, session_id=self.task_id, client_id=self.company_id)
+            artifact = build_jd_artifact(parsed_jd, ideal_score, ai_client)
+            save_jd_artifact(self.db, self.jobPostingDb.id, artifact)
+        except Exception as err:
+            logger.error(
+                f"Exception while building jd artifact: {err}\n JobPosting: {self}"
+            )
+            raise err
+
     def update_frontend_status(self, status: str, progress: int):
         """Send the frontend with status update.
 
@@ -230,12 +246,16 @@ class JobPostingWorker:
 
             # Calculate ideal candidate score and store in the
             # jp_ideal_candidate_score table
-            self.calc_save_candidate_score(parsed_skills, parsed_experience)
+            ideal_score = self.calc_save_candidate_score(parsed_skills, parsed_experience)
 
             BackgroundTaskDb.update_background_task(
                 self.db, task_id, "CALCULATED IDEAL SCORE"
             )
 
+            # Precompute the jd skill embeddings etc. so applications for
+            # this posting skip all the jd side work.
+            self.build_save_jd_artifact(entities, ideal_score)
+
             # Update the gpt logs table with extracted entities and other gpt stuff
 
             # Update status table
@@ -0,0 +1,123 @@
+"""
+FileName: rescore_worker.py.
+
+Purpose: Re-score all applications of a job posting from the stored skill
+scores after weightage_config.json, the distance threshold or the posting
+skills change. No LLM calls are made so thousands of applications are
+re-scored in seconds.
+
+Run with `python -m intai.workers.rescore_worker --company-id 1 --client-job-id 2`
+or call the /rescore endpoint.
+"""
+
+import argparse
+import timeit
+
+from loguru import logger
+
+from intai.ml.jd_artifact import build_jd_artifact, save_jd_artifact
+from intai.ml.llm_client import LLMClient
+from intai.ml.scoring_utils import (
+    get_ideal_candidate_score_for_job,
+    ja_calculate_matching_percentage,
+    ja_calculate_matching_skill_scores_batch,
+    ja_get_bucket,
+)
+from intai.ml.utils.llm_types import LLMModelType
+from intai.ml.weightage import get_weightage_table
+from intai.models.models import (
+    JobApplicationScoreDb,
+    JobApplicationSkillDb,
+    JobPostingDb,
+    SessionLocal,
+)
+from intai.utils.ja_utils import ja_parse_jd
+
+
+def rescore_job_posting(company_id: int, client_job_id: int) -> dict:
+    """Re-score all applications of the job posting.
+
+    Recomputes the ideal candidate score and the jd artifact for the
+    posting, then the matching score, percentage, bucket and matching skills
+    of every application and updates them in one bulk update.
+    Learnability, industry and title match are kept as is.
+
+    NOTE: The posting and the scores are written in one transaction, a
+    failure leaves the posting and its applications scored as before.
+    """
+    start_time = timeit.default_timer()
+    try:
+        with SessionLocal() as db:
+            job_posting_db = JobPostingDb.get_job_posting(db, company_id, client_job_id)
+            if job_posting_db is None:
+                raise Exception(f"job_posting not found: {company_id} {client_job_id}")
+            job_posting_id = job_posting_db.id
+
+            _, _, jd_skill_names, overall_experience, _ = ja_parse_jd(job_posting_db.parsed_jd)
+            ideal_score, _ = get_ideal_candidate_score_for_job(
+                [{"skillName": skill} for skill in jd_skill_names], overall_experience, get_weightage_table()
+            )
+
+            # NOTE: JD skill embeddings come from the vocabulary or the embedding cache.
+            ai_client = LLMClient(model=LLMModelType.EMBEDDING_ADA, session_id=job_posting_id, client_id=company_id)
+            jd_artifact = build_jd_artifact(job_posting_db.parsed_jd, ideal_score, ai_client)
+
+            # Group the (job_application_id, skill_name, score) rows per application.
+            candidates_skills = {}
+            for job_application_id, skill_name, score in JobApplicationSkillDb.get_skills_by_job_posting(
+                db, company_id, job_posting_id
+            ):
+                candidates_skills.setdefault(job_application_id, []).append((skill_name, score))
+            job_application_ids = list(candidates_skills)
+
+            scores, matching_skills = ja_calculate_matching_skill_scores_batch(
+                list(candidates_skills.values()),
+                jd_artifact.skill_names,
+                session_id=job_posting_id,
+                client_id=company_id,
+                jd_skill_matrix=jd_artifact.skill_matrix,
+            )
+
+            updated_scores = []
+            for job_application_id, score, ja_matching_skills in zip(job_application_ids, scores, matching_skills):
+                match_percent = ja_calculate_matching_percentage(score, ideal_score)
+                updated_scores.append(
+                    {
+                        "job_application_id": job_application_id,
+                        "score": float(score),
+                        "match_percent": match_percent,
+                        "bucket": ja_get_bucket(match_percent),
+                        "matching_skills": str(ja_matching_skills),
+                    }
+                )
+            job_posting_db.update_ideal_candidate_score(db, ideal_score, commit=False)
+            save_jd_artifact(db, job_posting_id, jd_artifact, commit=False)
+            JobApplicationScoreDb.bulk_update_scores(db, company_id, updated_scores, commit=False)
+            db.commit()
+
+        execution_time = timeit.default_timer() - start_time
+        logger.info(
+            f"Rescored {len(updated_scores)} applications for job posting {job_posting_id} in {execution_time:.2f} seconds"
+        )
+        return {
+            "job_posting_id": job_posting_id,
+            "ideal_candidate_score": ideal_score,
+            "applications": len(updated_scores),
+            "execution_time": round(execution_time, 3),
+        }
+    except Exception as err:
+        logger.error(f"Exception while rescoring job posting: {err}\n {company_id} {client_job_id}")
+        raise err
+
+
+def start():
+    """Launch with `python -m intai.workers.rescore_worker`."""
+    parser = argparse.ArgumentParser(description="Re-score all applications of a job posting.")
+    parser.add_argument("--company-id", type=int, required=True)
+    parser.add_argument("--client-job-id", type=int, required=True)
+    args = parser.parse_args()
+    logger.info(rescore_job_posting(args.company_id, args.client_job_id))
+
+
+if __name__ == "__main__":
+    start()
@@ -1,14 +1,23 @@
-from intai.ml.llm_client import LLMClient
+from intai.ml.llm_client import AsyncLLMClient, LLMClient
 from intai.ml.utils.llm_types import LLMResponseType
 from intai.ml.ai_prompt import FindScreeningScoreAIPrompt, GenerateScreeningQuestionsAIPrompt, FormatTranscriptAIPrompt
 import json
 from loguru import logger
 from intai.models.models import (
+    AsyncSessionLocal,
     JobApplicationDb,
     JobPostingDb,
     SessionLocal)
 
 
+async def _aget_extracted_texts(client_job_application_id: int, client_job_id: int, company_id: int):
+    """Get the (ja_text, jp_text) extracted texts with an async session."""
+    async with AsyncSessionLocal() as session:
+        job_application_db = await JobApplicationDb.aget_job_application(session=session, company_id=company_id, client_job_application_id=client_job_application_id)
+        job_posting_db = await JobPostingDb.aget_job_posting(session=session, company_id=company_id, client_job_id=client_job_id)
+        return job_application_db.extracted_text, job_posting_db.extracted_text
+
+
 # Function to generate screening questions using openai_client given job description and resume
 def generate_screening_questions(client_job_application_id: int, client_job_id: int,company_id: int, screening_focus_area: str):
     """
@@ -34,6 +43,18 @@ def generate_screening_questions(client_job_application_id: int, client_job_id:
     return response
 
 
+async def agenerate_screening_questions(client_job_application_id: int, client_job_id: int, company_id: int, screening_focus_area: str):
+    """Async generate_screening_questions for the API layer."""
+    ja_text, jp_text = await _aget_extracted_texts(client_job_application_id, client_job_id, company_id)
+    prompt = GenerateScreeningQuestionsAIPrompt(jp_text=jp_text, ja_text=ja_text, screening_focus_area=screening_focus_area)
+    ai_client = AsyncLLMClient(session_id=client_job_application_id, client_id=company_id)
+    response = await ai_client.aget_model_response(prompt, response_type=LLMResponseType.JSON_OBJECT)
+    logger.debug(f"Response from OpenAI:\n {response}")
+    data = json.loads(response)
+    logger.debug(f"Questions: {data['questions']}")
+    return response
+
+
 # Function to generate screening questions using openai_client given job description and resume
 def find_screening_score(client_job_application_id: int, client_job_id: int,company_id: int, transcript: str, screening_focus_area: str):
     """
@@ -58,6 +79,18 @@ def find_screening_score(client_job_application_id: int, client_job_id: int,comp
     logger.debug(f"Score: {data}")
     return response
 
+
+async def afind_screening_score(client_job_application_id: int, client_job_id: int, company_id: int, transcript: str, screening_focus_area: str):
+    """Async find_screening_score for the API layer."""
+    ja_text, jp_text = await _aget_extracted_texts(client_job_application_id, client_job_id, company_id)
+    prompt = FindScreeningScoreAIPrompt(jp_text=jp_text, ja_text=ja_text, transcript=transcript, screening_focus_area=screening_focus_area)
+    ai_client = AsyncLLMClient(session_id=client_job_application_id, client_id=company_id)
+    response = await ai_client.aget_model_response(prompt, response_type=LLMResponseType.JSON_OBJECT)
+    logger.debug(f"Response from OpenAI for score is:\n {response}")
+    data = json.loads(response)
+    logger.debug(f"Score: {data}")
+    return response
+
 def format_transcript(transcript: str, session_id, client_id):
     """
     Format the transcript using openai_client.
@@ -67,6 +100,18 @@ def format_transcript(transcript: str, session_id, client_id):
     prompt = FormatTranscriptAIPrompt(transcript=transcript)
     ai_client = LLMClient(session_id=session_id, client_id=client_id)
     response = ai_client.get_model_response(prompt, response_type = LLMResponseType.TEXT)
+    return _clean_formatted_transcript(response)
+
+
+async def aformat_transcript(transcript: str, session_id, client_id):
+    """Async format_transcript for the API layer."""
+    prompt = FormatTranscriptAIPrompt(transcript=transcript)
+    ai_client = AsyncLLMClient(session_id=session_id, client_id=client_id)
+    response = await ai_client.aget_model_response(prompt, response_type = LLMResponseType.TEXT)
+    return _clean_formatted_transcript(response)
+
+
+def _clean_formatted_transcript(response: str):
     logger.debug(f"Response from OpenAI for formatted transcript is:\n {response}")
     # Remove whitespace from start of response
     response = response.lstrip()